@@ -0,0 +1,144 @@
+"""Archivo de incidencias resueltas: de t_incidencias a particiones NDJSON gzip en S3.
+
+Las incidencias en fase 'resuelta' creadas hace más de ARCHIVO_INCIDENCIAS_DIAS días (y sin
+cambios en ese plazo) se escriben en incidencias/archivo/fecha=<fecha_creacion>/ del bucket
+de notificaciones y después se borran de la tabla y del índice de búsqueda. manifest.json lista las particiones con
+sus objetos y cantidades; get_incidents_history lo usa para leer el archivo solo cuando el
+rango de fechas pedido lo necesita.
+
+Se ejecuta una vez por día (ver funciones-*.yml) o a mano:
+    python archive_incidents.py --dias 90 --dry-run
+
+El manifest se reescribe entero en cada ejecución: no correr dos archivados a la vez.
+"""
+import os
+import json
+import argparse
+from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key, Attr
+import aws_clients
+import archivo_s3
+import cache_respuestas
+import indice
+import instrumentacion
+
+PREFIJO = 'incidencias/archivo'
+CLAVE_MANIFEST = f'{PREFIJO}/manifest.json'
+DIAS_POR_DEFECTO = int(os.environ.get('ARCHIVO_INCIDENCIAS_DIAS', '90'))
+INCIDENCIAS_POR_LOTE = 1000
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+
+def _bucket():
+    return os.environ['NOTIFICACIONES_BUCKET_NAME']
+
+
+def leer_manifest():
+    try:
+        body = aws_clients.s3().get_object(Bucket=_bucket(), Key=CLAVE_MANIFEST)['Body'].read()
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return {'particiones': {}}
+        raise
+    return json.loads(body)
+
+
+def particiones_en_rango(desde, hasta):
+    """Fechas archivadas dentro de [desde, hasta] (None = sin límite), de la más nueva a la más vieja.
+
+    El manifest se lee en cada llamada: el historial solo llega aquí sin respuesta cacheada, y
+    una copia en memoria podría no ver un archivado que ya cambió la versión del cache.
+    """
+    return sorted(
+        (fecha for fecha in leer_manifest()['particiones'] if (desde or '')[:10] <= fecha <= (hasta or '9999')[:10]),
+        reverse=True
+    )
+
+
+def leer_particion(fecha):
+    """Incidencias archivadas de un día, ordenadas de la más reciente a la más antigua."""
+    por_id = {incidencia['incidente_id']: incidencia for incidencia in archivo_s3.leer_particion(_bucket(), f'{PREFIJO}/fecha={fecha}/')}
+    incidencias = list(por_id.values())
+    incidencias.sort(key=lambda incidencia: (incidencia['fecha_creacion'], incidencia['incidente_id']), reverse=True)
+    return incidencias
+
+
+def _archivar_lote(incidencias, particiones):
+    escritor = archivo_s3.EscritorArchivo(
+        _bucket(), PREFIJO, lambda incidencia: f"fecha={incidencia['fecha_creacion'][:10]}",
+        clave_registro=lambda incidencia: incidencia['incidente_id']
+    )
+    for incidencia in incidencias:
+        escritor.agregar(incidencia)
+    for key in escritor.flush():
+        fecha = key.split('/fecha=')[1][:10]
+        particion = particiones.setdefault(fecha, {'objetos': [], 'registros': 0})
+        if key not in particion['objetos']:
+            particion['objetos'].append(key)
+    # La cantidad se cuenta sobre los segmentos (sin duplicados) en vez de sumar el lote: un lote
+    # que se vuelve a archivar después de un fallo no cuenta sus incidencias dos veces
+    for fecha in {incidencia['fecha_creacion'][:10] for incidencia in incidencias}:
+        particiones[fecha]['registros'] = len(leer_particion(fecha))
+
+
+def archivar(dias=DIAS_POR_DEFECTO, dry_run=False):
+    corte = (datetime.now() - timedelta(days=dias)).strftime(FORMATO_FECHA)
+    incidencias_table = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS')
+    estado = leer_manifest()
+    parametros = {
+        'IndexName': 'fase-fecha_creacion-index',
+        'KeyConditionExpression': Key('fase').eq('resuelta') & Key('fecha_creacion').lt(corte),
+        # Una incidencia resuelta hace poco todavía se consulta: se espera el mismo plazo
+        'FilterExpression': Attr('fecha_actualizacion').not_exists() | Attr('fecha_actualizacion').lt(corte)
+    }
+
+    archivadas = 0
+    pendientes = []
+    while True:
+        response = incidencias_table.query(**parametros)
+        pendientes.extend(response['Items'])
+        ultima_pagina = 'LastEvaluatedKey' not in response
+        if pendientes and (len(pendientes) >= INCIDENCIAS_POR_LOTE or ultima_pagina):
+            if not dry_run:
+                # Primero S3 y el manifest, después el borrado: si algo falla a mitad de camino
+                # la incidencia queda en los dos lados hasta la siguiente ejecución, que la vuelve
+                # a archivar (leer_particion descarta los duplicados). Los postings se borran antes
+                # que la incidencia: si no, un fallo entre los dos borrados los dejaría en el
+                # índice apuntando a una incidencia que ya no está en la tabla
+                _archivar_lote(pendientes, estado['particiones'])
+                estado['actualizado_en'] = datetime.now().strftime(FORMATO_FECHA)
+                aws_clients.s3().put_object(
+                    Bucket=_bucket(), Key=CLAVE_MANIFEST,
+                    Body=json.dumps(estado, sort_keys=True), ContentType='application/json'
+                )
+                indice.eliminar(pendientes)
+                with incidencias_table.batch_writer() as batch:
+                    for incidencia in pendientes:
+                        batch.delete_item(Key={'incidente_id': incidencia['incidente_id']})
+            archivadas += len(pendientes)
+            pendientes = []
+        if ultima_pagina:
+            break
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    if archivadas and not dry_run:
+        # El historial cacheado ya no refleja la tabla (ver cache_respuestas.py)
+        cache_respuestas.invalidar()
+    return {'archivadas': archivadas, 'corte': corte, 'dry_run': dry_run}
+
+
+@instrumentacion.instrumentar
+def archive_incidents(event, context):
+    # Handler programado (schedule); el evento puede traer {"dias": N}
+    resultado = archivar(int((event or {}).get('dias', DIAS_POR_DEFECTO)))
+    print("Incidencias archivadas:", resultado)  # Log en CloudWatch
+    return resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archiva en S3 las incidencias resueltas antiguas')
+    parser.add_argument('--dias', type=int, default=DIAS_POR_DEFECTO, help='Antigüedad mínima en días')
+    parser.add_argument('--dry-run', action='store_true', help='Solo cuenta las incidencias a archivar')
+    args = parser.parse_args()
+    print(json.dumps(archivar(args.dias, args.dry_run)))
@@ -0,0 +1,111 @@
+import io
+import os
+import gzip
+import json
+import time
+import uuid
+import hashlib
+from datetime import datetime
+import aws_clients
+import serializacion
+
+# Archivos NDJSON comprimidos con gzip en S3: muchos registros por objeto en vez de un
+# objeto por registro. Se usa para el archivo de notificaciones y se puede reutilizar para
+# otros datos particionados (la partición la decide quien llama).
+MAX_BYTES_SEGMENTO = int(os.environ.get('ARCHIVO_MAX_BYTES_SEGMENTO', str(8 * 1024 * 1024)))
+MAX_EDAD_SEGMENTO_SEGUNDOS = float(os.environ.get('ARCHIVO_MAX_EDAD_SEGUNDOS', '60'))
+
+
+def comprimir_ndjson(registros):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as archivo:
+        for registro in registros:
+            archivo.write(serializacion.dumps(registro).encode('utf-8'))
+            archivo.write(b'\n')
+    return buffer.getvalue()
+
+
+def leer_ndjson(body):
+    """Recorre los registros de un objeto NDJSON gzip (StreamingBody de S3) sin cargarlo entero."""
+    with gzip.GzipFile(fileobj=body, mode='rb') as archivo:
+        for linea in archivo:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+class _Segmento:
+    def __init__(self):
+        self.registros = []
+        self.bytes = 0
+        self.creado_en = time.time()
+
+
+class EscritorArchivo:
+    """Acumula registros por partición y sube cada partición como un segmento NDJSON gzip.
+
+    Un segmento se sube cuando supera `max_bytes` (tamaño sin comprimir) o `max_edad`
+    segundos desde su primer registro; flush() sube todo lo pendiente. Cada segmento tiene
+    un nombre único, así que dos escritores nunca se pisan. Con `clave_registro` el nombre se
+    deriva de las claves de sus registros: reintentar el mismo lote sobrescribe el mismo objeto.
+    """
+
+    def __init__(self, bucket, prefijo, particion, max_bytes=MAX_BYTES_SEGMENTO, max_edad=MAX_EDAD_SEGMENTO_SEGUNDOS,
+                 clave_registro=None):
+        self.bucket = bucket
+        self.prefijo = prefijo.rstrip('/')
+        self.particion = particion  # registro -> 'clave=valor/...' relativo al prefijo
+        self.clave_registro = clave_registro
+        self.max_bytes = max_bytes
+        self.max_edad = max_edad
+        self._segmentos = {}
+        self.objetos_escritos = []
+
+    def agregar(self, registro):
+        particion = self.particion(registro)
+        segmento = self._segmentos.setdefault(particion, _Segmento())
+        segmento.registros.append(registro)
+        segmento.bytes += len(serializacion.dumps(registro))
+        if segmento.bytes >= self.max_bytes:
+            self._subir(particion)
+        self.flush_vencidos()
+
+    def flush_vencidos(self):
+        ahora = time.time()
+        for particion in [p for p, s in self._segmentos.items() if ahora - s.creado_en >= self.max_edad]:
+            self._subir(particion)
+
+    def flush(self):
+        for particion in list(self._segmentos):
+            self._subir(particion)
+        return self.objetos_escritos
+
+    def _subir(self, particion):
+        segmento = self._segmentos.pop(particion)
+        if self.clave_registro:
+            sufijo = hashlib.sha1('\n'.join(sorted(self.clave_registro(r) for r in segmento.registros)).encode()).hexdigest()[:16]
+        else:
+            sufijo = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        key = f"{self.prefijo}/{particion}/segmento-{sufijo}.ndjson.gz"
+        aws_clients.s3().put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=comprimir_ndjson(segmento.registros),
+            ContentType='application/x-ndjson',
+            ContentEncoding='gzip'
+        )
+        self.objetos_escritos.append(key)
+
+
+def listar_objetos(bucket, prefijo):
+    paginator = aws_clients.s3().get_paginator('list_objects_v2')
+    for pagina in paginator.paginate(Bucket=bucket, Prefix=prefijo):
+        for objeto in pagina.get('Contents', []):
+            yield objeto['Key']
+
+
+def leer_particion(bucket, prefijo):
+    """Recorre en streaming todos los registros de los segmentos bajo `prefijo`."""
+    s3 = aws_clients.s3()
+    for key in listar_objetos(bucket, prefijo):
+        if key.endswith('.ndjson.gz'):
+            yield from leer_ndjson(s3.get_object(Bucket=bucket, Key=key)['Body'])
@@ -0,0 +1,286 @@
+import os
+import aws_clients
+import time
+import json
+import hmac
+import uuid
+import base64
+import calendar
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from boto3.dynamodb.conditions import Key
+
+# Cache de tokens validados que sobrevive entre invocaciones de un mismo contenedor (warm start)
+CACHE_MAX_TOKENS = int(os.environ.get('AUTH_CACHE_MAX_TOKENS', '1024'))
+CACHE_TTL_SEGUNDOS = float(os.environ.get('AUTH_CACHE_TTL_SEGUNDOS', '60'))
+CACHE_TTL_NEGATIVO_SEGUNDOS = float(os.environ.get('AUTH_CACHE_TTL_NEGATIVO_SEGUNDOS', '10'))
+
+# Tokens firmados (HMAC-SHA256): se activan definiendo TOKEN_SECRET
+PREFIJO_TOKEN_FIRMADO = 'v1.'
+DURACION_TOKEN_SEGUNDOS = 3600
+REVOCACIONES_REFRESCO_SEGUNDOS = float(os.environ.get('AUTH_REVOCACIONES_REFRESCO_SEGUNDOS', '30'))
+REVOCACIONES_MARGEN_SEGUNDOS = 60  # Margen para revocaciones que el índice todavía no reflejaba
+INDICE_REVOCACIONES = 'revocaciones-index'
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+_cache = OrderedDict()  # token -> (vence_en, token_item o None)
+_lock = threading.Lock()
+
+_revocados = {}  # jti -> epoch de expiración del token revocado
+_revocados_hasta = None  # Mayor `revocado_en` ya cargado
+_revocados_actualizado_en = 0
+
+
+class ErrorAutenticacion(Exception):
+    def __init__(self, status_code, mensaje):
+        super().__init__(mensaje)
+        self.status_code = status_code
+        self.mensaje = mensaje
+
+
+def obtener_token(event):
+    # Obtener el token desde el header Authorization (formato Bearer <token>)
+    authorization = (event.get('headers') or {}).get('Authorization') or ''
+    return authorization.replace('Bearer ', '').strip()
+
+
+def _tabla_tokens():
+    return aws_clients.tabla('DYNAMODB_TABLE_TOKENS')
+
+
+def _tabla_tokens_legacy():
+    # Tabla anterior (tenant_id = token, token_id aleatorio); solo existe durante la migración
+    if not os.environ.get('DYNAMODB_TABLE_TOKENS_LEGACY'):
+        return None
+    return aws_clients.tabla('DYNAMODB_TABLE_TOKENS_LEGACY')
+
+
+def _secreto():
+    secreto = os.environ.get('TOKEN_SECRET')
+    return secreto.encode() if secreto else None
+
+
+def tokens_firmados_activos():
+    return _secreto() is not None
+
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).rstrip(b'=').decode()
+
+
+def _desde_b64(texto):
+    return base64.urlsafe_b64decode(texto + '=' * (-len(texto) % 4))
+
+
+def _firma(payload_b64):
+    return _b64(hmac.new(_secreto(), payload_b64.encode(), hashlib.sha256).digest())
+
+
+def emitir_token(user_id, role, duracion=DURACION_TOKEN_SEGUNDOS):
+    """Genera un token firmado `v1.<payload>.<firma>` con user_id, rol, expiración y jti."""
+    payload = {
+        'uid': user_id,
+        'rol': role,
+        'exp': int(time.time()) + duracion,
+        'jti': uuid.uuid4().hex
+    }
+    payload_b64 = _b64(json.dumps(payload, separators=(',', ':')).encode())
+    return PREFIJO_TOKEN_FIRMADO + payload_b64 + '.' + _firma(payload_b64), payload
+
+
+def _verificar_firma(token):
+    # Devuelve el payload si la firma es correcta; no revisa expiración ni revocación
+    try:
+        payload_b64, firma = token[len(PREFIJO_TOKEN_FIRMADO):].split('.')
+        # Se comparan bytes: compare_digest no acepta str con caracteres no ASCII (TypeError)
+        if not hmac.compare_digest(firma.encode(), _firma(payload_b64).encode()):
+            return None
+        return json.loads(_desde_b64(payload_b64))
+    except ValueError:
+        return None
+
+
+def _expiracion(token_item):
+    # Momento (epoch) en que vence el token; DynamoDB borra el item por TTL poco después
+    return int(token_item['expires_at'])
+
+
+def convertir_token_legacy(item):
+    """Convierte una fila de la tabla anterior al nuevo formato (clave `token`, `expires_at` en epoch)."""
+    # `expires` se generaba con datetime.now() en Lambda, es decir, en UTC
+    expires_at = calendar.timegm(datetime.strptime(item['expires'], FORMATO_FECHA).timetuple())
+    return {
+        'token': item['tenant_id'],
+        'user_id': item['user_id'],
+        'role': item['role'],
+        'fecha_creacion': item.get('fecha_creacion', item['expires']),
+        'expires_at': expires_at
+    }
+
+
+def _leer_cache(token, ahora):
+    with _lock:
+        entrada = _cache.get(token)
+        if entrada is None:
+            return False, None
+        vence_en, token_item = entrada
+        if ahora >= vence_en:
+            del _cache[token]
+            return False, None
+        _cache.move_to_end(token)
+        return True, token_item
+
+
+def _guardar_cache(token, token_item, ttl):
+    with _lock:
+        _cache[token] = (time.time() + ttl, token_item)
+        _cache.move_to_end(token)
+        while len(_cache) > CACHE_MAX_TOKENS:
+            _cache.popitem(last=False)
+
+
+def invalidar(token):
+    with _lock:
+        _cache.pop(token, None)
+
+
+def _buscar_token_legacy(token):
+    tabla = _tabla_tokens_legacy()
+    if tabla is None:
+        return None
+    response = tabla.query(KeyConditionExpression=Key('tenant_id').eq(token))
+    if 'Items' not in response or len(response['Items']) == 0:
+        return None
+
+    # Migración perezosa: el token pasa a la tabla nueva y las siguientes lecturas son get_item
+    token_item = convertir_token_legacy(response['Items'][0])
+    if token_item['expires_at'] > time.time():
+        _tabla_tokens().put_item(Item=token_item)
+    return token_item
+
+
+def _buscar_token(token):
+    response = _tabla_tokens().get_item(Key={'token': token}, ConsistentRead=True)
+    token_item = response.get('Item')
+    if token_item is None:
+        return _buscar_token_legacy(token)
+    # Las filas de revocación comparten la tabla pero no son tokens
+    if 'user_id' not in token_item:
+        return None
+    return token_item
+
+
+def _actualizar_revocaciones(ahora):
+    """Carga (la primera vez) o completa incrementalmente la lista de jti revocados.
+
+    Solo se leen las revocaciones posteriores a la última vista, y las de tokens ya vencidos
+    se descartan, así que la lista en memoria se mantiene pequeña.
+    """
+    global _revocados_hasta, _revocados_actualizado_en
+    if ahora - _revocados_actualizado_en < REVOCACIONES_REFRESCO_SEGUNDOS:
+        return
+
+    # Un token revocado hace más de DURACION_TOKEN_SEGUNDOS ya está vencido de todas formas
+    desde = (_revocados_hasta if _revocados_hasta is not None else ahora - DURACION_TOKEN_SEGUNDOS) - REVOCACIONES_MARGEN_SEGUNDOS
+    parametros = {
+        'IndexName': INDICE_REVOCACIONES,
+        'KeyConditionExpression': Key('lista').eq('revocados') & Key('revocado_en').gt(int(desde))
+    }
+    while True:
+        response = _tabla_tokens().query(**parametros)
+        for item in response['Items']:
+            _revocados[item['jti']] = int(item['expires_at'])
+            _revocados_hasta = max(_revocados_hasta or 0, int(item['revocado_en']))
+        if 'LastEvaluatedKey' not in response:
+            break
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    for jti in [jti for jti, expira in _revocados.items() if expira <= ahora]:
+        del _revocados[jti]
+    if _revocados_hasta is None:
+        _revocados_hasta = int(desde)
+    _revocados_actualizado_en = ahora
+
+
+def _autenticar_firmado(token, ahora):
+    payload = _verificar_firma(token)
+    if payload is None:
+        raise ErrorAutenticacion(403, 'Token no válido o no encontrado')
+    if ahora >= payload['exp']:
+        raise ErrorAutenticacion(403, 'Token expirado')
+
+    _actualizar_revocaciones(ahora)
+    if payload['jti'] in _revocados:
+        raise ErrorAutenticacion(403, 'Token revocado')
+
+    return {
+        'user_id': payload['uid'],
+        'role': payload['rol'],
+        'jti': payload['jti'],
+        'expires_at': payload['exp']
+    }
+
+
+def revocar_token(token):
+    """Agrega el token firmado a la lista de revocados (o borra el token de la tabla si es de los antiguos)."""
+    invalidar(token)
+    if not (tokens_firmados_activos() and token.startswith(PREFIJO_TOKEN_FIRMADO)):
+        _tabla_tokens().delete_item(Key={'token': token})
+        tabla_legacy = _tabla_tokens_legacy()
+        if tabla_legacy is not None:
+            for item in tabla_legacy.query(KeyConditionExpression=Key('tenant_id').eq(token))['Items']:
+                tabla_legacy.delete_item(Key={'tenant_id': item['tenant_id'], 'token_id': item['token_id']})
+        return
+
+    payload = _verificar_firma(token)
+    if payload is None:
+        raise ErrorAutenticacion(403, 'Token no válido o no encontrado')
+
+    # La fila de revocación es necesaria solo mientras el token no venza: el TTL la borra después
+    _tabla_tokens().put_item(Item={
+        'token': 'revocado#' + payload['jti'],
+        'lista': 'revocados',
+        'jti': payload['jti'],
+        'revocado_en': int(time.time()),
+        'expires_at': payload['exp']
+    })
+    _revocados[payload['jti']] = payload['exp']
+
+
+def autenticar(event):
+    """Devuelve el item del token del request o lanza ErrorAutenticacion.
+
+    Los tokens firmados se verifican en memoria (firma, expiración y lista de revocados).
+    Los tokens antiguos (UUID guardados en la tabla) se guardan en cache hasta
+    CACHE_TTL_SEGUNDOS (nunca más allá de su expiración) y los desconocidos durante
+    CACHE_TTL_NEGATIVO_SEGUNDOS, de modo que la mayoría de requests de un contenedor
+    caliente no consultan DynamoDB.
+    """
+    token = obtener_token(event)
+    if not token:
+        raise ErrorAutenticacion(400, 'Faltan datos en los headers')
+
+    ahora = time.time()
+    if tokens_firmados_activos() and token.startswith(PREFIJO_TOKEN_FIRMADO):
+        return _autenticar_firmado(token, ahora)
+
+    encontrado, token_item = _leer_cache(token, ahora)
+    if not encontrado:
+        token_item = _buscar_token(token)
+        if token_item is None:
+            _guardar_cache(token, None, CACHE_TTL_NEGATIVO_SEGUNDOS)
+        else:
+            restante = _expiracion(token_item) - ahora
+            _guardar_cache(token, token_item, min(CACHE_TTL_SEGUNDOS, restante) if restante > 0 else CACHE_TTL_NEGATIVO_SEGUNDOS)
+
+    if token_item is None:
+        raise ErrorAutenticacion(403, 'Token no válido o no encontrado')
+
+    # La expiración se valida siempre, también para los tokens servidos desde la cache
+    if ahora >= _expiracion(token_item):
+        raise ErrorAutenticacion(403, 'Token expirado')
+
+    return token_item
@@ -0,0 +1,68 @@
+import boto3
+import os
+import threading
+from botocore.config import Config
+import instrumentacion
+
+# Clientes de AWS compartidos por todos los handlers del contenedor. Se crean la primera vez
+# que se usan y se reutilizan en las invocaciones siguientes (warm start), con sus conexiones
+# HTTP abiertas (keep-alive), en vez de crear un boto3.resource/boto3.client por request.
+CONFIG = Config(
+    max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '50')),
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=5,
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
+_lock = threading.Lock()
+_session = None
+_dynamodb = None
+_s3 = None
+_tablas = {}
+
+
+def _sesion():
+    global _session
+    if _session is None:
+        _session = boto3.session.Session()
+    return _session
+
+
+def dynamodb():
+    global _dynamodb
+    if _dynamodb is None:
+        with _lock:
+            if _dynamodb is None:
+                _dynamodb = _sesion().resource('dynamodb', config=CONFIG)
+                instrumentacion.registrar(_dynamodb.meta.client)
+    return _dynamodb
+
+
+def s3():
+    global _s3
+    if _s3 is None:
+        with _lock:
+            if _s3 is None:
+                _s3 = _sesion().client('s3', config=CONFIG)
+                instrumentacion.registrar(_s3)
+    return _s3
+
+
+def tabla(variable_entorno):
+    """Devuelve la tabla cuyo nombre está en la variable de entorno indicada (p. ej. DYNAMODB_TABLE_INCIDENCIAS)."""
+    nombre = os.environ[variable_entorno]
+    table = _tablas.get(nombre)
+    if table is None:
+        table = _tablas[nombre] = dynamodb().Table(nombre)
+    return table
+
+
+def reiniciar(conservar_sesion=False):
+    # Descarta los clientes creados (solo para pruebas y benchmarks que simulan un cold start)
+    global _session, _dynamodb, _s3
+    with _lock:
+        if not conservar_sesion:
+            _session = None
+        _dynamodb = _s3 = None
+        _tablas.clear()
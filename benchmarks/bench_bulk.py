@@ -0,0 +1,67 @@
+"""Benchmark de creación masiva: N llamadas a create_incident frente a una llamada a create_incidents_bulk.
+
+Uso:
+    python benchmarks/bench_bulk.py --incidencias 500
+"""
+import time
+import argparse
+
+import entorno
+
+
+def crear_estudiante():
+    import register_user
+    import login_user
+
+    entorno.invocar(register_user.register_user, entorno.evento(body={
+        'tenant_id': 'kiosko@utec.edu.pe', 'password': 'secreto', 'role': 'estudiante',
+        'nombre': 'Kiosko', 'apellido': 'Biblioteca'
+    }))
+    return entorno.invocar(login_user.login_user, entorno.evento(body={
+        'tenant_id': 'kiosko@utec.edu.pe', 'password': 'secreto'
+    }))['body']['token']
+
+
+def incidencia(i):
+    return {
+        'descripcion': f'Reporte {i}: proyector sin señal',
+        'tipo_incidencia': 'equipo',
+        'ubicacion': f'Aula {100 + i}',  # Ubicaciones distintas: ningún reporte se suma a otro
+        'urgencia': ('alta', 'media', 'baja')[i % 3]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--incidencias', type=int, default=500)
+    args = parser.parse_args()
+
+    mock = entorno.iniciar()
+    try:
+        import create_incident
+        import create_incidents_bulk
+
+        token = crear_estudiante()
+        n = args.incidencias
+
+        inicio = time.perf_counter()
+        for i in range(n):
+            entorno.invocar(create_incident.create_incident, entorno.evento(token=token, body=incidencia(i)))
+        individuales = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        respuesta = entorno.invocar(create_incidents_bulk.create_incidents_bulk, entorno.evento(
+            token=token, body={'incidencias': [incidencia(i) for i in range(n, 2 * n)]}
+        ))
+        bulk = time.perf_counter() - inicio
+
+        print(f'{n} x create_incident      {individuales:7.2f} s  {n / individuales:8.1f} incidencias/s')
+        print(f'1 x create_incidents_bulk {bulk:7.2f} s  {n / bulk:8.1f} incidencias/s  '
+              f'(creadas: {respuesta["body"]["creadas"]})')
+        print(f'aceleración: x{individuales / bulk:.1f}')
+    finally:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark de reutilización de clientes de AWS y del modo de despliegue con router.
+
+1. Cold start: tiempo de importar cada handler y crear sus clientes en un proceso nuevo.
+   Con funciones separadas cada endpoint paga su propio cold start; con el router se paga una vez.
+2. Latencia en caliente: invocaciones seguidas creando los clientes en cada request
+   (comportamiento anterior) frente a reutilizar los clientes del contenedor.
+
+Uso:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_clientes.py --invocaciones 500
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+import entorno
+
+HANDLERS = [
+    'register_user', 'login_user', 'logout_user', 'validate_token',
+    'create_incident', 'update_incident', 'get_incidents_history'
+]
+
+SCRIPT_COLD_START = (
+    "import time; t = time.perf_counter(); import {modulo}, aws_clients; "
+    "aws_clients.dynamodb(); aws_clients.s3(); print(time.perf_counter() - t)"
+)
+
+
+def medir_cold_start(modulo, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, '-c', SCRIPT_COLD_START.format(modulo=modulo)],
+            cwd=entorno.RAIZ, env=dict(os.environ), capture_output=True, text=True, check=True
+        )
+        tiempos.append(float(salida.stdout.strip()) * 1000)
+    return entorno.percentil(tiempos, 50)
+
+
+def crear_sesion():
+    import register_user
+    import login_user
+
+    entorno.invocar(register_user.register_user, entorno.evento(body={
+        'tenant_id': 'staff@utec.edu.pe', 'password': 'secreto', 'role': 'administrativo',
+        'nombre': 'Ana', 'apellido': 'Pérez'
+    }))
+    return entorno.invocar(login_user.login_user, entorno.evento(body={
+        'tenant_id': 'staff@utec.edu.pe', 'password': 'secreto'
+    }))['body']['token']
+
+
+def medir_en_caliente(token, invocaciones, reutilizar):
+    import aws_clients
+    import auth
+    import get_incidents_history
+
+    evento = entorno.evento(token=token, query={'fase': 'pendiente', 'limit': '10'})
+    tiempos = []
+    for _ in range(invocaciones):
+        # Sin cache de tokens para que cada request haga sus llamadas a DynamoDB
+        auth.invalidar(token)
+        if not reutilizar:
+            # Como antes: boto3.resource/Table nuevos en cada request (la sesión por defecto sí se reutilizaba)
+            aws_clients.reiniciar(conservar_sesion=True)
+        inicio = time.perf_counter()
+        entorno.invocar(get_incidents_history.get_incidents_history, evento)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invocaciones', type=int, default=300)
+    parser.add_argument('--repeticiones-cold-start', type=int, default=3)
+    args = parser.parse_args()
+
+    mock = entorno.iniciar()
+    try:
+        print('== Cold start (p50 de importar el handler y crear los clientes, ms)')
+        separadas = 0.0
+        for modulo in HANDLERS:
+            ms = medir_cold_start(modulo, args.repeticiones_cold_start)
+            separadas += ms
+            print(f'  {modulo:<24} {ms:8.1f}')
+        router = medir_cold_start('router', args.repeticiones_cold_start)
+        print(f'  {"funciones separadas":<24} {separadas:8.1f}  (un cold start por endpoint)')
+        print(f'  {"router":<24} {router:8.1f}  (un solo cold start para todas las rutas)')
+
+        print(f'\n== En caliente: get_incidents_history x {args.invocaciones} (ms)')
+        token = crear_sesion()
+        for nombre, reutilizar in (('clientes por request', False), ('clientes reutilizados', True)):
+            tiempos = medir_en_caliente(token, args.invocaciones, reutilizar)
+            print(f'  {nombre:<24} p50={entorno.percentil(tiempos, 50):6.2f} '
+                  f'p95={entorno.percentil(tiempos, 95):6.2f} p99={entorno.percentil(tiempos, 99):6.2f}')
+    finally:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
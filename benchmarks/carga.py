@@ -0,0 +1,251 @@
+"""Prueba de carga local: mezcla de requests contra todos los endpoints principales.
+
+Reproduce una carga mixta (registro, login, validación de token, creación y actualización de
+incidencias, historial) con varios hilos concurrentes contra DynamoDB y S3 simulados con moto,
+sobre tablas precargadas. Reporta throughput, p50/p95/p99 y llamadas a AWS por request de
+cada handler (medidas con instrumentacion.py), para comparar antes y después de un cambio.
+
+moto atiende una llamada a la vez (ver entorno.py): con concurrencia > 1 las latencias incluyen
+la espera por el simulador. Sirven para comparar ejecuciones entre sí, no como tiempos de AWS;
+las llamadas a AWS por request no dependen de eso.
+
+Uso:
+    python benchmarks/carga.py --peticiones 2000 --concurrencia 8 --incidencias 5000
+    python benchmarks/carga.py --mezcla create_incident=50,get_incidents_history=50 --json
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import entorno
+
+MEZCLA_POR_DEFECTO = (
+    'get_incidents_history=35,create_incident=20,validate_token=20,'
+    'update_incident=15,login_user=7,register_user=3'
+)
+FASES = ('pendiente', 'en_progreso', 'resuelta')
+TIPOS = ('equipo', 'infraestructura', 'limpieza', 'seguridad')
+URGENCIAS = ('alta', 'media', 'baja')
+
+
+class _Silencio(io.TextIOBase):
+    # Descarta los logs de los handlers (redirect_stdout no sirve con varios hilos)
+    def write(self, texto):
+        return len(texto)
+
+
+def parsear_mezcla(texto):
+    mezcla = {}
+    for parte in texto.split(','):
+        nombre, _, peso = parte.partition('=')
+        mezcla[nombre.strip()] = float(peso)
+    return mezcla
+
+
+def datos_incidencia(rnd, i):
+    return {
+        'descripcion': f'Reporte de carga {i}',
+        'tipo_incidencia': rnd.choice(TIPOS),
+        'ubicacion': f'Pabellón {rnd.choice("ABCDE")} aula {rnd.randint(100, 400)}',
+        'urgencia': rnd.choice(URGENCIAS)
+    }
+
+
+class Escenario:
+    """Usuarios, tokens e incidencias compartidos por los hilos de la prueba."""
+
+    def __init__(self, semilla):
+        self.lock = threading.Lock()
+        self.rnd = random.Random(semilla)
+        self.estudiantes = []  # (tenant_id, token, user_id)
+        self.staff = []
+        self.incidencias = []
+        self.registrados = 0
+
+    def elegir(self, lista):
+        with self.lock:
+            return self.rnd.choice(lista)
+
+    def nuevo_correo(self, prefijo):
+        with self.lock:
+            self.registrados += 1
+            return f'{prefijo}{self.registrados}@carga.utec.edu.pe'
+
+
+def registrar_y_entrar(escenario, rol):
+    import auth
+    import login_user
+    import register_user
+
+    correo = escenario.nuevo_correo(rol)
+    register_user.register_user(entorno.evento(body={
+        'tenant_id': correo, 'password': 'secreto', 'role': rol, 'nombre': 'Carga', 'apellido': rol
+    }), None)
+    token = login_user.login_user(entorno.evento(body={'tenant_id': correo, 'password': 'secreto'}), None)['body']['token']
+    return correo, token, auth.autenticar(entorno.evento(token=token))['user_id']
+
+
+def preparar(escenario, estudiantes, staff, incidencias):
+    import lotes
+    from create_incident import construir_incidencia
+
+    escenario.estudiantes = [registrar_y_entrar(escenario, 'estudiante') for _ in range(estudiantes)]
+    escenario.staff = [registrar_y_entrar(escenario, 'administrativo') for _ in range(staff)]
+
+    # Tabla precargada en lotes de 25 (sin pasar por los handlers) para medir con un tamaño realista
+    escrituras = []
+    for i in range(incidencias):
+        _, _, user_id = escenario.rnd.choice(escenario.estudiantes)
+        incidencia, _ = construir_incidencia(datos_incidencia(escenario.rnd, i), user_id, 'estudiante')
+        incidencia['fase'] = escenario.rnd.choice(FASES)
+        escrituras.append((os.environ['DYNAMODB_TABLE_INCIDENCIAS'], incidencia))
+        escenario.incidencias.append(incidencia['incidente_id'])
+    lotes.escribir_en_lotes(escrituras, hilos=4)
+
+
+def construir_peticion(escenario, operacion, i):
+    """Devuelve (handler, evento) para una petición de la operación indicada."""
+    import create_incident
+    import get_incidents_history
+    import login_user
+    import register_user
+    import update_incident
+    import validate_token
+
+    if operacion == 'register_user':
+        return register_user.register_user, entorno.evento(body={
+            'tenant_id': escenario.nuevo_correo('nuevo'), 'password': 'secreto', 'role': 'estudiante',
+            'nombre': 'Nuevo', 'apellido': 'Usuario'
+        })
+    if operacion == 'login_user':
+        correo, _, _ = escenario.elegir(escenario.estudiantes + escenario.staff)
+        return login_user.login_user, entorno.evento(body={'tenant_id': correo, 'password': 'secreto'})
+    if operacion == 'validate_token':
+        _, token, _ = escenario.elegir(escenario.estudiantes + escenario.staff)
+        return validate_token.validate_token, entorno.evento(token=token)
+    if operacion == 'create_incident':
+        _, token, _ = escenario.elegir(escenario.estudiantes)
+        return create_incident.create_incident, entorno.evento(token=token, body=datos_incidencia(escenario.rnd, i))
+    if operacion == 'update_incident':
+        _, token, _ = escenario.elegir(escenario.staff)
+        return update_incident.update_incident, entorno.evento(token=token, body={
+            'incidente_id': escenario.elegir(escenario.incidencias),
+            'fase': escenario.elegir(('en_progreso', 'resuelta')),
+            'tiempo_resolucion': '2h'
+        })
+    if operacion == 'get_incidents_history':
+        _, token, _ = escenario.elegir(escenario.staff)
+        _, _, reportado_por = escenario.elegir(escenario.estudiantes)
+        query = escenario.elegir([
+            {'fase': escenario.elegir(FASES)},
+            {'fase': escenario.elegir(FASES), 'urgencia': escenario.elegir(URGENCIAS)},
+            {'reportado_por': reportado_por},
+            {}
+        ])
+        return get_incidents_history.get_incidents_history, entorno.evento(token=token, query=dict(query, limit='25'))
+    raise ValueError(f'Operación desconocida: {operacion}')
+
+
+def ejecutar(escenario, mezcla, peticiones, concurrencia):
+    import instrumentacion
+
+    operaciones = list(mezcla)
+    pesos = [mezcla[operacion] for operacion in operaciones]
+    plan = [escenario.rnd.choices(operaciones, pesos)[0] for _ in range(peticiones)]
+    resultados = {operacion: [] for operacion in operaciones}  # operacion -> [(ms, status, llamadas, detalle)]
+
+    def una(args):
+        i, operacion = args
+        handler, evento = construir_peticion(escenario, operacion, i)
+        inicio = time.perf_counter()
+        respuesta = handler(evento, None)
+        ms = (time.perf_counter() - inicio) * 1000
+        metricas = instrumentacion.ultima() or {}
+        if operacion == 'create_incident' and respuesta.get('statusCode') == 200:
+            with escenario.lock:
+                escenario.incidencias.append(json.loads(respuesta['body'])['incidente_id'])
+        resultados[operacion].append((ms, respuesta.get('statusCode'), metricas.get('LlamadasAWS', 0), metricas.get('llamadas', {})))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(una, enumerate(plan)))
+    return resultados, time.perf_counter() - inicio
+
+
+def resumir(resultados, segundos):
+    resumen = {'segundos': round(segundos, 2), 'throughput': round(sum(map(len, resultados.values())) / segundos, 1), 'handlers': {}}
+    operaciones_aws = defaultdict(lambda: [0, 0.0])
+    for operacion, filas in sorted(resultados.items()):
+        if not filas:
+            continue
+        latencias = [ms for ms, _, _, _ in filas]
+        estados = Counter(f'{status // 100}xx' if isinstance(status, int) else str(status) for _, status, _, _ in filas)
+        resumen['handlers'][operacion] = {
+            'peticiones': len(filas),
+            'p50': round(entorno.percentil(latencias, 50), 2),
+            'p95': round(entorno.percentil(latencias, 95), 2),
+            'p99': round(entorno.percentil(latencias, 99), 2),
+            'llamadas_aws': round(sum(llamadas for _, _, llamadas, _ in filas) / len(filas), 2),
+            'estados': dict(estados)
+        }
+        for _, _, _, detalle in filas:
+            for nombre, medida in detalle.items():
+                operaciones_aws[nombre][0] += medida['n']
+                operaciones_aws[nombre][1] += medida['ms']
+    resumen['aws'] = {
+        nombre: {'llamadas': n, 'ms_total': round(ms, 1)}
+        for nombre, (n, ms) in sorted(operaciones_aws.items(), key=lambda item: -item[1][1])
+    }
+    return resumen
+
+
+def imprimir(resumen):
+    print(f"{resumen['segundos']} s, {resumen['throughput']} peticiones/s")
+    print(f"{'handler':24} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'AWS/req':>8}  estados")
+    for operacion, fila in resumen['handlers'].items():
+        print(f"{operacion:24} {fila['peticiones']:6d} {fila['p50']:8.2f} {fila['p95']:8.2f} {fila['p99']:8.2f} "
+              f"{fila['llamadas_aws']:8.2f}  {fila['estados']}")
+    print('\nLlamadas a AWS (por tiempo total):')
+    for nombre, fila in resumen['aws'].items():
+        print(f"  {nombre:32} {fila['llamadas']:7d} llamadas {fila['ms_total']:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--peticiones', type=int, default=2000)
+    parser.add_argument('--concurrencia', type=int, default=8)
+    parser.add_argument('--incidencias', type=int, default=2000, help='Incidencias precargadas en la tabla')
+    parser.add_argument('--estudiantes', type=int, default=50)
+    parser.add_argument('--staff', type=int, default=10)
+    parser.add_argument('--mezcla', default=MEZCLA_POR_DEFECTO, help='operacion=peso,... (ver MEZCLA_POR_DEFECTO)')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='Resultado en JSON (para comparar ejecuciones)')
+    args = parser.parse_args()
+
+    mock = entorno.iniciar()
+    stdout = sys.stdout
+    try:
+        escenario = Escenario(args.semilla)
+        sys.stdout = _Silencio()
+        preparar(escenario, args.estudiantes, args.staff, args.incidencias)
+        resultados, segundos = ejecutar(escenario, parsear_mezcla(args.mezcla), args.peticiones, args.concurrencia)
+    finally:
+        sys.stdout = stdout
+        mock.stop()
+
+    resumen = resumir(resultados, segundos)
+    if args.json:
+        print(json.dumps(resumen, indent=2))
+    else:
+        imprimir(resumen)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Entorno local para los benchmarks: DynamoDB y S3 simulados con moto.
+
+Las tablas y el bucket se crean a partir de la sección `resources` de serverless.yml, y las
+variables de entorno de `provider.environment` se definen igual que en Lambda, así que los
+handlers se ejecutan sin cambios.
+"""
+import io
+import os
+import re
+import sys
+import threading
+import contextlib
+import boto3
+import yaml
+from moto import mock_aws
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+STAGE = 'bench'
+_VARIABLE = re.compile(r"\$\{([^}]+)\}")
+
+
+def _resolver(valor, entorno):
+    if isinstance(valor, dict):
+        return {k: _resolver(v, entorno) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_resolver(v, entorno) for v in valor]
+    if not isinstance(valor, str):
+        return valor
+
+    def reemplazar(match):
+        expresion = match.group(1)
+        if expresion == 'sls:stage':
+            return STAGE
+        if expresion.startswith('self:provider.environment.'):
+            return entorno[expresion.split('.')[-1]]
+        if expresion.startswith('env:'):
+            nombre, _, defecto = expresion[4:].partition(',')
+            return os.environ.get(nombre.strip(), defecto.strip().strip("'"))
+        if expresion.startswith('param:'):
+            # Sin --param se usa el valor por defecto, como en un sls deploy sin parámetros
+            _, _, defecto = expresion.partition(',')
+            return defecto.strip().strip("'")
+        return match.group(0)
+
+    return _VARIABLE.sub(reemplazar, valor)
+
+
+def cargar_serverless():
+    with open(os.path.join(RAIZ, 'serverless.yml'), encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def configurar_entorno():
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+    config = cargar_serverless()
+    entorno = {}
+    for nombre, valor in config['provider']['environment'].items():
+        entorno[nombre] = _resolver(valor, entorno)
+    os.environ.update(entorno)
+    return config, entorno
+
+
+def crear_recursos(config, entorno):
+    dynamodb = boto3.client('dynamodb')
+    s3 = boto3.client('s3')
+    for recurso in config['resources']['Resources'].values():
+        propiedades = _resolver(recurso['Properties'], entorno)
+        if recurso['Type'] == 'AWS::DynamoDB::Table':
+            parametros = {k: v for k, v in propiedades.items() if k != 'TimeToLiveSpecification'}
+            if 'StreamSpecification' in parametros:
+                # CloudFormation no usa StreamEnabled, pero la API de DynamoDB sí
+                parametros['StreamSpecification'] = dict(parametros['StreamSpecification'], StreamEnabled=True)
+            dynamodb.create_table(**parametros)
+        elif recurso['Type'] == 'AWS::S3::Bucket':
+            s3.create_bucket(Bucket=propiedades['BucketName'])
+
+
+def _serializar_moto():
+    # Los backends de moto no son thread-safe: con varios hilos (lotes.py, carga.py) se atiende
+    # una llamada simulada a la vez. El código de los handlers sí corre en paralelo.
+    from moto.core.botocore_stubber import BotocoreStubber
+    if getattr(BotocoreStubber.process_request, 'serializado', False):
+        return
+    original = BotocoreStubber.process_request
+    lock = threading.Lock()
+
+    def process_request(self, request):
+        with lock:
+            return original(self, request)
+
+    process_request.serializado = True
+    BotocoreStubber.process_request = process_request
+
+
+def iniciar():
+    """Activa moto, crea tablas y bucket y devuelve el mock (llamar a .stop() al terminar)."""
+    _serializar_moto()
+    mock = mock_aws()
+    mock.start()
+    config, entorno = configurar_entorno()
+    crear_recursos(config, entorno)
+
+    import aws_clients
+    aws_clients.reiniciar()
+    return mock
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def evento(token=None, body=None, query=None, method=None, path=None):
+    # Evento con la forma que envía API Gateway con integration: lambda
+    return {
+        'headers': {'Authorization': f'Bearer {token}'} if token else {},
+        'body': body or {},
+        'query': query or {},
+        'method': method,
+        'requestPath': path
+    }
+
+
+def invocar(handler, evento, context=None):
+    # Ejecuta el handler sin volcar sus logs de CloudWatch en la salida del benchmark
+    with contextlib.redirect_stdout(io.StringIO()):
+        return handler(evento, context)
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from botocore.exceptions import ClientError
+import aws_clients
+import instrumentacion
+import serializacion
+
+# Cache de respuestas de lectura (historial, estadísticas) invalidado por versión.
+#
+# Cada escritura de incidencias, una vez hecha, suma 1 a un item 'version#incidencias' de
+# t_estadisticas (ver invalidar). Va fuera de la transacción de la escritura: si todas las
+# transacciones tocaran ese item, las concurrentes se cancelarían entre sí (TransactionConflict).
+# La clave de cache incluye la versión, leída con ConsistentRead, así que una respuesta
+# cacheada no sobrevive a una escritura: después de escribir, la versión cambia y la clave
+# anterior deja de usarse. Por eso invalidar() no es best-effort como los contadores: se
+# reintenta y, si aun así falla, el error llega al handler que escribió.
+#
+# Las respuestas que se calculan con lecturas consistentes se cachean siempre. Las que leen
+# índices secundarios (eventualmente consistentes) no se cachean durante VENTANA_INDICES_SEGUNDOS
+# después de un cambio de versión: el índice podría no reflejar todavía esa escritura.
+#
+# Niveles: memoria del contenedor (LRU) y, con CACHE_COMPARTIDA=1, una tabla DynamoDB
+# compartida entre contenedores; los dos con TTL, por si una escritura no llegó a subir la versión.
+CONTADOR_VERSION = 'version#incidencias'
+MAX_ENTRADAS = int(os.environ.get('CACHE_RESPUESTAS_MAX_ENTRADAS', '256'))
+TTL_COMPARTIDA_SEGUNDOS = int(os.environ.get('CACHE_RESPUESTAS_TTL_SEGUNDOS', '300'))
+VENTANA_INDICES_SEGUNDOS = float(os.environ.get('CACHE_RESPUESTAS_VENTANA_INDICES_SEGUNDOS', '5'))
+MAX_BYTES_COMPARTIDA = 350 * 1024  # Los items de DynamoDB no pueden pasar de 400 KB
+MAX_INTENTOS_INVALIDAR = 5
+BACKOFF_INVALIDAR_SEGUNDOS = 0.05
+# Errores transitorios que se reintentan además de los que ya reintenta botocore
+ERRORES_REINTENTABLES = {
+    'TransactionConflictException', 'ProvisionedThroughputExceededException', 'ThrottlingException',
+    'RequestLimitExceeded', 'InternalServerError', 'ServiceUnavailable'
+}
+
+_memoria = OrderedDict()  # clave -> (vence_en, respuesta)
+_lock = threading.Lock()
+_metricas = Counter()
+
+
+def invalidar():
+    """Sube la versión; se llama después de que la escritura (y sus contadores) terminó.
+
+    Reintenta los errores transitorios; si no lo logra propaga el ClientError, porque sin
+    la versión nueva se seguirían sirviendo respuestas anteriores a la escritura.
+    """
+    tabla = aws_clients.tabla('DYNAMODB_TABLE_ESTADISTICAS')
+    for intento in range(MAX_INTENTOS_INVALIDAR):
+        try:
+            tabla.update_item(
+                Key={'contador': CONTADOR_VERSION},
+                UpdateExpression='ADD version :uno SET cambiada_en = :ahora',
+                ExpressionAttributeValues={':uno': 1, ':ahora': int(time.time() * 1000)}
+            )
+            return
+        except ClientError as e:
+            if intento + 1 == MAX_INTENTOS_INVALIDAR or e.response['Error']['Code'] not in ERRORES_REINTENTABLES:
+                raise
+            time.sleep(random.uniform(0, BACKOFF_INVALIDAR_SEGUNDOS * 2 ** intento))
+
+
+def version_actual():
+    """(versión, epoch en ms del último cambio)."""
+    item = aws_clients.tabla('DYNAMODB_TABLE_ESTADISTICAS').get_item(
+        Key={'contador': CONTADOR_VERSION}, ConsistentRead=True
+    ).get('Item')
+    return (int(item['version']), int(item.get('cambiada_en', 0))) if item else (0, 0)
+
+
+def _compartida_activa():
+    return os.environ.get('CACHE_COMPARTIDA') == '1' and bool(os.environ.get('DYNAMODB_TABLE_CACHE'))
+
+
+def clave(nombre, parametros, version):
+    # Parámetros ya normalizados por el handler (defaults aplicados, sin valores vacíos)
+    parametros = {k: v for k, v in parametros.items() if v not in (None, '')}
+    texto = json.dumps([nombre, version, parametros], sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def _guardar_en_memoria(clave_cache, respuesta):
+    with _lock:
+        _memoria[clave_cache] = (time.time() + TTL_COMPARTIDA_SEGUNDOS, respuesta)
+        _memoria.move_to_end(clave_cache)
+        while len(_memoria) > MAX_ENTRADAS:
+            _memoria.popitem(last=False)
+
+
+def _leer_compartida(clave_cache):
+    item = aws_clients.tabla('DYNAMODB_TABLE_CACHE').get_item(Key={'clave': clave_cache}).get('Item')
+    # El TTL de DynamoDB borra con retraso: se descartan los items vencidos que sigan ahí
+    if item is None or item['expires_at'] < time.time():
+        return None
+    return json.loads(item['respuesta'])
+
+
+def _guardar_compartida(clave_cache, respuesta):
+    texto = serializacion.dumps(respuesta)
+    if len(texto) > MAX_BYTES_COMPARTIDA:
+        return
+    aws_clients.tabla('DYNAMODB_TABLE_CACHE').put_item(Item={
+        'clave': clave_cache,
+        'respuesta': texto,
+        'expires_at': int(time.time()) + TTL_COMPARTIDA_SEGUNDOS  # TTL de DynamoDB
+    })
+
+
+def metricas():
+    with _lock:
+        consultas = sum(_metricas.values())
+        aciertos = _metricas['hit_memoria'] + _metricas['hit_compartida']
+        return dict(_metricas, consultas=consultas, tasa_aciertos=round(aciertos / consultas, 3) if consultas else 0)
+
+
+def _registrar(nombre, resultado):
+    with _lock:
+        _metricas[resultado] += 1
+    # Va en la línea de métricas de la invocación (ver instrumentacion.py)
+    instrumentacion.anotar('cache_respuestas', {'nombre': nombre, 'resultado': resultado, 'tasa_aciertos': metricas()['tasa_aciertos']})
+
+
+def leer(nombre, parametros, calcular, consistente=True):
+    """Devuelve la respuesta cacheada para (nombre, parametros) o la calcula con calcular().
+
+    Solo se cachean las respuestas con statusCode 200. consistente=False indica que calcular()
+    lee índices secundarios (ver VENTANA_INDICES_SEGUNDOS).
+    """
+    version, cambiada_en = version_actual()
+    clave_cache = clave(nombre, parametros, version)
+
+    respuesta = None
+    with _lock:
+        entrada = _memoria.get(clave_cache)
+        if entrada is not None:
+            vence_en, respuesta = entrada
+            if time.time() >= vence_en:
+                del _memoria[clave_cache]
+                respuesta = None
+            else:
+                _memoria.move_to_end(clave_cache)
+    if respuesta is not None:
+        _registrar(nombre, 'hit_memoria')
+        return respuesta
+
+    if _compartida_activa():
+        respuesta = _leer_compartida(clave_cache)
+        if respuesta is not None:
+            _guardar_en_memoria(clave_cache, respuesta)
+            _registrar(nombre, 'hit_compartida')
+            return respuesta
+
+    respuesta = calcular()
+    _registrar(nombre, 'miss')
+    reciente = time.time() * 1000 - cambiada_en < VENTANA_INDICES_SEGUNDOS * 1000
+    if respuesta.get('statusCode') == 200 and (consistente or not reciente):
+        _guardar_en_memoria(clave_cache, respuesta)
+        if _compartida_activa():
+            _guardar_compartida(clave_cache, respuesta)
+    return respuesta
+
+
+def limpiar():
+    with _lock:
+        _memoria.clear()
+        _metricas.clear()
@@ -1,39 +1,145 @@
-import boto3
+import auth
+import cache_respuestas
+import estadisticas
+import notificaciones
 import os
-from datetime import datetime
+import texto
+from datetime import datetime, timedelta
 import uuid
 import json
-
-def create_incident(event, context):
-    print("Event recibido en create_incident:", event)  # Log en CloudWatch
-
+import instrumentacion
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+import aws_clients
+
+# Reportes repetidos: cuando algo se rompe en un espacio compartido llegan muchos reportes
+# iguales en pocos minutos. Si ya hay una incidencia abierta del mismo tipo en la misma
+# ubicación (normalizada, ver texto.py) creada dentro de la ventana, el reporte se suma a
+# ella (reportes + 1 y el usuario en reportantes) en lugar de crear otra incidencia y otra
+# notificación. La búsqueda usa un índice disperso por clave_dedup, no un scan.
+INDICE_DEDUP = 'clave_dedup-fecha_creacion-index'
+VENTANA_DEDUP_MINUTOS = int(os.environ.get('DEDUP_VENTANA_MINUTOS', '30'))
+
+# Campos de texto de una incidencia: se normalizan (texto.py) para la clave de duplicados, las
+# estadísticas y el índice de búsqueda, así que tienen que ser strings
+CAMPOS_OBLIGATORIOS = ('descripcion', 'tipo_incidencia', 'ubicacion', 'urgencia')
+CAMPOS_OPCIONALES = ('gravedad',)
+# Longitud máxima de cada campo, muy por debajo del límite de 400 KB por item de DynamoDB
+MAX_LONGITUD = {'descripcion': 2000}
+MAX_LONGITUD_POR_DEFECTO = 200
+
+
+def clave_dedup(tipo_incidencia, ubicacion):
+    return f'{texto.normalizar(tipo_incidencia)}#{texto.normalizar(ubicacion)}'
+
+
+def buscar_abierta(clave):
+    """ID de la incidencia abierta más reciente con esta clave dentro de la ventana, o None."""
+    corte = (datetime.now() - timedelta(minutes=VENTANA_DEDUP_MINUTOS)).strftime('%Y-%m-%d %H:%M:%S')
+    response = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').query(
+        IndexName=INDICE_DEDUP,
+        KeyConditionExpression=Key('clave_dedup').eq(clave) & Key('fecha_creacion').gte(corte),
+        # El índice puede tardar un poco en reflejar que una incidencia se resolvió
+        FilterExpression=Attr('fase').ne('resuelta'),
+        ScanIndexForward=False
+    )
+    return response['Items'][0]['incidente_id'] if response['Items'] else None
+
+
+def sumar_reporte(incidente_id, user_id):
+    """Suma el reporte a la incidencia; False si ya no está abierta (hay que crear una nueva).
+
+    Es un update_item condicional y no una transacción: en una ráfaga de reportes iguales
+    todos escriben el mismo item, y DynamoDB serializa los updates sin cancelarlos.
+    """
+    incidencias_table = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS')
     try:
-        # Obtener el token desde el header Authorization (formato Bearer <token>)
-        token = event['headers'].get('Authorization').replace('Bearer ', '')  
-        if not token:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'Faltan datos en los headers'})  # Convertir a JSON
-            }
-
-        # Obtener el nombre de la tabla de tokens desde las variables de entorno
-        tokens_table_name = os.environ['DYNAMODB_TABLE_TOKENS']
-
-        dynamodb = boto3.resource('dynamodb')
-        tokens_table = dynamodb.Table(tokens_table_name)
-
-        # Buscar el token en la tabla de tokens
-        response = tokens_table.query(
-            KeyConditionExpression=boto3.dynamodb.conditions.Key('tenant_id').eq(token)
+        notificaciones.con_reintentos(
+            incidencias_table.update_item,
+            Key={'incidente_id': incidente_id},
+            UpdateExpression='SET reportes = reportes + :uno, reportantes = list_append(reportantes, :usuarios)',
+            # clave_dedup solo existe mientras la incidencia está abierta
+            ConditionExpression='attribute_exists(clave_dedup) AND NOT contains(reportantes, :user_id)',
+            ExpressionAttributeValues={':uno': 1, ':usuarios': [user_id], ':user_id': user_id}
         )
-
-        if 'Items' not in response or len(response['Items']) == 0:
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # Si el mismo usuario ya la había reportado no se cuenta dos veces
+        actual = incidencias_table.get_item(Key={'incidente_id': incidente_id}, ConsistentRead=True).get('Item')
+        return actual is not None and 'clave_dedup' in actual and user_id in actual.get('reportantes', [])
+    cache_respuestas.invalidar()
+    return True
+
+
+def validar_incidencia(datos):
+    """Mensaje de error si los datos recibidos no sirven para crear una incidencia, o None."""
+    if not isinstance(datos, dict) or not all(datos.get(campo) for campo in CAMPOS_OBLIGATORIOS):
+        return 'Faltan datos en el cuerpo de la solicitud'
+    for campo in CAMPOS_OBLIGATORIOS + CAMPOS_OPCIONALES:
+        if campo in datos and not isinstance(datos[campo], str):
+            return f'El campo {campo} debe ser texto'
+        maximo = MAX_LONGITUD.get(campo, MAX_LONGITUD_POR_DEFECTO)
+        if len(datos.get(campo) or '') > maximo:
+            return f'El campo {campo} puede tener como máximo {maximo} caracteres'
+    return None
+
+
+def construir_incidencia(datos, user_id, user_role):
+    """Incidencia y notificación a partir de los datos recibidos; (None, None) si no son válidos (ver validar_incidencia)."""
+    if validar_incidencia(datos) is not None:
+        return None, None
+
+    descripcion = datos['descripcion']
+    tipo_incidencia = datos['tipo_incidencia']
+    ubicacion = datos['ubicacion']
+    urgencia = datos['urgencia']
+
+    # Generar un ID único para la incidencia
+    incidente_id = str(uuid.uuid4())
+
+    # Datos de la incidencia
+    incidencia_data = {
+        'incidente_id': incidente_id,
+        'descripcion': descripcion,
+        'tipo_incidencia': tipo_incidencia,
+        'ubicacion': ubicacion,
+        'urgencia': urgencia,
+        'fecha_creacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'fase': 'pendiente',  # Fase inicial
+        'gravedad': datos.get('gravedad', 'media'),  # Usamos "media" por defecto
+        'reportado_por': user_id,  # Agregamos el usuario que reportó la incidencia
+        'reportes': 1,
+        'reportantes': [user_id],
+        'clave_dedup': clave_dedup(tipo_incidencia, ubicacion)  # Se quita al resolverla (ver update_incident.py)
+    }
+
+    # Notificación: dependiendo de si es estudiante o no
+    if user_role == 'estudiante':
+        # El estudiante será notificado solo de la incidencia que creó
+        mensaje = f'Incidencia creada por usted: {tipo_incidencia} en {ubicacion}. Gravedad: {incidencia_data["gravedad"]}.'
+        destinatario = user_id  # Notificación al propio usuario
+    else:
+        # Los roles no estudiantes reciben una notificación por cada incidencia creada
+        mensaje = f'Nueva incidencia generada: {tipo_incidencia} en {ubicacion}. Gravedad: {incidencia_data["gravedad"]}.'
+        destinatario = user_role  # Notificación a todos los usuarios con este rol
+
+    notificacion_data = notificaciones.construir_notificacion(incidente_id, mensaje, destinatario)
+
+    return incidencia_data, notificacion_data
+
+@instrumentacion.instrumentar
+def create_incident(event, context):
+    try:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
             return {
-                'statusCode': 403,
-                'body': json.dumps({'error': 'Token no válido o no encontrado'})  # Convertir a JSON
+                'statusCode': e.status_code,
+                'body': json.dumps({'error': e.mensaje})  # Convertir a JSON
             }
 
-        token_item = response['Items'][0]
         user_role = token_item['role']
         user_id = token_item['user_id']  # Se asume que el token tiene un campo `user_id`
 
@@ -50,78 +156,39 @@ def create_incident(event, context):
         if isinstance(body, str):  # Si el cuerpo es un string JSON, lo convertimos
             body = json.loads(body)
 
-        descripcion = body.get('descripcion')
-        tipo_incidencia = body.get('tipo_incidencia')
-        ubicacion = body.get('ubicacion')
-        urgencia = body.get('urgencia')
-
-        if not descripcion or not tipo_incidencia or not ubicacion or not urgencia:
+        error = validar_incidencia(body)
+        if error is not None:
             return {
                 'statusCode': 400,
-                'body': json.dumps({'error': 'Faltan datos en el cuerpo de la solicitud'})  # Convertir a JSON
+                'body': json.dumps({'error': error})  # Convertir a JSON
             }
+        incidencia_data, notificacion_data = construir_incidencia(body, user_id, user_role)
 
-        # Generar un ID único para la incidencia
-        incidente_id = str(uuid.uuid4())
-
-        # Almacenar la incidencia en DynamoDB
-        incidencias_table = dynamodb.Table(os.environ['DYNAMODB_TABLE_INCIDENCIAS'])
-        incidencia_data = {
-            'incidente_id': incidente_id,
-            'descripcion': descripcion,
-            'tipo_incidencia': tipo_incidencia,
-            'ubicacion': ubicacion,
-            'urgencia': urgencia,
-            'fecha_creacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'fase': 'pendiente',  # Fase inicial
-            'gravedad': body.get('gravedad', 'media'),  # Usamos "media" por defecto
-            'reportado_por': user_id  # Agregamos el usuario que reportó la incidencia
-        }
-
-        incidencias_table.put_item(Item=incidencia_data)
-
-        # Crear notificación
-        notificacion_id = str(uuid.uuid4())
-        fecha_actualizacion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Notificación: dependiendo de si es estudiante o no
-        if user_role == 'estudiante':
-            # El estudiante será notificado solo de la incidencia que creó
-            mensaje = f'Incidencia creada por usted: {tipo_incidencia} en {ubicacion}. Gravedad: {incidencia_data["gravedad"]}.'
-            destinatario = user_id  # Notificación al propio usuario
-        else:
-            # Los roles no estudiantes reciben una notificación por cada incidencia creada
-            mensaje = f'Nueva incidencia generada: {tipo_incidencia} en {ubicacion}. Gravedad: {incidencia_data["gravedad"]}.'
-            destinatario = user_role  # Notificación a todos los usuarios con este rol
-
-        notificacion_data = {
-            'notificacion_id': notificacion_id,
-            'incidente_id': incidente_id,
-            'mensaje': mensaje,
-            'fecha': fecha_actualizacion,
-            'status': 'pendiente',
-            'destinatario': destinatario  # Agregamos el destinatario (usuario o rol)
-        }
-
-        # Almacenar la notificación en DynamoDB
-        notificaciones_table = dynamodb.Table(os.environ['DYNAMODB_TABLE_NOTIFICACIONES'])
-        notificaciones_table.put_item(Item=notificacion_data)
-
-        # Guardar la notificación en un archivo S3
-        s3 = boto3.client('s3')
-        bucket_name = os.environ['NOTIFICACIONES_BUCKET_NAME']
-        file_name = f"notificaciones/{notificacion_id}.json"
-        
-        # Convertir la notificación a JSON
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=file_name,
-            Body=json.dumps(notificacion_data),  # Convertido a JSON
-            ContentType='application/json'
-        )
-        
-        # Imprimir el JSON de la notificación
-        print(f'Notificación generada: {json.dumps(notificacion_data)}')
+        # Un reporte igual a una incidencia abierta reciente se suma a ella, sin nueva notificación
+        existente = buscar_abierta(incidencia_data['clave_dedup'])
+        if existente and sumar_reporte(existente, user_id):
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'message': 'Ya hay una incidencia abierta igual; se agregó su reporte', 'incidente_id': existente, 'duplicada': True})  # Convertir a JSON
+            }
+        incidente_id = incidencia_data['incidente_id']
+
+        # Incidencia + intención de notificar en una sola transacción; la notificación en DynamoDB
+        # y S3 la crea procesar_notificaciones de forma asíncrona (ver notificaciones.py). Los
+        # contadores y la versión del cache se actualizan después, fuera de la transacción; los
+        # contadores son best-effort, la versión no (ver estadisticas.py y cache_respuestas.py)
+        notificaciones.transaccion([
+            {
+                'Put': {
+                    'TableName': os.environ['DYNAMODB_TABLE_INCIDENCIAS'],
+                    'Item': incidencia_data,
+                    'ConditionExpression': 'attribute_not_exists(incidente_id)'
+                }
+            },
+            notificaciones.put_outbox(notificacion_data, indexar='creacion')
+        ])
+        estadisticas.aplicar(estadisticas.updates_creacion([incidencia_data]))
+        cache_respuestas.invalidar()
 
         return {
             'statusCode': 200,
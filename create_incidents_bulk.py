@@ -0,0 +1,145 @@
+import auth
+import aws_clients
+import cache_respuestas
+import estadisticas
+import lotes
+import notificaciones
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from create_incident import buscar_abierta, construir_incidencia, sumar_reporte, validar_incidencia
+import instrumentacion
+
+MAX_INCIDENCIAS = 500
+HILOS_ESCRITURA = 4
+
+@instrumentacion.instrumentar
+def create_incidents_bulk(event, context):
+    try:
+        # Un solo chequeo del token para todo el lote
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
+            return {
+                'statusCode': e.status_code,
+                'body': e.mensaje
+            }
+
+        user_role = token_item['role']
+        user_id = token_item['user_id']
+
+        # Verificar si el usuario es un estudiante
+        if user_role != 'estudiante':
+            return {
+                'statusCode': 403,
+                'body': {'error': 'Solo los estudiantes pueden crear incidencias'}
+            }
+
+        body = event['body']
+        if isinstance(body, str):  # Si el cuerpo es un string JSON, lo convertimos
+            body = json.loads(body)
+
+        incidencias = body.get('incidencias')
+        if not isinstance(incidencias, list) or not incidencias:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Faltan las incidencias en el cuerpo de la solicitud'}
+            }
+        if len(incidencias) > MAX_INCIDENCIAS:
+            return {
+                'statusCode': 400,
+                'body': {'error': f'Se pueden crear como máximo {MAX_INCIDENCIAS} incidencias por solicitud'}
+            }
+
+        # Validar todo antes de escribir; las inválidas se reportan y no se escriben
+        tabla_incidencias = os.environ['DYNAMODB_TABLE_INCIDENCIAS']
+        tabla_outbox = os.environ['DYNAMODB_TABLE_OUTBOX']
+        resultados = []
+        validas = []
+        for indice, datos in enumerate(incidencias):
+            error = validar_incidencia(datos)
+            if error is not None:
+                resultados.append({'indice': indice, 'status': 'error', 'error': error})
+                continue
+            incidencia_data, notificacion_data = construir_incidencia(datos, user_id, user_role)
+            resultados.append({'indice': indice, 'status': 'creada', 'incidente_id': incidencia_data['incidente_id']})
+            validas.append((resultados[-1], incidencia_data, notificacion_data))
+
+        # Reportes repetidos, igual que en create_incident.py: una consulta por clave distinta del
+        # lote. Si hay una incidencia abierta igual el reporte se suma a ella; si no, se crea solo
+        # la primera incidencia de cada clave y las demás del lote se informan como duplicadas de
+        # esa (son todas del mismo usuario, así que no suman reportes)
+        claves = list(dict.fromkeys(incidencia_data['clave_dedup'] for _, incidencia_data, _ in validas))
+        with ThreadPoolExecutor(max_workers=HILOS_ESCRITURA) as executor:
+            abiertas = dict(zip(claves, executor.map(buscar_abierta, claves)))
+
+        escrituras = []
+        creadas_por_id = {}
+        outbox_por_id = {}
+        destino_por_clave = {}
+        for resultado, incidencia_data, notificacion_data in validas:
+            clave = incidencia_data['clave_dedup']
+            if clave not in destino_por_clave:
+                existente = abiertas[clave]
+                if existente and sumar_reporte(existente, user_id):
+                    destino_por_clave[clave] = existente
+                else:
+                    destino_por_clave[clave] = incidencia_data['incidente_id']
+                    escrituras.append((tabla_incidencias, incidencia_data))
+                    creadas_por_id[incidencia_data['incidente_id']] = incidencia_data
+                    outbox_por_id[incidencia_data['incidente_id']] = notificaciones.put_outbox(notificacion_data, indexar='creacion')['Put']['Item']
+                    continue
+            resultado.update(status='duplicada', incidente_id=destino_por_clave[clave])
+
+        # BatchWriteItem (25 escrituras por llamada) con reintentos de los items no procesados;
+        # un lote que falla con un error de DynamoDB se informa como no escrito (ver lotes.py).
+        # BatchWriteItem no es atómico: primero se escriben las incidencias y después el outbox
+        # solo de las que se escribieron, así nunca hay una notificación de una incidencia que no
+        # existe. Si el outbox de una incidencia falla, la incidencia se borra (la tabla de
+        # incidencias no tiene stream, así que no dispara nada) y se informa como error: al
+        # reintentar el cliente no queda un duplicado.
+        fallidas = lotes.escribir_en_lotes(escrituras, hilos=HILOS_ESCRITURA)
+        ids_fallidos = {item['incidente_id'] for _, item in fallidas}
+        fallidas = lotes.escribir_en_lotes(
+            [(tabla_outbox, outbox) for incidente_id, outbox in outbox_por_id.items() if incidente_id not in ids_fallidos],
+            hilos=HILOS_ESCRITURA
+        )
+        sin_outbox = {item['notificacion']['incidente_id'] for _, item in fallidas}
+        incidencias_table = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS')
+        for incidente_id in sin_outbox:
+            incidencias_table.delete_item(Key={'incidente_id': incidente_id})
+        ids_fallidos |= sin_outbox
+
+        for resultado in resultados:
+            if resultado.get('incidente_id') in ids_fallidos:
+                resultado['status'] = 'error'
+                resultado['error'] = 'No se pudo escribir la incidencia, reintente'
+
+        # Contadores: un ADD por contador para todo el lote (BatchWriteItem no admite ADD), y la
+        # versión del cache después de escribir para invalidar las respuestas cacheadas (también
+        # si las incidencias escritas se borraron después, por si alguna se llegó a leer)
+        escritas = [incidencia for incidente_id, incidencia in creadas_por_id.items() if incidente_id not in ids_fallidos]
+        if escritas:
+            estadisticas.aplicar(estadisticas.updates_creacion(escritas))
+        if creadas_por_id:
+            cache_respuestas.invalidar()
+
+        creadas = sum(1 for resultado in resultados if resultado['status'] == 'creada')
+        duplicadas = sum(1 for resultado in resultados if resultado['status'] == 'duplicada')
+        return {
+            'statusCode': 200,
+            'body': {
+                'message': f'{creadas} de {len(incidencias)} incidencias creadas',
+                'creadas': creadas,
+                'duplicadas': duplicadas,
+                'fallidas': len(incidencias) - creadas - duplicadas,
+                'resultados': resultados
+            }
+        }
+
+    except Exception as e:
+        print("Error en create_incidents_bulk:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
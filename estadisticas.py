@@ -0,0 +1,161 @@
+import os
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+import aws_clients
+import texto
+
+# Contadores de incidencias mantenidos en cada escritura (ADD), para no recorrer la tabla.
+#
+# Cada contador es un item de t_estadisticas con un atributo por categoría ('fase#pendiente',
+# 'urgencia#alta', ...):
+#   total#<shard>            estado actual: incidencias por fase y creadas por tipo/urgencia/gravedad
+#   dia#<YYYY-MM-DD>#<shard> actividad del día: creadas (por categoría) y entradas a cada fase
+# Las escrituras se reparten al azar entre ESTADISTICAS_SHARDS items por contador y la lectura
+# suma los shards. Los ADD se aplican después de la escritura de la incidencia, no dentro de
+# su transacción: con los contadores en la transacción, dos escrituras concurrentes que caen
+# en el mismo shard se cancelan entre sí (TransactionConflict). Si un ADD falla, la cuenta
+# queda corrida hasta el próximo rebuild_stats.py.
+#
+# Cada categoría es un atributo del item, así que tienen que ser pocas: tipo_incidencia,
+# urgencia y gravedad son texto libre y se cuentan normalizados; los valores que no están en
+# la lista conocida van a 'otro' (ver categoria).
+DIMENSIONES = ('fase', 'tipo_incidencia', 'urgencia', 'gravedad')
+SHARDS = int(os.environ.get('ESTADISTICAS_SHARDS', '4'))
+MAX_DIAS = 31
+NIVELES = ('alta', 'media', 'baja')
+CATEGORIAS = {
+    'urgencia': NIVELES,
+    'gravedad': NIVELES,
+    'tipo_incidencia': tuple(
+        texto.normalizar(tipo) for tipo in os.environ.get('ESTADISTICAS_TIPOS', 'equipo,infraestructura,limpieza,seguridad').split(',') if tipo.strip()
+    )
+}
+OTRA_CATEGORIA = 'otro'
+
+
+def clave_total(shard):
+    return f'total#{shard}'
+
+
+def clave_dia(dia, shard):
+    return f'dia#{dia}#{shard}'
+
+
+def categoria(dimension, valor):
+    """Nombre con el que se cuenta un valor (la fase la fija el código y no se toca)."""
+    conocidas = CATEGORIAS.get(dimension)
+    if conocidas is None:
+        return valor
+    valor = texto.normalizar(valor)
+    return valor if valor in conocidas else OTRA_CATEGORIA
+
+
+def _update(contador, incrementos):
+    # Elemento Update (ver aplicar) con un ADD por atributo
+    incrementos = {atributo: n for atributo, n in incrementos.items() if n}
+    nombres = {f'#c{i}': atributo for i, atributo in enumerate(incrementos)}
+    valores = {f':v{i}': n for i, n in enumerate(incrementos.values())}
+    return {
+        'Update': {
+            'TableName': os.environ['DYNAMODB_TABLE_ESTADISTICAS'],
+            'Key': {'contador': contador},
+            'UpdateExpression': 'ADD ' + ', '.join(f'#c{i} :v{i}' for i in range(len(incrementos))),
+            'ExpressionAttributeNames': nombres,
+            'ExpressionAttributeValues': valores
+        }
+    }
+
+
+def _incrementos_creacion(incidencias):
+    incrementos = Counter()
+    for incidencia in incidencias:
+        incrementos['total'] += 1
+        for dimension in DIMENSIONES:
+            incrementos[f'{dimension}#{categoria(dimension, incidencia[dimension])}'] += 1
+    return incrementos
+
+
+def updates_creacion(incidencias):
+    """Updates de los contadores para incidencias recién creadas (agrupados por día de creación)."""
+    por_dia = {}
+    for incidencia in incidencias:
+        por_dia.setdefault(incidencia['fecha_creacion'][:10], []).append(incidencia)
+
+    updates = [_update(clave_total(random.randrange(SHARDS)), _incrementos_creacion(incidencias))]
+    for dia, del_dia in por_dia.items():
+        updates.append(_update(clave_dia(dia, random.randrange(SHARDS)), _incrementos_creacion(del_dia)))
+    return updates
+
+
+def updates_cambio_fase(fase_anterior, nueva_fase, fecha):
+    return [
+        _update(clave_total(random.randrange(SHARDS)), {f'fase#{fase_anterior}': -1, f'fase#{nueva_fase}': 1}),
+        _update(clave_dia(fecha[:10], random.randrange(SHARDS)), {f'fase#{nueva_fase}': 1})
+    ]
+
+
+def aplicar(updates):
+    """Aplica los updates uno por uno, después de que la escritura de la incidencia terminó.
+
+    Un update que falla se registra y no corta el resto: la incidencia ya está escrita y el
+    contador se corrige con rebuild_stats.py.
+    """
+    client = aws_clients.dynamodb().meta.client
+    for update in updates:
+        try:
+            client.update_item(**update['Update'])
+        except ClientError as e:
+            print(f"No se pudo actualizar el contador {update['Update']['Key']}:", str(e))  # Log en CloudWatch
+
+
+def _sumar(destino, item):
+    for atributo, valor in item.items():
+        if atributo == 'contador':
+            continue
+        if '#' not in atributo:
+            destino[atributo] = destino.get(atributo, 0) + int(valor)
+            continue
+        dimension, categoria = atributo.split('#', 1)
+        por_categoria = destino.setdefault(dimension, {})
+        por_categoria[categoria] = por_categoria.get(categoria, 0) + int(valor)
+
+
+def dias_entre(desde, hasta):
+    inicio = datetime.strptime(desde, '%Y-%m-%d')
+    fin = datetime.strptime(hasta, '%Y-%m-%d')
+    return [(inicio + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((fin - inicio).days + 1)]
+
+
+def leer(dias=()):
+    """Suma los shards del contador total y de los días pedidos con batch_get_item (100 claves por llamada).
+
+    Lectura consistente: get_incidents_stats cachea el resultado con la versión actual.
+    """
+    tabla = os.environ['DYNAMODB_TABLE_ESTADISTICAS']
+    claves = [clave_total(shard) for shard in range(SHARDS)]
+    claves += [clave_dia(dia, shard) for dia in dias for shard in range(SHARDS)]
+
+    items = []
+    for i in range(0, len(claves), 100):
+        request_items = {tabla: {'Keys': [{'contador': clave} for clave in claves[i:i + 100]], 'ConsistentRead': True}}
+        while request_items:
+            response = aws_clients.dynamodb().batch_get_item(RequestItems=request_items)
+            items.extend(response['Responses'].get(tabla, []))
+            request_items = response.get('UnprocessedKeys')
+
+    total = {}
+    por_dia = {dia: {} for dia in dias}
+    for item in items:
+        if item['contador'].startswith('total#'):
+            _sumar(total, item)
+        else:
+            _sumar(por_dia[item['contador'].split('#')[1]], item)
+
+    # Las categorías que quedaron en cero (p. ej. una fase por la que ya no pasa nada) no se muestran
+    for resumen in [total] + list(por_dia.values()):
+        for dimension, por_categoria in resumen.items():
+            if isinstance(por_categoria, dict):
+                resumen[dimension] = {categoria: n for categoria, n in por_categoria.items() if n}
+    return total, por_dia
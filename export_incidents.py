@@ -0,0 +1,283 @@
+"""Exportación completa de incidencias con un scan paralelo (Segment/TotalSegments).
+
+Como endpoint (POST /incidents/export) cada segmento escribe partes NDJSON gzip en el bucket
+de notificaciones, bajo exportaciones/<export_id>/, y guarda un checkpoint después de cada
+parte. Si la Lambda se queda sin tiempo la respuesta trae completo=False y basta con volver a
+llamar con el mismo export_id para continuar desde los checkpoints.
+
+Las incidencias que archive_incidents.py pasó a S3 también se exportan, una parte por día
+archivado (con su propio checkpoint). Una incidencia que se está archivando justo durante la
+exportación puede aparecer dos veces (en la tabla y en el archivo): se reconoce por incidente_id.
+
+Como script escribe NDJSON en la salida estándar (o en S3 con --s3; --export-id reanuda con
+los segmentos con los que empezó):
+    python export_incidents.py --segmentos 8 > incidencias.ndjson
+"""
+import os
+import sys
+import json
+import uuid
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+import auth
+import aws_clients
+import archive_incidents
+import archivo_s3
+import lotes
+import instrumentacion
+import serializacion
+
+SEGMENTOS_POR_DEFECTO = 8
+MAX_SEGMENTOS = 64
+REGISTROS_POR_PARTE = 5000  # Memoria acotada: cada hilo guarda como máximo una parte
+MARGEN_MS = 3000  # Tiempo que se reserva para responder antes del timeout de la Lambda
+PREFIJO = 'exportaciones'
+
+
+def _bucket():
+    return os.environ['NOTIFICACIONES_BUCKET_NAME']
+
+
+def _leer_json(key):
+    try:
+        return json.loads(aws_clients.s3().get_object(Bucket=_bucket(), Key=key)['Body'].read())
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
+
+
+def _escribir_json(key, datos):
+    aws_clients.s3().put_object(Bucket=_bucket(), Key=key, Body=serializacion.dumps(datos), ContentType='application/json')
+
+
+def _clave_checkpoint(export_id, segmento):
+    return f'{PREFIJO}/{export_id}/checkpoints/segmento-{segmento:03d}.json'
+
+
+def iniciar_exportacion(segmentos, solicitado_por):
+    """Crea una exportación nueva y guarda con cuántos segmentos se hace (export.json)."""
+    export_id = str(uuid.uuid4())
+    _escribir_json(f'{PREFIJO}/{export_id}/export.json', {'segmentos': segmentos, 'solicitado_por': solicitado_por})
+    return export_id
+
+
+def segmentos_de(export_id):
+    """Segmentos con los que empezó la exportación (los checkpoints dependen de eso), o None si no existe."""
+    inicio = _leer_json(f'{PREFIJO}/{export_id}/export.json')
+    return inicio['segmentos'] if inicio else None
+
+
+def exportar_segmento(export_id, segmento, segmentos, sin_tiempo):
+    """Exporta un segmento a partir de su checkpoint; devuelve el checkpoint final."""
+    checkpoint = _leer_json(_clave_checkpoint(export_id, segmento)) or {'parte': 0, 'registros': 0, 'last_evaluated_key': None, 'completo': False}
+    if checkpoint['completo']:
+        return checkpoint
+
+    client = aws_clients.dynamodb().meta.client
+    pedido = {'TableName': os.environ['DYNAMODB_TABLE_INCIDENCIAS'], 'Segment': segmento, 'TotalSegments': segmentos}
+    if checkpoint['last_evaluated_key']:
+        pedido['ExclusiveStartKey'] = checkpoint['last_evaluated_key']
+
+    parte = []
+    while not sin_tiempo():
+        response = client.scan(**pedido)
+        parte.extend(response['Items'])
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if len(parte) >= REGISTROS_POR_PARTE or last_evaluated_key is None:
+            # El nombre de la parte es fijo: al reanudar se sobrescribe la misma, sin duplicados
+            if parte:
+                aws_clients.s3().put_object(
+                    Bucket=_bucket(),
+                    Key=f"{PREFIJO}/{export_id}/segmento-{segmento:03d}-parte-{checkpoint['parte']:05d}.ndjson.gz",
+                    Body=archivo_s3.comprimir_ndjson(parte),
+                    ContentType='application/x-ndjson',
+                    ContentEncoding='gzip'
+                )
+                checkpoint['parte'] += 1
+                checkpoint['registros'] += len(parte)
+                parte = []
+            checkpoint['last_evaluated_key'] = last_evaluated_key
+            checkpoint['completo'] = last_evaluated_key is None
+            _escribir_json(_clave_checkpoint(export_id, segmento), checkpoint)
+            if checkpoint['completo']:
+                break
+        pedido['ExclusiveStartKey'] = last_evaluated_key
+
+    # Si se acabó el tiempo, lo leído después del último checkpoint se vuelve a leer al reanudar
+    return checkpoint
+
+
+def exportar_archivo(export_id, sin_tiempo):
+    """Exporta las incidencias archivadas en S3, una parte por día; devuelve el checkpoint final."""
+    clave_checkpoint = f'{PREFIJO}/{export_id}/checkpoints/archivo.json'
+    checkpoint = _leer_json(clave_checkpoint) or {'fechas': [], 'parte': 0, 'registros': 0, 'completo': False}
+    if checkpoint['completo']:
+        return checkpoint
+
+    for fecha in sorted(archive_incidents.particiones_en_rango(None, None)):
+        if fecha in checkpoint['fechas']:
+            continue
+        if sin_tiempo():
+            return checkpoint
+        incidencias = archive_incidents.leer_particion(fecha)  # Sin duplicados dentro del día
+        if incidencias:
+            aws_clients.s3().put_object(
+                Bucket=_bucket(),
+                Key=f'{PREFIJO}/{export_id}/archivo-{fecha}.ndjson.gz',
+                Body=archivo_s3.comprimir_ndjson(incidencias),
+                ContentType='application/x-ndjson',
+                ContentEncoding='gzip'
+            )
+            checkpoint['parte'] += 1
+            checkpoint['registros'] += len(incidencias)
+        checkpoint['fechas'].append(fecha)
+        _escribir_json(clave_checkpoint, checkpoint)
+
+    checkpoint['completo'] = True
+    _escribir_json(clave_checkpoint, checkpoint)
+    return checkpoint
+
+
+def exportar_a_s3(export_id, segmentos, sin_tiempo=lambda: False):
+    # Los segmentos del scan y el archivo en paralelo
+    with ThreadPoolExecutor(max_workers=segmentos + 1) as executor:
+        archivo = executor.submit(exportar_archivo, export_id, sin_tiempo)
+        checkpoints = list(executor.map(lambda s: exportar_segmento(export_id, s, segmentos, sin_tiempo), range(segmentos)))
+        checkpoint_archivo = archivo.result()
+
+    completo = checkpoint_archivo['completo'] and all(checkpoint['completo'] for checkpoint in checkpoints)
+    resumen = {
+        'export_id': export_id,
+        'segmentos': segmentos,
+        'completo': completo,
+        'registros': sum(checkpoint['registros'] for checkpoint in checkpoints) + checkpoint_archivo['registros'],
+        'registros_archivo': checkpoint_archivo['registros'],
+        'partes': sum(checkpoint['parte'] for checkpoint in checkpoints) + checkpoint_archivo['parte'],
+        'prefijo': f'{PREFIJO}/{export_id}/'
+    }
+    if completo:
+        _escribir_json(f'{PREFIJO}/{export_id}/manifest.json', resumen)
+    return resumen
+
+
+def exportar_ndjson(salida, segmentos):
+    """Escribe todas las incidencias como NDJSON en `salida`; los hilos pasan páginas por una cola acotada.
+
+    Después de la tabla se escriben las incidencias archivadas, día por día.
+    """
+    paginas = queue.Queue(maxsize=segmentos * 2)
+    resultado = {}
+
+    def escanear():
+        try:
+            resultado['registros'] = lotes.escaneo_paralelo(
+                os.environ['DYNAMODB_TABLE_INCIDENCIAS'], segmentos, lambda segmento, items: paginas.put(items)
+            )
+        except Exception as e:
+            resultado['error'] = e
+        finally:
+            paginas.put(None)  # Fin del scan
+
+    threading.Thread(target=escanear, daemon=True).start()
+    while True:
+        items = paginas.get()
+        if items is None:
+            break
+        for item in items:
+            salida.write(serializacion.dumps(item) + '\n')
+
+    if 'error' in resultado:
+        raise resultado['error']
+
+    archivadas = 0
+    for fecha in sorted(archive_incidents.particiones_en_rango(None, None)):
+        for item in archive_incidents.leer_particion(fecha):
+            salida.write(serializacion.dumps(item) + '\n')
+            archivadas += 1
+    return resultado['registros'] + archivadas
+
+
+@instrumentacion.instrumentar
+def export_incidents(event, context):
+    try:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
+            return {
+                'statusCode': e.status_code,
+                'body': e.mensaje
+            }
+
+        if token_item['role'] == 'estudiante':
+            return {
+                'statusCode': 403,
+                'body': 'Solo los roles no estudiantes pueden exportar incidencias'
+            }
+
+        body = event.get('body') or {}
+        if isinstance(body, str):  # Si el cuerpo es un string JSON, lo convertimos
+            body = json.loads(body)
+
+        # Reanudar: la cantidad de segmentos tiene que ser la misma que al empezar
+        export_id = body.get('export_id')
+        if export_id:
+            segmentos = segmentos_de(export_id)
+            if segmentos is None:
+                return {
+                    'statusCode': 404,
+                    'body': {'error': 'Exportación no encontrada'}
+                }
+        else:
+            try:
+                segmentos = int(body.get('segmentos', SEGMENTOS_POR_DEFECTO))
+            except (TypeError, ValueError):
+                segmentos = 0
+            if not 1 <= segmentos <= MAX_SEGMENTOS:
+                return {
+                    'statusCode': 400,
+                    'body': {'error': f'segmentos debe estar entre 1 y {MAX_SEGMENTOS}'}
+                }
+            export_id = iniciar_exportacion(segmentos, token_item['user_id'])
+
+        def sin_tiempo():
+            return context is not None and context.get_remaining_time_in_millis() < MARGEN_MS
+
+        return {
+            'statusCode': 200,
+            'body': exportar_a_s3(export_id, segmentos, sin_tiempo)
+        }
+
+    except Exception as e:
+        print("Error en export_incidents:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta todas las incidencias con un scan paralelo')
+    parser.add_argument('--segmentos', type=int, default=SEGMENTOS_POR_DEFECTO)
+    parser.add_argument('--s3', action='store_true', help='Escribir partes NDJSON gzip en S3 en vez de la salida estándar')
+    parser.add_argument('--export-id', help='Reanudar una exportación a S3')
+    args = parser.parse_args()
+
+    if args.s3:
+        if args.export_id:
+            # Los checkpoints de cada segmento solo valen con la misma cantidad de segmentos
+            segmentos = segmentos_de(args.export_id)
+            if segmentos is None:
+                parser.error(f'No existe la exportación {args.export_id}')
+            export_id = args.export_id
+        else:
+            segmentos = args.segmentos
+            export_id = iniciar_exportacion(segmentos, 'script')
+        print(json.dumps(exportar_a_s3(export_id, segmentos)))
+    else:
+        total = exportar_ndjson(sys.stdout, args.segmentos)
+        print(f'Incidencias exportadas: {total}', file=sys.stderr)
@@ -1,37 +1,124 @@
-import boto3
-import os
-from datetime import datetime
+import json
+import base64
+import auth
+import archive_incidents
+import aws_clients
+import cache_respuestas
+from boto3.dynamodb.conditions import Key, Attr
+import instrumentacion
 
-def get_incidents_history(event, context):
-    print("Event recibido en get_incidents_history:", event)  # Log en CloudWatch
+# Indices secundarios de la tabla de incidencias (ver serverless.yml)
+INDICE_FASE = 'fase-fecha_creacion-index'
+INDICE_REPORTADO_POR = 'reportado_por-fecha_creacion-index'
+
+LIMITE_POR_DEFECTO = 25
+LIMITE_MAXIMO = 100
+
+# Atributos que se pueden pedir con ?fields=... (el resto de la incidencia no se lee ni se envía)
+CAMPOS_INCIDENCIA = (
+    'incidente_id', 'descripcion', 'tipo_incidencia', 'ubicacion', 'urgencia', 'gravedad', 'fase',
+    'fecha_creacion', 'fecha_actualizacion', 'tiempo_resolucion', 'reportado_por', 'reportes', 'reportantes'
+)
+
+
+def codificar_cursor(last_evaluated_key):
+    # El cursor es opaco para el cliente: LastEvaluatedKey en JSON + base64 url-safe
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    # ValueError si el cursor no es un objeto JSON en base64 (manipulado o truncado)
+    valor = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    if not isinstance(valor, dict):
+        raise ValueError('Cursor no válido')
+    return valor
+
+
+def es_clave(valor):
+    # Forma de un LastEvaluatedKey de estas tablas: todos los atributos de clave son strings
+    return isinstance(valor, dict) and bool(valor) and all(isinstance(v, str) for v in valor.values())
+
+
+def leer_campos(fields):
+    """Lista de atributos pedidos en ?fields=a,b,c (None = todos); ValueError si alguno no existe."""
+    if not fields:
+        return None
+    campos = sorted({campo.strip() for campo in fields.split(',') if campo.strip()})
+    desconocidos = [campo for campo in campos if campo not in CAMPOS_INCIDENCIA]
+    if desconocidos or not campos:
+        raise ValueError(', '.join(desconocidos))
+    return campos
+
+
+def proyeccion(campos):
+    # Nombres con placeholder (#campo0, ...): algunos atributos pueden ser palabras reservadas
+    # y no chocan con los que genera boto3 para KeyConditionExpression/FilterExpression (#n0, ...)
+    nombres = {f'#campo{i}': campo for i, campo in enumerate(campos)}
+    return {'ProjectionExpression': ', '.join(nombres), 'ExpressionAttributeNames': nombres}
+
+
+def recortar(item, campos):
+    return {campo: item[campo] for campo in campos if campo in item} if campos else item
+
+
+def normalizar_fecha(fecha, fin_del_dia=False):
+    # Las fechas se guardan como '%Y-%m-%d %H:%M:%S'; si solo llega el día, cubrimos el día completo
+    if fecha and len(fecha) == 10:
+        return fecha + (' 23:59:59' if fin_del_dia else ' 00:00:00')
+    return fecha
+
+
+def condicion_fecha(key_condition, desde, hasta):
+    if desde and hasta:
+        return key_condition & Key('fecha_creacion').between(desde, hasta)
+    if desde:
+        return key_condition & Key('fecha_creacion').gte(desde)
+    if hasta:
+        return key_condition & Key('fecha_creacion').lte(hasta)
+    return key_condition
+
+
+def agregar_filtro(filtro, condicion):
+    return condicion if filtro is None else filtro & condicion
 
-    try:
-        # Obtener el token desde el header Authorization (formato Bearer <token>)
-        token = event['headers'].get('Authorization').replace('Bearer ', '')  
-        if not token:
-            return {
-                'statusCode': 400,
-                'body': {'error': 'Faltan datos en los headers'}
-            }
 
-        # Obtener el nombre de la tabla de tokens desde las variables de entorno
-        tokens_table_name = os.environ['DYNAMODB_TABLE_TOKENS']
+def pagina_archivo(fechas, posicion, limite, coincide):
+    """Hasta `limite` incidencias archivadas desde `posicion` ({'fecha', 'offset'}).
 
-        dynamodb = boto3.resource('dynamodb')
-        tokens_table = dynamodb.Table(tokens_table_name)
+    Las particiones se recorren de la más nueva a la más vieja; devuelve (items, siguiente
+    posición o None si no quedan más).
+    """
+    items = []
+    for indice, fecha in enumerate(fechas):
+        if fecha > posicion['fecha']:
+            continue
+        offset = posicion['offset'] if fecha == posicion['fecha'] else 0
+        coincidentes = [incidencia for incidencia in archive_incidents.leer_particion(fecha) if coincide(incidencia)]
+        tomadas = coincidentes[offset:offset + limite - len(items)]
+        items.extend(tomadas)
+        if len(items) >= limite:
+            if offset + len(tomadas) < len(coincidentes):
+                return items, {'fecha': fecha, 'offset': offset + len(tomadas)}
+            if indice + 1 < len(fechas):
+                return items, {'fecha': fechas[indice + 1], 'offset': 0}
+            return items, None
+    return items, None
 
-        # Buscar el token en la tabla de tokens
-        response = tokens_table.query(
-            KeyConditionExpression=boto3.dynamodb.conditions.Key('tenant_id').eq(token)
-        )
 
-        if 'Items' not in response or len(response['Items']) == 0:
+@instrumentacion.instrumentar
+def get_incidents_history(event, context):
+    try:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
             return {
-                'statusCode': 403,
-                'body': 'Token no válido o no encontrado'
+                'statusCode': e.status_code,
+                'body': e.mensaje
             }
 
-        token_item = response['Items'][0]
         user_role = token_item['role']
 
         # Verificar si el usuario no es un estudiante
@@ -41,18 +128,148 @@ def get_incidents_history(event, context):
                 'body': 'Solo los roles no estudiantes pueden ver el historial'
             }
 
-        # Si no es estudiante, permitimos ver el historial de incidencias
-        incidencias_table = dynamodb.Table(os.environ['DYNAMODB_TABLE_INCIDENCIAS'])
+        # Filtros opcionales desde el query string (?fase=...&urgencia=...&limit=...&cursor=...&fields=...)
+        query = event.get('query') or {}
+        fase = query.get('fase')
+        reportado_por = query.get('reportado_por')
+        tipo_incidencia = query.get('tipo_incidencia')
+        urgencia = query.get('urgencia')
+        desde = normalizar_fecha(query.get('desde'))
+        hasta = normalizar_fecha(query.get('hasta'), fin_del_dia=True)
 
-        response = incidencias_table.scan()  # Recuperar todas las incidencias
-        return {
-            'statusCode': 200,
-            'body': response['Items']
-        }
+        try:
+            limite = min(int(query.get('limit', LIMITE_POR_DEFECTO)), LIMITE_MAXIMO)
+            cursor = decodificar_cursor(query['cursor']) if query.get('cursor') else None
+            if limite < 1:
+                raise ValueError(limite)
+            if cursor and 'archivo' in cursor:
+                posicion = cursor['archivo']
+                if not (isinstance(posicion, dict) and isinstance(posicion.get('fecha'), str) and isinstance(posicion.get('offset'), int)):
+                    raise ValueError(posicion)
+            elif cursor is not None and not es_clave(cursor):
+                raise ValueError(cursor)
+        except ValueError:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Parámetros de paginación no válidos'}
+            }
+
+        try:
+            campos = leer_campos(query.get('fields'))
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': {'error': f'Campos no válidos: {e}'}
+            }
+
+        # Un cursor {'archivo': ...} indica que la tabla ya se recorrió y se sigue por el archivo en S3
+        exclusive_start_key = cursor
+        posicion_archivo = None
+        if cursor and 'archivo' in cursor:
+            exclusive_start_key = None
+            posicion_archivo = cursor['archivo']
+
+        def coincide(incidencia):
+            for atributo, valor in (('reportado_por', reportado_por), ('tipo_incidencia', tipo_incidencia), ('urgencia', urgencia)):
+                if valor and incidencia.get(atributo) != valor:
+                    return False
+            return (desde or '') <= incidencia['fecha_creacion'] <= (hasta or incidencia['fecha_creacion'])
+
+        # Filtros que no forman parte de la clave del índice
+        filtro = None
+        for atributo, valor in (('tipo_incidencia', tipo_incidencia), ('urgencia', urgencia)):
+            if valor:
+                filtro = agregar_filtro(filtro, Attr(atributo).eq(valor))
+
+        parametros = {'Limit': limite}
+        if exclusive_start_key:
+            parametros['ExclusiveStartKey'] = exclusive_start_key
+
+        if fase or reportado_por:
+            # Consulta por índice: solo se leen las incidencias de la fase (o del usuario) pedida,
+            # ordenadas de la más reciente a la más antigua
+            if fase:
+                parametros['IndexName'] = INDICE_FASE
+                key_condition = Key('fase').eq(fase)
+                if reportado_por:
+                    filtro = agregar_filtro(filtro, Attr('reportado_por').eq(reportado_por))
+            else:
+                parametros['IndexName'] = INDICE_REPORTADO_POR
+                key_condition = Key('reportado_por').eq(reportado_por)
+
+            parametros['KeyConditionExpression'] = condicion_fecha(key_condition, desde, hasta)
+            parametros['ScanIndexForward'] = False
+        else:
+            # Sin fase ni usuario no hay índice aplicable: scan paginado, acotado por Limit.
+            # Sobre la tabla la lectura puede ser consistente, así la respuesta se cachea siempre
+            parametros['ConsistentRead'] = True
+            if desde:
+                filtro = agregar_filtro(filtro, Attr('fecha_creacion').gte(desde))
+            if hasta:
+                filtro = agregar_filtro(filtro, Attr('fecha_creacion').lte(hasta))
+        if filtro is not None:
+            parametros['FilterExpression'] = filtro
+        if campos:
+            # DynamoDB aplica el filtro antes de la proyección: se puede filtrar por atributos no pedidos
+            parametros.update(proyeccion(campos))
+
+        def consultar():
+            # Las incidencias resueltas antiguas están archivadas en S3 (ver archive_incidents.py):
+            # el archivo solo se lee si se pide un rango de fechas que incluye días archivados
+            # (sin desde, el rango queda abierto hacia atrás: ?hasta=... sola también lo incluye)
+            fechas_archivo = []
+            if (desde or hasta) and fase in (None, 'resuelta'):
+                fechas_archivo = archive_incidents.particiones_en_rango(desde, hasta)
+
+            posicion = posicion_archivo
+            items = []
+            if posicion is None:
+                incidencias_table = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS')
+                if 'KeyConditionExpression' in parametros:
+                    response = incidencias_table.query(**parametros)
+                else:
+                    response = incidencias_table.scan(**parametros)
+                items = response['Items']
+                siguiente = response.get('LastEvaluatedKey')
+                if siguiente or not fechas_archivo or items:
+                    # Terminada la tabla, la siguiente página empieza por el archivo
+                    if not siguiente and fechas_archivo:
+                        siguiente = {'archivo': {'fecha': fechas_archivo[0], 'offset': 0}}
+                    return {
+                        'statusCode': 200,
+                        'body': {
+                            'items': items,
+                            'cursor': codificar_cursor(siguiente)
+                        }
+                    }
+                posicion = {'fecha': fechas_archivo[0], 'offset': 0}
+
+            items, siguiente = pagina_archivo(fechas_archivo, posicion, limite, coincide)
+            return {
+                'statusCode': 200,
+                'body': {
+                    'items': [recortar(item, campos) for item in items],
+                    'cursor': codificar_cursor({'archivo': siguiente} if siguiente else None)
+                }
+            }
+
+        # Respuesta cacheada mientras no haya escrituras (ver cache_respuestas.py); las consultas
+        # por índice secundario no son consistentes y no se cachean justo después de una escritura
+        return cache_respuestas.leer('historial', {
+            'fase': fase,
+            'reportado_por': reportado_por,
+            'tipo_incidencia': tipo_incidencia,
+            'urgencia': urgencia,
+            'desde': desde,
+            'hasta': hasta,
+            'limit': limite,
+            'cursor': cursor,
+            'fields': ','.join(campos) if campos else None
+        }, consultar, consistente='IndexName' not in parametros)
 
     except Exception as e:
         print("Error en get_incidents_history:", str(e))  # Log en CloudWatch
         return {
             'statusCode': 500,
             'body': {'error': str(e)}
-        }
\ No newline at end of file
+        }
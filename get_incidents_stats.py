@@ -0,0 +1,62 @@
+import auth
+import cache_respuestas
+import estadisticas
+import instrumentacion
+
+@instrumentacion.instrumentar
+def get_incidents_stats(event, context):
+    try:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
+            return {
+                'statusCode': e.status_code,
+                'body': e.mensaje
+            }
+
+        # Verificar si el usuario no es un estudiante
+        if token_item['role'] == 'estudiante':
+            return {
+                'statusCode': 403,
+                'body': 'Solo los roles no estudiantes pueden ver las estadísticas'
+            }
+
+        # Rango de días opcional (?desde=YYYY-MM-DD&hasta=YYYY-MM-DD); sin rango solo se devuelven los totales
+        query = event.get('query') or {}
+        desde = query.get('desde')
+        hasta = query.get('hasta') or desde
+        dias = []
+        if desde:
+            try:
+                dias = estadisticas.dias_entre(desde, hasta)
+            except ValueError:
+                return {
+                    'statusCode': 400,
+                    'body': {'error': 'Fechas no válidas, use el formato YYYY-MM-DD'}
+                }
+            if not dias or len(dias) > estadisticas.MAX_DIAS:
+                return {
+                    'statusCode': 400,
+                    'body': {'error': f'El rango debe tener entre 1 y {estadisticas.MAX_DIAS} días'}
+                }
+
+        def consultar():
+            total, por_dia = estadisticas.leer(dias)
+            return {
+                'statusCode': 200,
+                'body': {
+                    'total': total,
+                    'por_dia': por_dia
+                }
+            }
+
+        # Los contadores se leen con ConsistentRead y cada escritura sube la versión del cache al terminar
+        return cache_respuestas.leer('estadisticas', {'dias': dias}, consultar)
+
+    except Exception as e:
+        print("Error en get_incidents_stats:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
@@ -0,0 +1,138 @@
+import heapq
+import itertools
+import auth
+import aws_clients
+import notificaciones
+from boto3.dynamodb.conditions import Key, Attr
+from get_incidents_history import codificar_cursor, decodificar_cursor, es_clave, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+import instrumentacion
+
+# Fin de un feed dentro del cursor (un feed sin entrada en el cursor empieza desde el principio)
+FIN = 'fin'
+
+
+def _leer_feed(destinatario, limite, exclusive_start_key, desde=None, solo_pendientes=False):
+    """Hasta `limite` notificaciones de un destinatario, de la más nueva a la más vieja.
+
+    Devuelve (items, agotado); agotado=True si no quedan más después de los devueltos.
+    """
+    key_condition = Key('destinatario').eq(destinatario)
+    if desde:
+        key_condition = key_condition & Key('fecha').gt(desde)
+    parametros = {
+        'IndexName': notificaciones.INDICE_DESTINATARIO,
+        'KeyConditionExpression': key_condition,
+        'ScanIndexForward': False,
+        'Limit': limite
+    }
+    if solo_pendientes:
+        parametros['FilterExpression'] = Attr('status').eq('pendiente')
+    if exclusive_start_key:
+        parametros['ExclusiveStartKey'] = exclusive_start_key
+
+    notificaciones_table = aws_clients.tabla('DYNAMODB_TABLE_NOTIFICACIONES')
+    items = []
+    while True:
+        response = notificaciones_table.query(**parametros)
+        items.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return items, True
+        if len(items) >= limite:
+            return items, False
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _clave(item):
+    # Clave del índice para retomar el feed justo después de este item
+    return {'notificacion_id': item['notificacion_id'], 'destinatario': item['destinatario'], 'fecha': item['fecha']}
+
+
+@instrumentacion.instrumentar
+def get_notifications_inbox(event, context):
+    try:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
+            return {
+                'statusCode': e.status_code,
+                'body': e.mensaje
+            }
+
+        user_id = token_item['user_id']
+        user_role = token_item['role']
+
+        # ?limit=...&cursor=...&no_leidas=true
+        query = event.get('query') or {}
+        solo_no_leidas = str(query.get('no_leidas', '')).lower() in ('1', 'true', 'si')
+        try:
+            limite = min(int(query.get('limit', LIMITE_POR_DEFECTO)), LIMITE_MAXIMO)
+            cursor = decodificar_cursor(query['cursor']) if query.get('cursor') else {}
+            # Cada feed del cursor es FIN o el LastEvaluatedKey desde el que seguir
+            if any(valor != FIN and not es_clave(valor) for valor in cursor.values()):
+                raise ValueError(cursor)
+        except (ValueError, TypeError):
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Parámetros de paginación no válidos'}
+            }
+        if limite <= 0:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'limit debe ser mayor que cero'}
+            }
+
+        # Dos consultas por clave: el feed propio y el de su rol; lo leído del rol se marca
+        # con una sola fecha por usuario en vez de un estado por notificación
+        leido_hasta = notificaciones.leido_hasta(user_id, user_role)
+        feeds = {
+            'usuario': {'destinatario': user_id, 'solo_pendientes': solo_no_leidas},
+            'rol': {'destinatario': user_role, 'desde': leido_hasta if solo_no_leidas else None}
+        }
+        leidos = {}
+        for nombre, feed in feeds.items():
+            if cursor.get(nombre) == FIN:
+                leidos[nombre] = ([], True)
+            else:
+                leidos[nombre] = _leer_feed(limite=limite, exclusive_start_key=cursor.get(nombre), **feed)
+
+        # Mezcla de los dos feeds por fecha (los dos vienen ordenados de más nuevo a más viejo).
+        # heapq.merge respeta el orden de cada feed, así lo consumido es siempre un prefijo
+        # y el cursor se puede rehacer con el último item tomado de cada uno
+        pagina = list(itertools.islice(heapq.merge(
+            *[[(item, nombre) for item in items] for nombre, (items, _) in leidos.items()],
+            key=lambda candidato: candidato[0]['fecha'], reverse=True
+        ), limite))
+
+        nuevo_cursor = {}
+        for nombre, (items, agotado) in leidos.items():
+            consumidos = [item for item, origen in pagina if origen == nombre]
+            if agotado and len(consumidos) == len(items):
+                nuevo_cursor[nombre] = FIN
+            elif consumidos:
+                nuevo_cursor[nombre] = _clave(consumidos[-1])
+            elif cursor.get(nombre):
+                nuevo_cursor[nombre] = cursor[nombre]
+
+        items = []
+        for item, origen in pagina:
+            if origen == 'rol':
+                leida = leido_hasta is not None and item['fecha'] <= leido_hasta
+            else:
+                leida = item.get('status') == 'leida'
+            items.append(dict(item, leida=leida))
+
+        return {
+            'statusCode': 200,
+            'body': {
+                'items': items,
+                'cursor': None if all(nuevo_cursor.get(nombre) == FIN for nombre in feeds) else codificar_cursor(nuevo_cursor)
+            }
+        }
+
+    except Exception as e:
+        print("Error en get_notifications_inbox:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
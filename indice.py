@@ -0,0 +1,146 @@
+import os
+import argparse
+from collections import Counter
+import aws_clients
+import lotes
+import texto
+
+# Índice invertido de incidencias para la búsqueda por texto (descripción, ubicación y tipo).
+#
+# t_indice_incidencias tiene un item por término e incidencia:
+#   termino = 'proyector', orden = '<rango urgencia>#<fecha_creacion>#<incidente_id>'
+# El orden es el mismo para una incidencia en todos sus términos, así que leer un término de
+# mayor a menor ya devuelve las incidencias por urgencia y luego por fecha, y para saber si
+# una incidencia tiene otro término basta con pedir esa clave exacta (batch_get_item).
+# Cada término tiene además un item orden='#df' con la cantidad de incidencias que lo
+# contienen, para empezar la búsqueda por el término menos frecuente.
+#
+# El índice lo mantiene el consumidor del outbox (notificaciones.procesar_lote) después de
+# crear o actualizar una incidencia, fuera del request, y archive_incidents.py borra los
+# postings de las incidencias que pasa a S3. Para indexar incidencias que ya existían (con el
+# índice vacío): python indice.py --segmentos 8
+RANGO_URGENCIA = {'alta': '3', 'media': '2', 'baja': '1'}
+ORDEN_DF = '#df'  # '#' < '0': queda fuera de las consultas de postings (orden >= '0')
+CAMPOS_INCIDENCIA = ('incidente_id', 'descripcion', 'ubicacion', 'tipo_incidencia', 'urgencia', 'fecha_creacion', 'fase')
+
+
+def orden(incidencia):
+    return f"{RANGO_URGENCIA.get(incidencia.get('urgencia'), '0')}#{incidencia['fecha_creacion']}#{incidencia['incidente_id']}"
+
+
+def terminos_de(incidencia):
+    # Los valores que no son texto (datos escritos antes de validar los campos) no se indexan
+    textos = (incidencia.get(campo) for campo in ('descripcion', 'ubicacion', 'tipo_incidencia'))
+    return texto.terminos(*(valor for valor in textos if isinstance(valor, str)))
+
+
+def batch_get(tabla, claves, **parametros):
+    """batch_get_item de muchas claves (100 por llamada), reintentando las no procesadas."""
+    items = []
+    for i in range(0, len(claves), 100):
+        request_items = {tabla: dict(parametros, Keys=claves[i:i + 100])}
+        while request_items:
+            response = aws_clients.dynamodb().batch_get_item(RequestItems=request_items)
+            items.extend(response['Responses'].get(tabla, []))
+            request_items = response.get('UnprocessedKeys')
+    return items
+
+
+def reindexar(creadas, actualizadas):
+    """Escribe los postings de las incidencias indicadas con su estado actual.
+
+    Es idempotente (se sobrescriben los mismos items), salvo el contador de frecuencia, que
+    se suma una vez por incidencia creada: si un lote se reintenta puede quedar un poco alto,
+    lo que solo afecta al orden en que se evalúan los términos.
+    """
+    ids = list(dict.fromkeys(list(creadas) + list(actualizadas)))
+    if not ids:
+        return 0
+
+    tabla_indice = os.environ['DYNAMODB_TABLE_INDICE']
+    incidencias = batch_get(
+        os.environ['DYNAMODB_TABLE_INCIDENCIAS'],
+        [{'incidente_id': incidente_id} for incidente_id in ids],
+        ProjectionExpression=', '.join(CAMPOS_INCIDENCIA)
+    )
+
+    escrituras = []
+    frecuencias = Counter()
+    creadas = set(creadas)
+    for incidencia in incidencias:
+        clave_orden = orden(incidencia)
+        terminos = terminos_de(incidencia)
+        for termino in terminos:
+            escrituras.append((tabla_indice, {
+                'termino': termino,
+                'orden': clave_orden,
+                'incidente_id': incidencia['incidente_id'],
+                'fase': incidencia['fase']
+            }))
+        if incidencia['incidente_id'] in creadas:
+            frecuencias.update(terminos)
+
+    fallidas = lotes.escribir_en_lotes(escrituras, hilos=4)
+    if fallidas:
+        # El consumidor del stream reintenta el lote completo
+        raise RuntimeError(f'No se pudieron escribir {len(fallidas)} postings del índice')
+
+    indice_table = aws_clients.tabla('DYNAMODB_TABLE_INDICE')
+    for termino, n in frecuencias.items():
+        indice_table.update_item(
+            Key={'termino': termino, 'orden': ORDEN_DF},
+            UpdateExpression='ADD df :n',
+            ExpressionAttributeValues={':n': n}
+        )
+    return len(incidencias)
+
+
+def eliminar(incidencias):
+    """Borra los postings de las incidencias indicadas (items completos) y descuenta su frecuencia.
+
+    Los borrados son idempotentes; el descuento no, así que si se repite para la misma
+    incidencia la frecuencia queda un poco baja (igual que en reindexar, solo afecta al orden).
+    """
+    indice_table = aws_clients.tabla('DYNAMODB_TABLE_INDICE')
+    frecuencias = Counter()
+    with indice_table.batch_writer() as batch:
+        for incidencia in incidencias:
+            clave_orden = orden(incidencia)
+            terminos = terminos_de(incidencia)
+            for termino in terminos:
+                batch.delete_item(Key={'termino': termino, 'orden': clave_orden})
+            frecuencias.update(terminos)
+
+    for termino, n in frecuencias.items():
+        indice_table.update_item(
+            Key={'termino': termino, 'orden': ORDEN_DF},
+            UpdateExpression='ADD df :n',
+            ExpressionAttributeValues={':n': -n}
+        )
+    return len(incidencias)
+
+
+def frecuencias(terminos):
+    """Cantidad de incidencias por término (0 si el término no está en el índice)."""
+    items = batch_get(
+        os.environ['DYNAMODB_TABLE_INDICE'],
+        [{'termino': termino, 'orden': ORDEN_DF} for termino in terminos]
+    )
+    df = {item['termino']: int(item['df']) for item in items}
+    return {termino: df.get(termino, 0) for termino in terminos}
+
+
+def reconstruir(segmentos):
+    """Indexa todas las incidencias de la tabla con un scan paralelo (índice vacío)."""
+    return lotes.escaneo_paralelo(
+        os.environ['DYNAMODB_TABLE_INCIDENCIAS'], segmentos,
+        lambda segmento, items: reindexar([item['incidente_id'] for item in items], []),
+        ProjectionExpression='incidente_id'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Indexa todas las incidencias para la búsqueda por texto')
+    parser.add_argument('--segmentos', type=int, default=8, help='Hilos del scan paralelo')
+    args = parser.parse_args()
+    print(f'Incidencias indexadas: {reconstruir(args.segmentos)}')
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import random
+import functools
+import threading
+
+# Métricas por invocación de cada handler, emitidas como una línea JSON en formato EMF
+# (CloudWatch Embedded Metric Format): CloudWatch las convierte en métricas sin llamar a
+# PutMetricData. Por invocación se mide la duración total, si fue cold start y la cantidad y
+# latencia de cada llamada a DynamoDB/S3, contadas con los eventos before-call/after-call de
+# botocore que aws_clients registra al crear cada cliente.
+#
+# El evento completo ya no se escribe en cada invocación: se registra una muestra
+# (LOG_EVENTOS_MUESTREO, 1% por defecto) y siempre que la respuesta es un error 5xx, con el
+# header Authorization, las contraseñas y los tokens ocultos. Un handler que recibe datos
+# sensibles bajo otros nombres los agrega con @instrumentar(ocultar=(...)).
+NAMESPACE = os.environ.get('METRICAS_NAMESPACE', 'cloud-hack')
+MUESTREO_EVENTOS = float(os.environ.get('LOG_EVENTOS_MUESTREO', '0.01'))
+CAMPOS_SENSIBLES = {'authorization', 'password', 'token', 'token_secret'}
+MAX_LARGO_TEXTO = 200
+
+_cold_start = True
+_local = threading.local()
+_activas = []  # Invocaciones en curso (en Lambda, como máximo una por contenedor)
+_lock = threading.Lock()
+
+
+class _Invocacion:
+    def __init__(self, handler):
+        self.handler = handler
+        self.llamadas = {}  # 'dynamodb.Query' -> [cantidad, milisegundos]
+        self.propiedades = {}  # Datos extra para la línea de métricas (ver anotar)
+        self.lock = threading.Lock()
+
+    def registrar_llamada(self, operacion, ms):
+        with self.lock:
+            llamada = self.llamadas.setdefault(operacion, [0, 0.0])
+            llamada[0] += 1
+            llamada[1] += ms
+
+
+def _invocacion_actual():
+    invocacion = getattr(_local, 'invocacion', None)
+    if invocacion is not None:
+        return invocacion
+    # Llamadas hechas desde hilos auxiliares (p. ej. lotes.py): se atribuyen a la invocación
+    # en curso si hay una sola, que es el caso en Lambda
+    with _lock:
+        return _activas[0] if len(_activas) == 1 else None
+
+
+def _antes(context, **kwargs):
+    context['instrumentacion_inicio'] = time.perf_counter()
+
+
+def _despues(model, context, **kwargs):
+    inicio = context.get('instrumentacion_inicio')
+    invocacion = _invocacion_actual()
+    if inicio is None or invocacion is None:
+        return
+    # El tiempo incluye los reintentos de botocore: es lo que espera el handler
+    invocacion.registrar_llamada(f'{model.service_model.service_name}.{model.name}', (time.perf_counter() - inicio) * 1000)
+
+
+def registrar(cliente):
+    """Engancha la medición de llamadas a un cliente de botocore (lo llama aws_clients)."""
+    cliente.meta.events.register('before-call.*.*', _antes, unique_id='instrumentacion-antes')
+    cliente.meta.events.register('after-call.*.*', _despues, unique_id='instrumentacion-despues')
+
+
+def anotar(nombre, valor):
+    """Agrega una propiedad a la línea de métricas de la invocación en curso (si la hay)."""
+    invocacion = _invocacion_actual()
+    if invocacion is not None:
+        with invocacion.lock:
+            invocacion.propiedades[nombre] = valor
+
+
+def redactar(valor, sensibles=CAMPOS_SENSIBLES):
+    if isinstance(valor, dict):
+        return {k: '***' if str(k).lower() in sensibles else redactar(v, sensibles) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [redactar(v, sensibles) for v in valor]
+    if isinstance(valor, str) and len(valor) > MAX_LARGO_TEXTO:
+        return valor[:MAX_LARGO_TEXTO] + '...'
+    return valor
+
+
+def _evento_para_log(event, sensibles):
+    # Un body que llega como string JSON se decodifica para poder ocultar sus campos; si no
+    # es JSON y el handler tiene campos a ocultar, se oculta entero
+    if isinstance(event, dict) and isinstance(event.get('body'), str):
+        try:
+            event = dict(event, body=json.loads(event['body']))
+        except ValueError:
+            if sensibles != CAMPOS_SENSIBLES:
+                event = dict(event, body='***')
+    return redactar(event, sensibles)
+
+
+def _linea_emf(invocacion, duracion_ms, cold_start, respuesta):
+    metricas = {
+        'Duracion': round(duracion_ms, 2),
+        'ColdStart': int(cold_start),
+        'LlamadasAWS': sum(n for n, _ in invocacion.llamadas.values()),
+        'DuracionAWS': round(sum(ms for _, ms in invocacion.llamadas.values()), 2)
+    }
+    unidades = {'Duracion': 'Milliseconds', 'ColdStart': 'Count', 'LlamadasAWS': 'Count', 'DuracionAWS': 'Milliseconds'}
+    linea = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [['handler']],
+                'Metrics': [{'Name': nombre, 'Unit': unidades[nombre]} for nombre in metricas]
+            }]
+        },
+        'handler': invocacion.handler,
+        # El detalle por operación va como propiedad (consultable en Logs Insights), no como métrica
+        'llamadas': {operacion: {'n': n, 'ms': round(ms, 2)} for operacion, (n, ms) in invocacion.llamadas.items()}
+    }
+    if isinstance(respuesta, dict) and 'statusCode' in respuesta:
+        linea['statusCode'] = respuesta['statusCode']
+    linea.update(invocacion.propiedades)
+    linea.update(metricas)
+    return linea
+
+
+def ultima():
+    """Métricas de la última invocación terminada en este hilo (para benchmarks)."""
+    return getattr(_local, 'ultima', None)
+
+
+def instrumentar(handler=None, ocultar=()):
+    """Decorador de handlers de Lambda: métricas EMF y log del evento muestreado y redactado.
+
+    Se usa como @instrumentar o, con campos del evento que también se deben ocultar enteros,
+    como @instrumentar(ocultar=('contenido',)).
+    """
+    if handler is None:
+        return functools.partial(instrumentar, ocultar=ocultar)
+    nombre = handler.__name__
+    sensibles = CAMPOS_SENSIBLES | {campo.lower() for campo in ocultar}
+
+    @functools.wraps(handler)
+    def envoltorio(event, context):
+        global _cold_start
+        # Un handler llamado desde otro (p. ej. router.py) se mide una sola vez
+        if getattr(_local, 'invocacion', None) is not None:
+            return handler(event, context)
+
+        cold_start, _cold_start = _cold_start, False
+        invocacion = _Invocacion(nombre)
+        _local.invocacion = invocacion
+        with _lock:
+            _activas.append(invocacion)
+
+        registrar_evento = random.random() < MUESTREO_EVENTOS
+        if registrar_evento:
+            print(json.dumps({'handler': nombre, 'event': _evento_para_log(event, sensibles)}, default=str))  # Log en CloudWatch
+
+        respuesta = None
+        fallo = False
+        inicio = time.perf_counter()
+        try:
+            respuesta = handler(event, context)
+            return respuesta
+        except Exception:
+            fallo = True
+            raise
+        finally:
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            _local.invocacion = None
+            with _lock:
+                _activas.remove(invocacion)
+            error_servidor = isinstance(respuesta, dict) and isinstance(respuesta.get('statusCode'), int) and respuesta['statusCode'] >= 500
+            if not registrar_evento and (fallo or error_servidor):
+                print(json.dumps({'handler': nombre, 'event': _evento_para_log(event, sensibles)}, default=str))  # Log en CloudWatch
+            linea = _linea_emf(invocacion, duracion_ms, cold_start, respuesta)
+            _local.ultima = linea
+            print(json.dumps(linea))  # Métricas EMF en CloudWatch
+
+    return envoltorio
@@ -1,60 +1,61 @@
 import boto3
+import auth
+import aws_clients
 import hashlib
 import uuid
-import os
 from datetime import datetime, timedelta
+import instrumentacion
+from register_user import MARCA_CORREO
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
+@instrumentacion.instrumentar
 def login_user(event, context):
-    print("Event recibido en login_user:", event)  # Log en CloudWatch
-
     try:
         body = event['body']
         tenant_id = body.get('tenant_id')  # Correo electrónico del usuario
         password = body.get('password')
 
-        # Acceder a las variables de entorno para obtener los nombres de las tablas
-        usuarios_table_name = os.environ['DYNAMODB_TABLE_USUARIOS']
-        tokens_table_name = os.environ['DYNAMODB_TABLE_TOKENS']
-
-        dynamodb = boto3.resource('dynamodb')
-        usuarios_table = dynamodb.Table(usuarios_table_name)
+        # Tablas según las variables de entorno (clientes reutilizados entre invocaciones)
+        usuarios_table = aws_clients.tabla('DYNAMODB_TABLE_USUARIOS')
 
         # Buscar el usuario usando solo tenant_id (correo electrónico)
         response = usuarios_table.query(
             KeyConditionExpression=boto3.dynamodb.conditions.Key('tenant_id').eq(tenant_id)
         )
 
-        if 'Items' not in response or len(response['Items']) == 0:
+        # La marca de correo único (ver register_user.py) comparte la partición pero no es un usuario
+        usuarios = [item for item in response.get('Items', []) if item['user_id'] != MARCA_CORREO]
+        if len(usuarios) == 0:
             return {
                 'statusCode': 403,
                 'body': 'Usuario no existe'
             }
 
         # Supongamos que un usuario puede tener solo un item en la tabla con el mismo tenant_id
-        user = response['Items'][0]
+        user = usuarios[0]
         hashed_password_bd = user['password']
 
         if hashed_password_bd == hash_password(password):
-            # Generar token
-            token = str(uuid.uuid4())  # UUID único para el token
-            token_id = str(uuid.uuid4())  # UUID para el token_id (clave de ordenamiento)
-            expiration_time = datetime.now() + timedelta(hours=1)
-            token_data = {
-                'tenant_id': token,  # El token será la clave de partición (tenant_id)
-                'token_id': token_id,  # UUID para el token_id (clave de ordenamiento)
-                'user_id': user['user_id'],
-                'role': user['role'],  # Incluir el rol del usuario
-                'token': token,
-                'fecha_creacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'expires': expiration_time.strftime('%Y-%m-%d %H:%M:%S')
-            }
+            if auth.tokens_firmados_activos():
+                # Token firmado: se valida sin leer DynamoDB, así que no se guarda en la tabla
+                token, _ = auth.emitir_token(user['user_id'], user['role'])
+            else:
+                # Generar token
+                token = str(uuid.uuid4())  # UUID único para el token
+                expiration_time = datetime.now() + timedelta(hours=1)
+                token_data = {
+                    'token': token,  # El token es la única clave de la tabla (lectura con get_item)
+                    'user_id': user['user_id'],
+                    'role': user['role'],  # Incluir el rol del usuario
+                    'fecha_creacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'expires_at': int(expiration_time.timestamp())  # Epoch usado por el TTL de DynamoDB
+                }
 
-            # Almacenar el token en DynamoDB
-            tokens_table = dynamodb.Table(tokens_table_name)
-            tokens_table.put_item(Item=token_data)
+                # Almacenar el token en DynamoDB
+                tokens_table = aws_clients.tabla('DYNAMODB_TABLE_TOKENS')
+                tokens_table.put_item(Item=token_data)
 
             return {
                 'statusCode': 200,
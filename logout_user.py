@@ -0,0 +1,33 @@
+import auth
+import instrumentacion
+
+@instrumentacion.instrumentar
+def logout_user(event, context):
+    try:
+        token = auth.obtener_token(event)
+        if not token:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Faltan datos en los headers'}
+            }
+
+        # Revocar el token: los contenedores lo verán al refrescar la lista de revocados
+        try:
+            auth.revocar_token(token)
+        except auth.ErrorAutenticacion as e:
+            return {
+                'statusCode': e.status_code,
+                'body': e.mensaje
+            }
+
+        return {
+            'statusCode': 200,
+            'body': {'message': 'Sesión cerrada'}
+        }
+
+    except Exception as e:
+        print("Error en logout_user:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
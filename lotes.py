@@ -0,0 +1,74 @@
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+import aws_clients
+
+# Escrituras por lotes con BatchWriteItem (25 items por llamada, varias tablas a la vez).
+# Los items que DynamoDB devuelve en UnprocessedItems se reintentan con backoff exponencial.
+# Si una llamada falla con un ClientError (p. ej. ValidationException por un item de más de
+# 400 KB), todo lo que quedaba de ese lote se devuelve como no escrito y los demás lotes siguen.
+TAMANO_LOTE = 25
+MAX_INTENTOS = 8
+BACKOFF_BASE_SEGUNDOS = 0.05
+BACKOFF_MAX_SEGUNDOS = 2.0
+
+
+def _escribir_lote(lote, max_intentos):
+    # Devuelve las escrituras que siguen sin procesar después de agotar los reintentos (o de un error)
+    client = aws_clients.dynamodb().meta.client
+    request_items = {}
+    for tabla, item in lote:
+        request_items.setdefault(tabla, []).append({'PutRequest': {'Item': item}})
+
+    for intento in range(max_intentos):
+        try:
+            response = client.batch_write_item(RequestItems=request_items)
+        except ClientError as e:
+            print("Error en batch_write_item:", str(e))  # Log en CloudWatch
+            break
+        request_items = response.get('UnprocessedItems') or {}
+        if not request_items:
+            return []
+        # Backoff exponencial con jitter para no insistir sobre la partición saturada
+        time.sleep(random.uniform(0, min(BACKOFF_MAX_SEGUNDOS, BACKOFF_BASE_SEGUNDOS * 2 ** intento)))
+
+    return [(tabla, pedido['PutRequest']['Item']) for tabla, pedidos in request_items.items() for pedido in pedidos]
+
+
+def escribir_en_lotes(escrituras, hilos=1, max_intentos=MAX_INTENTOS):
+    """Escribe una lista de (nombre_tabla, item) en lotes de 25.
+
+    Con hilos > 1 los lotes se envían en paralelo. Devuelve la lista de (nombre_tabla, item)
+    que no se pudieron escribir; vacía si todo se escribió.
+    """
+    lotes = [escrituras[i:i + TAMANO_LOTE] for i in range(0, len(escrituras), TAMANO_LOTE)]
+    if hilos <= 1 or len(lotes) <= 1:
+        resultados = [_escribir_lote(lote, max_intentos) for lote in lotes]
+    else:
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            resultados = list(executor.map(lambda lote: _escribir_lote(lote, max_intentos), lotes))
+    return [fallida for resultado in resultados for fallida in resultado]
+
+
+def escaneo_paralelo(tabla, segmentos, por_pagina, **parametros):
+    """Scan paralelo de `tabla` con `segmentos` hilos (Segment/TotalSegments).
+
+    Llama a por_pagina(segmento, items) por cada página leída y devuelve la cantidad de items.
+    Los parámetros extra (ProjectionExpression, FilterExpression, ...) se pasan a cada scan.
+    """
+    client = aws_clients.dynamodb().meta.client
+
+    def escanear(segmento):
+        leidos = 0
+        pedido = dict(parametros, TableName=tabla, Segment=segmento, TotalSegments=segmentos)
+        while True:
+            response = client.scan(**pedido)
+            por_pagina(segmento, response['Items'])
+            leidos += len(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                return leidos
+            pedido['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    with ThreadPoolExecutor(max_workers=segmentos) as executor:
+        return sum(executor.map(escanear, range(segmentos)))
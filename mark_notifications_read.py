@@ -0,0 +1,115 @@
+import os
+import json
+import auth
+import aws_clients
+import notificaciones
+from botocore.exceptions import ClientError
+import instrumentacion
+
+MAX_NOTIFICACIONES = 100  # Un batch_get_item y una transacción como máximo
+
+
+@instrumentacion.instrumentar
+def mark_notifications_read(event, context):
+    try:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
+            return {
+                'statusCode': e.status_code,
+                'body': e.mensaje
+            }
+
+        user_id = token_item['user_id']
+        user_role = token_item['role']
+
+        body = event.get('body') or {}
+        if isinstance(body, str):  # Si el cuerpo es un string JSON, lo convertimos
+            body = json.loads(body)
+
+        ids = body.get('notificacion_ids')
+        if not isinstance(ids, list) or not ids:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Faltan los notificacion_ids en el cuerpo de la solicitud'}
+            }
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > MAX_NOTIFICACIONES:
+            return {
+                'statusCode': 400,
+                'body': {'error': f'Se pueden marcar como máximo {MAX_NOTIFICACIONES} notificaciones por solicitud'}
+            }
+
+        # Leer todas las notificaciones en un batch_get_item para saber a quién van
+        tabla = os.environ['DYNAMODB_TABLE_NOTIFICACIONES']
+        encontradas = {}
+        request_items = {tabla: {
+            'Keys': [{'notificacion_id': notificacion_id} for notificacion_id in ids],
+            'ProjectionExpression': 'notificacion_id, destinatario, fecha, #status',
+            'ExpressionAttributeNames': {'#status': 'status'}
+        }}
+        while request_items:
+            response = aws_clients.dynamodb().batch_get_item(RequestItems=request_items)
+            for item in response['Responses'].get(tabla, []):
+                encontradas[item['notificacion_id']] = item
+            request_items = response.get('UnprocessedKeys')
+
+        resultados = {}
+        propias = []
+        leido_hasta = None
+        for notificacion_id in ids:
+            item = encontradas.get(notificacion_id)
+            if item is None or item.get('destinatario') not in (user_id, user_role):
+                resultados[notificacion_id] = 'no_encontrada'
+            elif item['destinatario'] == user_id:
+                # Notificación propia: se marca en el item
+                if item.get('status') != 'leida':
+                    propias.append(notificacion_id)
+                resultados[notificacion_id] = 'leida'
+            else:
+                # Notificación del rol: se avanza la marca de lectura del usuario
+                leido_hasta = max(leido_hasta or item['fecha'], item['fecha'])
+                resultados[notificacion_id] = 'leida'
+
+        if propias:
+            notificaciones.transaccion([
+                {
+                    'Update': {
+                        'TableName': tabla,
+                        'Key': {'notificacion_id': notificacion_id},
+                        'UpdateExpression': 'SET #status = :leida',
+                        'ExpressionAttributeNames': {'#status': 'status'},
+                        'ExpressionAttributeValues': {':leida': 'leida'}
+                    }
+                }
+                for notificacion_id in propias
+            ])
+
+        if leido_hasta:
+            try:
+                # La marca solo avanza: marcar una notificación vieja no "desmarca" las nuevas
+                aws_clients.tabla('DYNAMODB_TABLE_NOTIFICACIONES').update_item(
+                    Key={'notificacion_id': notificaciones.clave_lectura(user_id, user_role)},
+                    UpdateExpression='SET leido_hasta = :fecha',
+                    ConditionExpression='attribute_not_exists(leido_hasta) OR leido_hasta < :fecha',
+                    ExpressionAttributeValues={':fecha': leido_hasta}
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+
+        return {
+            'statusCode': 200,
+            'body': {
+                'resultados': resultados,
+                'leido_hasta': leido_hasta
+            }
+        }
+
+    except Exception as e:
+        print("Error en mark_notifications_read:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
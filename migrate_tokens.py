@@ -0,0 +1,63 @@
+"""Copia los tokens vigentes de la tabla anterior (t_tokens_acceso) a la nueva (t_tokens).
+
+Uso:
+    python migrate_tokens.py --origen dev-t_tokens_acceso --destino dev-t_tokens
+
+Los tokens vencidos no se copian. Mientras la migración no termine, auth.py también migra
+de forma perezosa los tokens que encuentra solo en la tabla anterior, así que el script
+se puede ejecutar con el servicio en línea y repetir sin problema (las escrituras son idempotentes).
+"""
+import os
+import time
+import argparse
+import auth
+import aws_clients
+
+
+def convertir(item):
+    # Filas de revocación (tokens firmados) y tokens normales
+    if item['tenant_id'].startswith('revocado#'):
+        return {
+            'token': item['tenant_id'],
+            'lista': item['lista'],
+            'jti': item['jti'],
+            'revocado_en': item['revocado_en'],
+            'expires_at': item['expires_at']
+        }
+    return auth.convertir_token_legacy(item)
+
+
+def migrar(origen, destino):
+    dynamodb = aws_clients.dynamodb()
+    tabla_origen = dynamodb.Table(origen)
+    tabla_destino = dynamodb.Table(destino)
+
+    ahora = time.time()
+    leidos = copiados = 0
+    parametros = {}
+    with tabla_destino.batch_writer(overwrite_by_pkeys=['token']) as batch:
+        while True:
+            response = tabla_origen.scan(**parametros)
+            for item in response['Items']:
+                leidos += 1
+                nuevo = convertir(item)
+                if int(nuevo['expires_at']) <= ahora:
+                    continue
+                batch.put_item(Item=nuevo)
+                copiados += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    print(f'Tokens leídos: {leidos}, copiados (vigentes): {copiados}')
+    return copiados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migra los tokens vigentes a la tabla con clave única y TTL')
+    parser.add_argument('--origen', default=os.environ.get('DYNAMODB_TABLE_TOKENS_LEGACY'))
+    parser.add_argument('--destino', default=os.environ.get('DYNAMODB_TABLE_TOKENS'))
+    args = parser.parse_args()
+    if not args.origen or not args.destino:
+        parser.error('Faltan los nombres de las tablas de origen y destino')
+    migrar(args.origen, args.destino)
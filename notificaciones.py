@@ -0,0 +1,241 @@
+import os
+import time
+import uuid
+import random
+from collections import deque
+from datetime import datetime
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+import aws_clients
+import archivo_s3
+import indice
+import instrumentacion
+
+# Outbox de notificaciones: los handlers guardan la intención de notificar en la misma
+# transacción que la incidencia, y procesar_notificaciones (disparado por el stream de la
+# tabla outbox) crea las notificaciones en DynamoDB y S3 por lotes, fuera del request.
+OUTBOX_RETENCION_SEGUNDOS = 7 * 24 * 3600
+PREFIJO_ARCHIVO = 'notificaciones/archivo'
+
+# Bandeja de entrada: índice por destinatario (usuario o rol) y fecha. Las notificaciones a un
+# rol no se copian por usuario; cada usuario guarda hasta qué fecha leyó el feed de su rol en
+# un item 'lectura#<user_id>#<rol>' de la misma tabla (sin destinatario, no entra al índice).
+INDICE_DESTINATARIO = 'destinatario-fecha-index'
+
+# Dos transacciones concurrentes sobre un mismo item se cancelan con TransactionConflict, que
+# botocore no reintenta; se reintentan aquí con backoff exponencial y jitter
+MAX_INTENTOS_CONFLICTO = 6
+BACKOFF_CONFLICTO_SEGUNDOS = 0.05
+
+_deserializer = TypeDeserializer()
+
+
+def construir_notificacion(incidente_id, mensaje, destinatario):
+    return {
+        'notificacion_id': str(uuid.uuid4()),
+        'incidente_id': incidente_id,
+        'mensaje': mensaje,
+        'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'status': 'pendiente',
+        'destinatario': destinatario  # Usuario o rol que recibe la notificación
+    }
+
+
+def clave_lectura(user_id, rol):
+    return f'lectura#{user_id}#{rol}'
+
+
+def leido_hasta(user_id, rol):
+    """Fecha hasta la que el usuario leyó las notificaciones de su rol (None si nunca)."""
+    item = aws_clients.tabla('DYNAMODB_TABLE_NOTIFICACIONES').get_item(
+        Key={'notificacion_id': clave_lectura(user_id, rol)}, ConsistentRead=True
+    ).get('Item')
+    return item['leido_hasta'] if item else None
+
+
+def put_outbox(notificacion, resolver_destinatario=False, indexar=None):
+    """Elemento Put (para transact_write_items) con la intención de notificar.
+
+    Con resolver_destinatario=True la notificación va a quien reportó la incidencia, y es el
+    consumidor quien lo busca (en lote) en vez del handler. Con indexar='creacion' o
+    'actualizacion' el consumidor también actualiza el índice de búsqueda de la incidencia.
+    """
+    item = {
+        'outbox_id': notificacion['notificacion_id'],
+        'tipo': 'notificacion',
+        'notificacion': notificacion,
+        'expires_at': int(time.time()) + OUTBOX_RETENCION_SEGUNDOS  # TTL de DynamoDB
+    }
+    if resolver_destinatario:
+        item['resolver_destinatario'] = True
+    if indexar:
+        item['indexar'] = indexar
+    return {
+        'Put': {
+            'TableName': os.environ['DYNAMODB_TABLE_OUTBOX'],
+            'Item': item
+        }
+    }
+
+
+def es_conflicto(error):
+    """True si la escritura falló solo por otra transacción en curso sobre los mismos items."""
+    codigo = error.response['Error']['Code']
+    if codigo == 'TransactionConflictException':
+        return True
+    if codigo != 'TransactionCanceledException':
+        return False
+    codigos = {motivo.get('Code') for motivo in error.response.get('CancellationReasons', [])}
+    return 'TransactionConflict' in codigos and codigos <= {'TransactionConflict', 'None', None}
+
+
+def con_reintentos(llamada, *args, **kwargs):
+    """Ejecuta una escritura reintentando los conflictos con transacciones concurrentes."""
+    for intento in range(MAX_INTENTOS_CONFLICTO):
+        try:
+            return llamada(*args, **kwargs)
+        except ClientError as e:
+            if intento + 1 == MAX_INTENTOS_CONFLICTO or not es_conflicto(e):
+                raise
+            time.sleep(random.uniform(0, BACKOFF_CONFLICTO_SEGUNDOS * 2 ** intento))
+
+
+def transaccion(transact_items):
+    # El cliente del resource acepta tipos de Python (sin {'S': ...}) también en transacciones
+    return con_reintentos(aws_clients.dynamodb().meta.client.transact_write_items, TransactItems=transact_items)
+
+
+def motivo_cancelacion(error, indice):
+    """Código y item actual (ALL_OLD) del elemento `indice` de una transacción cancelada."""
+    if error.response['Error']['Code'] != 'TransactionCanceledException':
+        return error.response['Error']['Code'], None
+    motivo = error.response.get('CancellationReasons', [])[indice]
+    item = motivo.get('Item')
+    # Los errores no pasan por la conversión de tipos del resource: el item viene como {'S': ...}
+    return motivo.get('Code'), {k: _deserializer.deserialize(v) for k, v in item.items()} if item else None
+
+
+def particion_archivo(notificacion):
+    # notificaciones/archivo/fecha=2025-11-16/destinatario=<usuario o rol>/segmento-....ndjson.gz
+    return f"fecha={notificacion['fecha'][:10]}/destinatario={notificacion['destinatario']}"
+
+
+def leer_archivo(fecha, destinatario=None):
+    """Recorre las notificaciones archivadas de un día (y opcionalmente de un destinatario)."""
+    prefijo = f'{PREFIJO_ARCHIVO}/fecha={fecha}/'
+    if destinatario:
+        prefijo += f'destinatario={destinatario}/'
+    return archivo_s3.leer_particion(os.environ['NOTIFICACIONES_BUCKET_NAME'], prefijo)
+
+
+def _resolver_destinatarios(registros):
+    # Un solo batch_get_item (por cada 100 incidencias) para todo el lote. La notificación va
+    # a quien creó la incidencia y a cada reporte que se sumó a ella (ver create_incident.py):
+    # una copia por destinatario, con un id derivado del original para que reintentar el lote
+    # no duplique nada
+    pendientes = {r['notificacion']['incidente_id'] for r in registros if r.get('resolver_destinatario')}
+    if not pendientes:
+        return registros
+
+    tabla_incidencias = os.environ['DYNAMODB_TABLE_INCIDENCIAS']
+    destinatarios = {}
+    claves = [{'incidente_id': incidente_id} for incidente_id in pendientes]
+    for i in range(0, len(claves), 100):
+        request_items = {tabla_incidencias: {'Keys': claves[i:i + 100], 'ProjectionExpression': 'incidente_id, reportado_por, reportantes'}}
+        while request_items:
+            response = aws_clients.dynamodb().batch_get_item(RequestItems=request_items)
+            for item in response['Responses'].get(tabla_incidencias, []):
+                destinatarios[item['incidente_id']] = list(dict.fromkeys([item.get('reportado_por')] + item.get('reportantes', [])))
+            request_items = response.get('UnprocessedKeys')
+
+    resueltos = []
+    for registro in registros:
+        if not registro.get('resolver_destinatario'):
+            resueltos.append(registro)
+            continue
+        notificacion = registro['notificacion']
+        for n, destinatario in enumerate(destinatarios.get(notificacion['incidente_id'], [])):
+            notificacion_id = notificacion['notificacion_id'] if n == 0 else str(uuid.uuid5(uuid.NAMESPACE_URL, f"{notificacion['notificacion_id']}/{destinatario}"))
+            resueltos.append(dict(registro, notificacion=dict(notificacion, notificacion_id=notificacion_id, destinatario=destinatario)))
+    return resueltos
+
+
+def procesar_lote(registros):
+    """Materializa un lote de registros del outbox. Es idempotente: reintentar un lote no duplica nada."""
+    registros = [r for r in registros if r.get('tipo') == 'notificacion']
+    if not registros:
+        return 0
+
+    # Índice de búsqueda de las incidencias creadas o actualizadas (ver indice.py)
+    indice.reindexar(
+        [r['notificacion']['incidente_id'] for r in registros if r.get('indexar') == 'creacion'],
+        [r['notificacion']['incidente_id'] for r in registros if r.get('indexar') == 'actualizacion']
+    )
+
+    registros = _resolver_destinatarios(registros)
+    # Notificaciones de incidencias que ya no existen (o sin creador) no tienen a quién llegar
+    registros = [r for r in registros if r['notificacion'].get('destinatario')]
+
+    notificaciones_table = aws_clients.tabla('DYNAMODB_TABLE_NOTIFICACIONES')
+    with notificaciones_table.batch_writer(overwrite_by_pkeys=['notificacion_id']) as batch:
+        for registro in registros:
+            batch.put_item(Item=registro['notificacion'])
+
+    # En S3 el lote completo va a unos pocos segmentos NDJSON gzip (uno por día y destinatario)
+    escritor = archivo_s3.EscritorArchivo(
+        os.environ['NOTIFICACIONES_BUCKET_NAME'], PREFIJO_ARCHIVO, particion_archivo,
+        clave_registro=lambda notificacion: notificacion['notificacion_id']
+    )
+    for registro in registros:
+        escritor.agregar(registro['notificacion'])
+    escritor.flush()
+
+    print(f'Notificaciones generadas: {len(registros)}')
+    return len(registros)
+
+
+@instrumentacion.instrumentar
+def procesar_notificaciones(event, context):
+    # Handler del stream de la tabla outbox (solo eventos INSERT, ver serverless.yml)
+    registros = [
+        {k: _deserializer.deserialize(v) for k, v in record['dynamodb']['NewImage'].items()}
+        for record in event.get('Records', [])
+        if record.get('eventName') == 'INSERT'
+    ]
+    return {'procesados': procesar_lote(registros)}
+
+
+class ColaEnMemoria:
+    """Sustituto local del stream de DynamoDB para probar el outbox sin desplegar.
+
+    sincronizar() lee la tabla outbox y encola los registros nuevos; consumir() los entrega
+    a procesar_lote en lotes del tamaño indicado, igual que el event source mapping.
+    """
+
+    def __init__(self, tamano_lote=100):
+        self.tamano_lote = tamano_lote
+        self.pendientes = deque()
+        self._vistos = set()
+
+    def publicar(self, registro):
+        if registro['outbox_id'] not in self._vistos:
+            self._vistos.add(registro['outbox_id'])
+            self.pendientes.append(registro)
+
+    def sincronizar(self):
+        outbox_table = aws_clients.tabla('DYNAMODB_TABLE_OUTBOX')
+        parametros = {}
+        while True:
+            response = outbox_table.scan(**parametros)
+            for item in response['Items']:
+                self.publicar(item)
+            if 'LastEvaluatedKey' not in response:
+                break
+            parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def consumir(self):
+        procesados = 0
+        while self.pendientes:
+            lote = [self.pendientes.popleft() for _ in range(min(self.tamano_lote, len(self.pendientes)))]
+            procesados += procesar_lote(lote)
+        return procesados
@@ -0,0 +1,188 @@
+"""Alta masiva de usuarios desde CSV o NDJSON (inicio de semestre).
+
+Cada registro tiene tenant_id, password, role, nombre y apellido (las columnas del CSV o las
+claves de cada línea JSON). Los correos repetidos dentro del archivo se dan de alta una sola
+vez y los que ya tienen usuario en t_usuarios se omiten: se consulta la partición de cada
+correo con varios hilos. Cada alta es la misma transacción que en register_user.py (usuario
+y marca de correo único), así un registro concurrente del mismo correo no crea un duplicado;
+las transacciones se envían en paralelo y se informa el avance y el throughput.
+
+Como endpoint (POST /users/provision, roles no estudiantes):
+    {"formato": "csv", "contenido": "tenant_id,password,role,nombre,apellido\\n..."}
+    {"usuarios": [{"tenant_id": ..., ...}, ...]}
+
+Como script, con credenciales de AWS:
+    python provision_users.py alumnos-2026-1.csv --hilos 8
+"""
+import io
+import csv
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+import auth
+import instrumentacion
+from register_user import construir_usuario, dar_de_alta, registrado
+
+MAX_USUARIOS = 2000  # Por request; el script no tiene límite
+HILOS_POR_DEFECTO = 8
+USUARIOS_POR_TANDA = 1000  # Cada cuánto se informa el avance
+
+
+def leer_registros(contenido, formato):
+    """Lista de dicts a partir del texto de un CSV (con encabezado) o de un NDJSON."""
+    if formato == 'csv':
+        return list(csv.DictReader(io.StringIO(contenido)))
+    if formato == 'ndjson':
+        return [json.loads(linea) for linea in contenido.splitlines() if linea.strip()]
+    raise ValueError(f'Formato no soportado: {formato}')
+
+
+def existentes(tenant_ids, hilos=HILOS_POR_DEFECTO):
+    """Correos que ya tienen usuario en t_usuarios (una consulta por correo, en paralelo)."""
+    tenant_ids = list(tenant_ids)
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        return {tenant_id for tenant_id, existe in zip(tenant_ids, executor.map(registrado, tenant_ids)) if existe}
+
+
+def aprovisionar(registros, hilos=HILOS_POR_DEFECTO, progreso=None):
+    """Da de alta los registros que no existen; progreso(escritos, total, segundos) por tanda.
+
+    Devuelve el resumen: creados, ya existentes, repetidos en el archivo, inválidos (número
+    de registro y motivo), no escritos por un error de DynamoDB y usuarios por segundo.
+    """
+    inicio = time.perf_counter()
+    usuarios = {}
+    invalidos = []
+    repetidos = 0
+    for numero, datos in enumerate(registros, start=1):
+        usuario = construir_usuario(datos) if isinstance(datos, dict) else None
+        if usuario is None:
+            invalidos.append({'registro': numero, 'error': 'Faltan datos'})
+        elif usuario['tenant_id'] in usuarios:
+            repetidos += 1
+        else:
+            usuarios[usuario['tenant_id']] = usuario
+
+    ya_existentes = existentes(usuarios, hilos)
+    nuevos = [usuario for tenant_id, usuario in usuarios.items() if tenant_id not in ya_existentes]
+
+    def alta(usuario):
+        # True si se creó, False si el correo se registró entre la consulta y la escritura
+        try:
+            return dar_de_alta(usuario)
+        except ClientError as e:
+            print(f"No se pudo dar de alta a {usuario['tenant_id']}:", str(e))  # Log en CloudWatch
+            return None
+
+    creados = 0
+    no_escritos = []
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        for i in range(0, len(nuevos), USUARIOS_POR_TANDA):
+            tanda = nuevos[i:i + USUARIOS_POR_TANDA]
+            for usuario, creado in zip(tanda, executor.map(alta, tanda)):
+                if creado:
+                    creados += 1
+                elif creado is None:
+                    no_escritos.append(usuario['tenant_id'])
+                else:
+                    ya_existentes.add(usuario['tenant_id'])
+            if progreso:
+                progreso(i + len(tanda), len(nuevos), time.perf_counter() - inicio)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'creados': creados,
+        'existentes': len(ya_existentes),
+        'repetidos': repetidos,
+        'invalidos': invalidos,
+        'no_escritos': no_escritos,
+        'segundos': round(segundos, 2),
+        'usuarios_por_segundo': round(creados / segundos, 1) if segundos else 0
+    }
+
+
+# El CSV/NDJSON trae contraseñas en texto plano: no se escribe nunca en el log del evento
+@instrumentacion.instrumentar(ocultar=('contenido', 'usuarios'))
+def provision_users(event, context):
+    try:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
+            return {
+                'statusCode': e.status_code,
+                'body': e.mensaje
+            }
+
+        # Verificar si el usuario no es un estudiante
+        if token_item['role'] == 'estudiante':
+            return {
+                'statusCode': 403,
+                'body': 'Solo los roles no estudiantes pueden dar de alta usuarios'
+            }
+
+        body = event['body']
+        if isinstance(body, str):  # Si el cuerpo es un string JSON, lo convertimos
+            body = json.loads(body)
+
+        try:
+            if 'usuarios' in body:
+                registros = body['usuarios']
+            else:
+                registros = leer_registros(body.get('contenido') or '', body.get('formato', 'csv'))
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': {'error': f'No se pudo leer el contenido: {e}'}
+            }
+
+        if not isinstance(registros, list) or not registros:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Faltan los usuarios en el cuerpo de la solicitud'}
+            }
+        if len(registros) > MAX_USUARIOS:
+            return {
+                'statusCode': 400,
+                'body': {'error': f'Se pueden dar de alta como máximo {MAX_USUARIOS} usuarios por solicitud'}
+            }
+
+        resumen = aprovisionar(registros)
+        instrumentacion.anotar('aprovisionamiento', {k: v for k, v in resumen.items() if not isinstance(v, list)})
+        return {
+            'statusCode': 200,
+            'body': resumen
+        }
+
+    except Exception as e:
+        print("Error en provision_users:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Alta masiva de usuarios desde CSV o NDJSON')
+    parser.add_argument('archivo', help='Archivo .csv o .ndjson (- para la entrada estándar)')
+    parser.add_argument('--formato', choices=('csv', 'ndjson'), help='Por defecto, según la extensión del archivo')
+    parser.add_argument('--hilos', type=int, default=HILOS_POR_DEFECTO)
+    args = parser.parse_args()
+
+    formato = args.formato or ('csv' if args.archivo.endswith('.csv') else 'ndjson')
+    if args.archivo == '-':
+        contenido = sys.stdin.read()
+    else:
+        with open(args.archivo, encoding='utf-8-sig') as archivo:
+            contenido = archivo.read()
+
+    resumen = aprovisionar(
+        leer_registros(contenido, formato), args.hilos,
+        lambda escritos, total, segundos: print(
+            f'{escritos}/{total} usuarios escritos ({escritos / segundos:.0f} por segundo)', file=sys.stderr
+        )
+    )
+    print(json.dumps(resumen, indent=2))
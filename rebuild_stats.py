@@ -0,0 +1,108 @@
+"""Recalcula los contadores de t_estadisticas a partir de t_incidencias con un scan paralelo.
+
+Uso:
+    python rebuild_stats.py --segmentos 8
+
+Los contadores totales quedan exactos. En los contadores por día, las creaciones se
+reconstruyen completas, pero de los cambios de fase solo queda el último (fecha_actualizacion),
+porque las transiciones intermedias no se guardan en la incidencia. Conviene ejecutarlo con
+poco tráfico de escritura: los ADD que lleguen durante el recálculo se pierden al reemplazar
+los contadores. Las incidencias archivadas en S3 (ver archive_incidents.py) también se
+cuentan, igual que los contadores incrementales, que no las descuentan al archivarlas.
+"""
+import os
+import argparse
+import threading
+from collections import Counter
+import archive_incidents
+import aws_clients
+import cache_respuestas
+import estadisticas
+import lotes
+
+CAMPOS = ('incidente_id', 'fase', 'tipo_incidencia', 'urgencia', 'gravedad', 'fecha_creacion', 'fecha_actualizacion')
+
+
+def calcular(segmentos):
+    contadores = {}
+    lock = threading.Lock()
+    # Una incidencia que el archivado copió a S3 pero no llegó a borrar está en los dos lados:
+    # se cuenta la de la tabla. Solo pueden estar en los dos las resueltas de días archivados
+    fechas_archivo = archive_incidents.particiones_en_rango(None, None)
+    dias_archivados = set(fechas_archivo)
+    en_tabla = set()
+
+    def por_pagina(segmento, items):
+        parciales = {}
+        for incidencia in items:
+            if incidencia['fase'] == 'resuelta' and incidencia['fecha_creacion'][:10] in dias_archivados:
+                with lock:
+                    en_tabla.add(incidencia['incidente_id'])
+            total = parciales.setdefault(estadisticas.clave_total(0), Counter())
+            dia = parciales.setdefault(estadisticas.clave_dia(incidencia['fecha_creacion'][:10], 0), Counter())
+            for contador in (total, dia):
+                contador['total'] += 1
+                for dimension in ('tipo_incidencia', 'urgencia', 'gravedad'):
+                    contador[f'{dimension}#{estadisticas.categoria(dimension, incidencia[dimension])}'] += 1
+            total[f"fase#{incidencia['fase']}"] += 1
+            dia['fase#pendiente'] += 1
+            if incidencia['fase'] != 'pendiente' and incidencia.get('fecha_actualizacion'):
+                cambio = parciales.setdefault(estadisticas.clave_dia(incidencia['fecha_actualizacion'][:10], 0), Counter())
+                cambio[f"fase#{incidencia['fase']}"] += 1
+        with lock:
+            for clave, contador in parciales.items():
+                contadores.setdefault(clave, Counter()).update(contador)
+
+    nombres = {f'#f{i}': campo for i, campo in enumerate(CAMPOS)}
+    leidas = lotes.escaneo_paralelo(
+        os.environ['DYNAMODB_TABLE_INCIDENCIAS'], segmentos, por_pagina,
+        ProjectionExpression=', '.join(nombres), ExpressionAttributeNames=nombres
+    )
+    for fecha in fechas_archivo:
+        archivadas = [incidencia for incidencia in archive_incidents.leer_particion(fecha) if incidencia['incidente_id'] not in en_tabla]
+        por_pagina(None, archivadas)
+        leidas += len(archivadas)
+    return leidas, contadores
+
+
+def reemplazar(contadores):
+    # Se borran todos los shards y se deja la cuenta completa en el shard 0
+    tabla = aws_clients.tabla('DYNAMODB_TABLE_ESTADISTICAS')
+    existentes = []
+    parametros = {'ProjectionExpression': 'contador'}
+    while True:
+        response = tabla.scan(**parametros)
+        # La versión del cache de respuestas no es un contador y no se borra (ver cache_respuestas.py)
+        existentes.extend(item['contador'] for item in response['Items'] if item['contador'] != cache_respuestas.CONTADOR_VERSION)
+        if 'LastEvaluatedKey' not in response:
+            break
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    with tabla.batch_writer(overwrite_by_pkeys=['contador']) as batch:
+        for clave in existentes:
+            if clave not in contadores:
+                batch.delete_item(Key={'contador': clave})
+        for clave, contador in contadores.items():
+            batch.put_item(Item=dict(contador, contador=clave))
+
+    # Las estadísticas cacheadas ya no valen
+    cache_respuestas.invalidar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recalcula los contadores de incidencias')
+    parser.add_argument('--segmentos', type=int, default=8, help='Hilos del scan paralelo')
+    parser.add_argument('--dry-run', action='store_true', help='Solo muestra los contadores calculados')
+    args = parser.parse_args()
+
+    leidas, contadores = calcular(args.segmentos)
+    print(f'Incidencias leídas: {leidas}, contadores: {len(contadores)}')
+    if args.dry_run:
+        for clave in sorted(contadores):
+            print(clave, dict(contadores[clave]))
+        return
+    reemplazar(contadores)
+
+
+if __name__ == '__main__':
+    main()
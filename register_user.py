@@ -1,60 +1,101 @@
-import boto3
+import aws_clients
 import hashlib
-import uuid
+import notificaciones
 import os
+import uuid
 from datetime import datetime
+import instrumentacion
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+# Correo único: además del usuario, la partición del correo tiene un item con user_id fijo
+# (MARCA_CORREO) que se escribe en la misma transacción con attribute_not_exists. Dos registros
+# concurrentes del mismo correo no pueden salir bien los dos: el segundo encuentra la marca.
+MARCA_CORREO = '#unico'
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-def register_user(event, context):
-    print("Event recibido en register_user:", event)  # Log en CloudWatch
+def construir_usuario(datos):
+    """Item de t_usuarios a partir de los datos recibidos; None si faltan datos."""
+    tenant_id = datos.get('tenant_id')  # Correo electrónico del usuario
+    password = datos.get('password')
+    role = datos.get('role')  # Estudiante, administrativo o autoridad
+    nombre = datos.get('nombre')
+    apellido = datos.get('apellido')
+
+    if not tenant_id or not password or not role or not nombre or not apellido:
+        return None
 
+    return {
+        'tenant_id': tenant_id,  # Correo electrónico
+        'user_id': str(uuid.uuid4()),  # UUID
+        'password': hash_password(password),
+        'role': role,  # Guardamos el rol (estudiante, administrativo, autoridad)
+        'nombre': nombre,
+        'apellido': apellido,
+        'fecha_registro': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def registrado(tenant_id):
+    # Los usuarios registrados antes de la marca de correo único no la tienen: se mira si la
+    # partición del correo ya tiene algún item (usuario o marca)
+    response = aws_clients.tabla('DYNAMODB_TABLE_USUARIOS').query(
+        KeyConditionExpression=Key('tenant_id').eq(tenant_id),
+        ProjectionExpression='tenant_id',
+        ConsistentRead=True,
+        Limit=1
+    )
+    return bool(response['Items'])
+
+def dar_de_alta(usuario):
+    """Escribe el usuario y la marca de su correo en una transacción; False si el correo ya estaba registrado."""
+    tabla_usuarios = os.environ['DYNAMODB_TABLE_USUARIOS']
     try:
-        body = event['body']
-        tenant_id = body.get('tenant_id')  # Correo electrónico del usuario
-        password = body.get('password')
-        role = body.get('role')  # Estudiante, administrativo o autoridad
-        nombre = body.get('nombre')
-        apellido = body.get('apellido')
+        notificaciones.transaccion([
+            {
+                'Put': {
+                    'TableName': tabla_usuarios,
+                    'Item': {'tenant_id': usuario['tenant_id'], 'user_id': MARCA_CORREO},
+                    'ConditionExpression': 'attribute_not_exists(tenant_id)'
+                }
+            },
+            {
+                'Put': {
+                    'TableName': tabla_usuarios,
+                    'Item': usuario
+                }
+            }
+        ])
+    except ClientError as e:
+        codigo, _ = notificaciones.motivo_cancelacion(e, 0)
+        if codigo == 'ConditionalCheckFailed':
+            return False
+        raise
+    return True
 
-        if not tenant_id or not password or not role or not nombre or not apellido:
+@instrumentacion.instrumentar
+def register_user(event, context):
+    try:
+        usuario_data = construir_usuario(event['body'])
+        if usuario_data is None:
             return {
                 'statusCode': 400,
                 'body': {'error': 'Faltan datos en el cuerpo de la solicitud'}
             }
 
-        # Hashear la contraseña
-        hashed_password = hash_password(password)
-
-        # Obtener el UUID del usuario
-        user_id = str(uuid.uuid4())
-
-        # Fecha de registro
-        fecha_registro = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Conectar a DynamoDB
-        dynamodb = boto3.resource('dynamodb')
-        usuarios_table = dynamodb.Table(os.environ['DYNAMODB_TABLE_USUARIOS'])
-
-        # Almacenar el usuario en DynamoDB
-        usuario_data = {
-            'tenant_id': tenant_id,  # Correo electrónico
-            'user_id': user_id,  # UUID
-            'password': hashed_password,
-            'role': role,  # Guardamos el rol (estudiante, administrativo, autoridad)
-            'nombre': nombre,
-            'apellido': apellido,
-            'fecha_registro': fecha_registro
-        }
-
-        usuarios_table.put_item(Item=usuario_data)
+        # Usuario y marca de correo único en una transacción (ver dar_de_alta)
+        if registrado(usuario_data['tenant_id']) or not dar_de_alta(usuario_data):
+            return {
+                'statusCode': 409,
+                'body': {'error': 'Ya existe un usuario con ese correo'}
+            }
 
         return {
             'statusCode': 200,
             'body': {
                 'message': 'Usuario registrado exitosamente',
-                'user_id': user_id
+                'user_id': usuario_data['user_id']
             }
         }
 
@@ -0,0 +1,46 @@
+import register_user
+import login_user
+import logout_user
+import validate_token
+import create_incident
+import create_incidents_bulk
+import update_incident
+import get_incidents_history
+import get_incidents_stats
+import export_incidents
+import get_notifications_inbox
+import mark_notifications_read
+import search_incidents
+import provision_users
+
+# Modo de despliegue con una sola función: todas las rutas comparten el mismo contenedor
+# caliente (y sus clientes de AWS) en vez de tener un cold start por endpoint.
+# Ver funciones-router.yml.
+RUTAS = {
+    ('POST', '/users/register'): register_user.register_user,
+    ('POST', '/users/provision'): provision_users.provision_users,
+    ('POST', '/users/login'): login_user.login_user,
+    ('POST', '/users/logout'): logout_user.logout_user,
+    ('GET', '/users/validate-token'): validate_token.validate_token,
+    ('POST', '/incidents/create'): create_incident.create_incident,
+    ('POST', '/incidents/bulk-create'): create_incidents_bulk.create_incidents_bulk,
+    ('PUT', '/incidents/update'): update_incident.update_incident,
+    ('GET', '/incidents/history'): get_incidents_history.get_incidents_history,
+    ('GET', '/incidents/stats'): get_incidents_stats.get_incidents_stats,
+    ('POST', '/incidents/export'): export_incidents.export_incidents,
+    ('GET', '/incidents/search'): search_incidents.search_incidents,
+    ('GET', '/notifications/inbox'): get_notifications_inbox.get_notifications_inbox,
+    ('POST', '/notifications/read'): mark_notifications_read.mark_notifications_read,
+}
+
+
+def router(event, context):
+    # Con integration: lambda, API Gateway envía el método y la ruta del recurso en el evento
+    ruta = ((event.get('method') or '').upper(), event.get('requestPath') or '')
+    handler = RUTAS.get(ruta)
+    if handler is None:
+        return {
+            'statusCode': 404,
+            'body': {'error': 'Ruta no encontrada'}
+        }
+    return handler(event, context)
@@ -0,0 +1,148 @@
+import os
+import auth
+import aws_clients
+import indice
+import instrumentacion
+import texto
+from boto3.dynamodb.conditions import Key, Attr
+from get_incidents_history import codificar_cursor, decodificar_cursor, es_clave, leer_campos, proyeccion, recortar, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+
+MAX_TERMINOS = 8
+
+
+def buscar(terminos, limite, exclusive_start_key=None, fase=None):
+    """Incidencias que contienen todos los términos, por urgencia y fecha (de mayor a menor).
+
+    Se recorren los postings del término menos frecuente y, para cada candidata, se piden las
+    claves exactas de los demás términos; el costo depende de las coincidencias del término
+    más raro, no del tamaño de la tabla. Devuelve (items del índice, LastEvaluatedKey).
+    """
+    frecuencias = indice.frecuencias(terminos)
+    if min(frecuencias.values()) == 0:
+        return [], None
+    terminos = sorted(terminos, key=lambda termino: frecuencias[termino])
+    if exclusive_start_key and exclusive_start_key.get('termino') in terminos:
+        # Al paginar se sigue por el mismo término aunque las frecuencias hayan cambiado
+        terminos.remove(exclusive_start_key['termino'])
+        terminos.insert(0, exclusive_start_key['termino'])
+
+    tabla_indice = os.environ['DYNAMODB_TABLE_INDICE']
+    indice_table = aws_clients.tabla('DYNAMODB_TABLE_INDICE')
+    parametros = {
+        'KeyConditionExpression': Key('termino').eq(terminos[0]) & Key('orden').gte('0'),
+        'ScanIndexForward': False,
+        'Limit': limite
+    }
+    if fase:
+        parametros['FilterExpression'] = Attr('fase').eq(fase)
+    if exclusive_start_key:
+        parametros['ExclusiveStartKey'] = exclusive_start_key
+
+    encontrados = []
+    while True:
+        response = indice_table.query(**parametros)
+        candidatos = response['Items']
+        for termino in terminos[1:]:
+            if not candidatos:
+                break
+            presentes = {
+                item['orden'] for item in indice.batch_get(
+                    tabla_indice,
+                    [{'termino': termino, 'orden': candidato['orden']} for candidato in candidatos],
+                    ProjectionExpression='orden'
+                )
+            }
+            candidatos = [candidato for candidato in candidatos if candidato['orden'] in presentes]
+
+        # Se corta en el último candidato usado para que la página siguiente siga desde ahí
+        for candidato in candidatos:
+            encontrados.append(candidato)
+            if len(encontrados) == limite:
+                ultimo = {'termino': candidato['termino'], 'orden': candidato['orden']}
+                hay_mas = candidato is not response['Items'][-1] or 'LastEvaluatedKey' in response
+                return encontrados, ultimo if hay_mas else None
+        if 'LastEvaluatedKey' not in response:
+            return encontrados, None
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+@instrumentacion.instrumentar
+def search_incidents(event, context):
+    try:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
+            return {
+                'statusCode': e.status_code,
+                'body': e.mensaje
+            }
+
+        # Verificar si el usuario no es un estudiante
+        if token_item['role'] == 'estudiante':
+            return {
+                'statusCode': 403,
+                'body': 'Solo los roles no estudiantes pueden buscar incidencias'
+            }
+
+        # ?q=proyector baño&fase=...&limit=...&cursor=...&fields=...
+        query = event.get('query') or {}
+        terminos = texto.terminos(query.get('q'))
+        if not terminos:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Falta el texto a buscar (q)'}
+            }
+        if len(terminos) > MAX_TERMINOS:
+            return {
+                'statusCode': 400,
+                'body': {'error': f'Se pueden buscar como máximo {MAX_TERMINOS} palabras'}
+            }
+
+        try:
+            limite = min(int(query.get('limit', LIMITE_POR_DEFECTO)), LIMITE_MAXIMO)
+            exclusive_start_key = decodificar_cursor(query['cursor']) if query.get('cursor') else None
+            if limite < 1:
+                raise ValueError(limite)
+            if exclusive_start_key is not None and not es_clave(exclusive_start_key):
+                raise ValueError(exclusive_start_key)
+        except ValueError:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Parámetros de paginación no válidos'}
+            }
+
+        try:
+            campos = leer_campos(query.get('fields'))
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': {'error': f'Campos no válidos: {e}'}
+            }
+        # incidente_id hace falta para devolver las incidencias en el orden del índice
+        parametros = proyeccion(sorted(set(campos) | {'incidente_id'})) if campos else {}
+
+        postings, last_evaluated_key = buscar(terminos, limite, exclusive_start_key, query.get('fase'))
+
+        # Las incidencias completas, en el orden del índice (las que ya no están en la tabla se omiten)
+        incidencias = {
+            item['incidente_id']: item for item in indice.batch_get(
+                os.environ['DYNAMODB_TABLE_INCIDENCIAS'],
+                [{'incidente_id': posting['incidente_id']} for posting in postings],
+                **parametros
+            )
+        }
+        return {
+            'statusCode': 200,
+            'body': {
+                'items': [recortar(incidencias[posting['incidente_id']], campos) for posting in postings if posting['incidente_id'] in incidencias],
+                'cursor': codificar_cursor(last_evaluated_key)
+            }
+        }
+
+    except Exception as e:
+        print("Error en search_incidents:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
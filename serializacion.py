@@ -0,0 +1,30 @@
+import json
+from decimal import Decimal
+
+# Serialización JSON de items de DynamoDB, donde los números llegan como Decimal. Con
+# simplejson instalado se usa su encoder en C con use_decimal=True: los Decimal se escriben
+# sin llamar a una función de Python por cada valor. Si no está, se usa json de la librería
+# estándar con a_json como default=. En los dos casos la salida es compacta (sin espacios) y
+# en UTF-8 (las tildes no se escapan como ñ).
+# Los cuerpos de respuesta de los handlers no pasan por aquí: con integration: lambda API
+# Gateway devuelve el dict que retorna la función tal cual lo serializa el runtime de Lambda,
+# y un cuerpo ya serializado llegaría al cliente como un string en vez de un objeto.
+try:
+    import simplejson as _simplejson
+except ImportError:
+    _simplejson = None
+
+SEPARADORES = (',', ':')
+
+
+def a_json(valor):
+    # default= de json.dumps: los números de DynamoDB llegan como Decimal
+    if isinstance(valor, Decimal):
+        return int(valor) if valor == valor.to_integral_value() else float(valor)
+    return str(valor)
+
+
+def dumps(valor, **opciones):
+    if _simplejson is not None:
+        return _simplejson.dumps(valor, use_decimal=True, default=str, ensure_ascii=False, separators=SEPARADORES, **opciones)
+    return json.dumps(valor, default=a_json, ensure_ascii=False, separators=SEPARADORES, **opciones)
@@ -0,0 +1,80 @@
+"""Fixtures comunes: cada prueba corre contra DynamoDB y S3 simulados con moto, con las tablas
+de serverless.yml recién creadas (ver benchmarks/entorno.py)."""
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import entorno  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def aws(monkeypatch):
+    mock = entorno.iniciar()
+    import auth
+    import cache_respuestas
+    # Estado que sobrevive entre invocaciones de un contenedor: cada prueba empieza en frío
+    monkeypatch.setattr(auth, '_cache', type(auth._cache)())
+    monkeypatch.setattr(auth, '_revocados', {})
+    monkeypatch.setattr(auth, '_revocados_hasta', None)
+    monkeypatch.setattr(auth, '_revocados_actualizado_en', 0)
+    cache_respuestas.limpiar()
+    yield
+    mock.stop()
+
+
+@pytest.fixture
+def firmados(monkeypatch):
+    """Activa los tokens firmados (TOKEN_SECRET)."""
+    monkeypatch.setenv('TOKEN_SECRET', 'secreto-de-pruebas')
+
+
+def registrar_y_entrar(correo, rol):
+    import login_user
+    import register_user
+    register_user.register_user(entorno.evento(body={
+        'tenant_id': correo, 'password': 'secreto', 'role': rol, 'nombre': 'Prueba', 'apellido': rol
+    }), None)
+    respuesta = login_user.login_user(entorno.evento(body={'tenant_id': correo, 'password': 'secreto'}), None)
+    return respuesta['body']['token']
+
+
+@pytest.fixture
+def estudiante():
+    return registrar_y_entrar('estudiante@utec.edu.pe', 'estudiante')
+
+
+@pytest.fixture
+def otro_estudiante():
+    return registrar_y_entrar('otro.estudiante@utec.edu.pe', 'estudiante')
+
+
+@pytest.fixture
+def staff():
+    return registrar_y_entrar('staff@utec.edu.pe', 'administrativo')
+
+
+@pytest.fixture
+def crear_incidencia(estudiante):
+    import create_incident
+
+    def crear(ubicacion='Aula 101', tipo='equipo', urgencia='alta'):
+        respuesta = create_incident.create_incident(entorno.evento(estudiante, body={
+            'descripcion': 'Proyector roto', 'tipo_incidencia': tipo, 'ubicacion': ubicacion, 'urgencia': urgencia
+        }), None)
+        assert respuesta['statusCode'] == 200
+        return json.loads(respuesta['body'])['incidente_id']
+    return crear
+
+
+@pytest.fixture
+def procesar_outbox():
+    """Entrega al consumidor lo que haya en el outbox, como haría el stream de DynamoDB."""
+    import notificaciones
+    cola = notificaciones.ColaEnMemoria()
+
+    def procesar():
+        cola.sincronizar()
+        return cola.consumir()
+    return procesar
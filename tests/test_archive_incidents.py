@@ -0,0 +1,107 @@
+import archive_incidents
+import aws_clients
+import entorno
+import estadisticas
+import get_incidents_history
+import rebuild_stats
+
+ANTIGUA = '2025-02-03 10:00:00'
+
+
+def envejecer(incidente_id, fase='resuelta', fecha_actualizacion=ANTIGUA):
+    # Como si se hubiera creado (y resuelto) hace meses
+    aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').update_item(
+        Key={'incidente_id': incidente_id},
+        UpdateExpression='SET fase = :fase, fecha_creacion = :creacion, fecha_actualizacion = :actualizacion',
+        ExpressionAttributeValues={':fase': fase, ':creacion': ANTIGUA, ':actualizacion': fecha_actualizacion}
+    )
+
+
+def en_tabla():
+    return {item['incidente_id'] for item in aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').scan()['Items']}
+
+
+def historial(token, **query):
+    # Todas las páginas: primero la tabla, después el archivo
+    ids = []
+    while True:
+        respuesta = get_incidents_history.get_incidents_history(entorno.evento(token, query=query), None)
+        assert respuesta['statusCode'] == 200
+        ids += [item['incidente_id'] for item in respuesta['body']['items']]
+        if not respuesta['body']['cursor']:
+            return ids
+        query = dict(query, cursor=respuesta['body']['cursor'])
+
+
+def test_solo_se_archivan_las_resueltas_antiguas(crear_incidencia):
+    resuelta = crear_incidencia(ubicacion='Aula 1')
+    pendiente = crear_incidencia(ubicacion='Aula 2')
+    reciente = crear_incidencia(ubicacion='Aula 3')
+    envejecer(resuelta)
+    envejecer(pendiente, fase='pendiente')
+    envejecer(reciente, fecha_actualizacion='2099-01-01 00:00:00')  # Resuelta hace poco
+
+    assert archive_incidents.archivar(dias=90, dry_run=True)['archivadas'] == 1
+    assert en_tabla() == {resuelta, pendiente, reciente}
+
+    assert archive_incidents.archivar(dias=90)['archivadas'] == 1
+    assert en_tabla() == {pendiente, reciente}
+    assert [incidencia['incidente_id'] for incidencia in archive_incidents.leer_particion(ANTIGUA[:10])] == [resuelta]
+    assert archive_incidents.leer_manifest()['particiones'][ANTIGUA[:10]]['registros'] == 1
+
+
+def test_el_historial_con_fechas_incluye_el_archivo(staff, crear_incidencia):
+    archivada = crear_incidencia(ubicacion='Aula 1')
+    envejecer(archivada)
+    archive_incidents.archivar(dias=90)
+    actual = crear_incidencia(ubicacion='Aula 2')
+
+    assert historial(staff) == [actual]
+    assert historial(staff, desde='2025-01-01') == [actual, archivada]
+    assert historial(staff, hasta='2025-12-31') == [archivada]
+    assert historial(staff, fase='resuelta', desde='2025-02-03', hasta='2025-02-03') == [archivada]
+    assert historial(staff, fase='pendiente', desde='2025-01-01') == [actual]
+
+
+def test_volver_a_archivar_un_lote_no_cuenta_dos_veces(staff, crear_incidencia):
+    incidente_id = crear_incidencia()
+    envejecer(incidente_id)
+    incidencia = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').get_item(Key={'incidente_id': incidente_id})['Item']
+    archive_incidents.archivar(dias=90)
+
+    # El borrado de la tabla falló: la incidencia sigue ahí y la siguiente ejecución la vuelve a archivar
+    aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').put_item(Item=dict(incidencia, descripcion='Proyector roto (editada)'))
+    assert archive_incidents.archivar(dias=90)['archivadas'] == 1
+
+    assert archive_incidents.leer_manifest()['particiones'][ANTIGUA[:10]]['registros'] == 1
+    assert historial(staff, desde='2025-01-01') == [incidente_id]
+
+
+def test_el_recalculo_cuenta_las_archivadas(crear_incidencia):
+    for i in range(3):
+        crear_incidencia(ubicacion=f'Aula {i}')
+    archivada = crear_incidencia(ubicacion='Aula vieja')
+    envejecer(archivada)
+    estadisticas.aplicar(estadisticas.updates_cambio_fase('pendiente', 'resuelta', ANTIGUA))
+    incrementales, _ = estadisticas.leer()
+    archive_incidents.archivar(dias=90)
+
+    leidas, contadores = rebuild_stats.calcular(2)
+    assert leidas == 4
+    rebuild_stats.reemplazar(contadores)
+    recalculados, _ = estadisticas.leer()
+    assert recalculados['total'] == incrementales['total'] == 4
+    assert recalculados['fase'] == incrementales['fase'] == {'pendiente': 3, 'resuelta': 1}
+    assert recalculados['urgencia'] == incrementales['urgencia']
+
+
+def test_el_recalculo_no_duplica_una_incidencia_que_quedo_en_los_dos_lados(crear_incidencia):
+    incidente_id = crear_incidencia()
+    envejecer(incidente_id)
+    incidencia = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').get_item(Key={'incidente_id': incidente_id})['Item']
+    archive_incidents.archivar(dias=90)
+    aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').put_item(Item=incidencia)
+
+    leidas, contadores = rebuild_stats.calcular(2)
+    assert leidas == 1
+    assert contadores[estadisticas.clave_total(0)]['total'] == 1
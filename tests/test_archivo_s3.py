@@ -0,0 +1,72 @@
+import os
+import archivo_s3
+import aws_clients
+import notificaciones
+
+
+def bucket():
+    return os.environ['NOTIFICACIONES_BUCKET_NAME']
+
+
+def objetos(prefijo='pruebas/'):
+    return list(archivo_s3.listar_objetos(bucket(), prefijo))
+
+
+def por_dia(registro):
+    return f"dia={registro['dia']}"
+
+
+def test_un_segmento_por_particion():
+    escritor = archivo_s3.EscritorArchivo(bucket(), 'pruebas', por_dia)
+    for i in range(10):
+        escritor.agregar({'id': i, 'dia': i % 2})
+    assert objetos() == []
+    escritor.flush()
+
+    assert len(objetos()) == 2
+    assert sorted(r['id'] for r in archivo_s3.leer_particion(bucket(), 'pruebas/dia=0/')) == [0, 2, 4, 6, 8]
+
+
+def test_segmento_lleno_se_sube_antes_del_flush():
+    escritor = archivo_s3.EscritorArchivo(bucket(), 'pruebas', por_dia, max_bytes=100)
+    for i in range(10):
+        escritor.agregar({'id': i, 'dia': 0, 'texto': 'x' * 30})
+    assert len(objetos()) >= 3
+    escritor.flush()
+    assert sorted(r['id'] for r in archivo_s3.leer_particion(bucket(), 'pruebas/')) == list(range(10))
+
+
+def test_segmento_vencido_se_sube():
+    escritor = archivo_s3.EscritorArchivo(bucket(), 'pruebas', por_dia, max_edad=0)
+    escritor.agregar({'id': 1, 'dia': 0})
+    assert len(objetos()) == 1
+
+
+def test_objetos_comprimidos():
+    escritor = archivo_s3.EscritorArchivo(bucket(), 'pruebas', por_dia)
+    escritor.agregar({'id': 1, 'dia': 0})
+    [key] = escritor.flush()
+    objeto = aws_clients.s3().get_object(Bucket=bucket(), Key=key)
+    assert objeto['ContentEncoding'] == 'gzip'
+    assert objeto['Body'].read()[:2] == b'\x1f\x8b'
+
+
+def test_reintentar_el_mismo_lote_no_duplica():
+    registros = [{'id': str(i), 'dia': 0} for i in range(3)]
+    for _ in range(2):
+        escritor = archivo_s3.EscritorArchivo(bucket(), 'pruebas', por_dia, clave_registro=lambda r: r['id'])
+        for registro in registros:
+            escritor.agregar(registro)
+        escritor.flush()
+    assert len(objetos()) == 1
+
+
+def test_archivo_de_notificaciones(crear_incidencia, procesar_outbox):
+    incidente_id = crear_incidencia()
+    procesar_outbox()
+    [notificacion] = aws_clients.tabla('DYNAMODB_TABLE_NOTIFICACIONES').scan()['Items']
+
+    fecha = notificacion['fecha'][:10]
+    archivadas = list(notificaciones.leer_archivo(fecha, notificacion['destinatario']))
+    assert [n['incidente_id'] for n in archivadas] == [incidente_id]
+    assert list(notificaciones.leer_archivo(fecha, 'otro')) == []
@@ -0,0 +1,54 @@
+import time
+import pytest
+import auth
+import create_incident
+import entorno
+import get_incidents_stats
+import validate_token
+
+
+@pytest.fixture
+def lecturas(monkeypatch):
+    """Cuenta las búsquedas del token en DynamoDB."""
+    buscados = []
+    original = auth._buscar_token
+    monkeypatch.setattr(auth, '_buscar_token', lambda token: buscados.append(token) or original(token))
+    return buscados
+
+
+def test_el_contenedor_caliente_no_vuelve_a_leer_el_token(estudiante, lecturas):
+    for _ in range(3):
+        assert auth.autenticar(entorno.evento(estudiante))['role'] == 'estudiante'
+    assert lecturas == [estudiante]
+
+
+def test_token_desconocido_se_cachea_como_no_valido(lecturas):
+    for _ in range(2):
+        with pytest.raises(auth.ErrorAutenticacion) as error:
+            auth.autenticar(entorno.evento('no-existe'))
+        assert error.value.status_code == 403
+    assert lecturas == ['no-existe']
+
+
+def test_la_expiracion_se_valida_tambien_desde_la_cache(estudiante, monkeypatch):
+    token_item = auth.autenticar(entorno.evento(estudiante))
+    monkeypatch.setattr(time, 'time', lambda: int(token_item['expires_at']) + 1)
+    with pytest.raises(auth.ErrorAutenticacion) as error:
+        auth.autenticar(entorno.evento(estudiante))
+    assert error.value.status_code == 403
+
+
+def test_la_cache_tiene_un_maximo_de_tokens(monkeypatch):
+    monkeypatch.setattr(auth, 'CACHE_MAX_TOKENS', 2)
+    for token in ('a', 'b', 'c'):
+        with pytest.raises(auth.ErrorAutenticacion):
+            auth.autenticar(entorno.evento(token))
+    assert list(auth._cache) == ['b', 'c']
+
+
+@pytest.mark.parametrize('handler', [
+    validate_token.validate_token, create_incident.create_incident, get_incidents_stats.get_incidents_stats
+])
+def test_todos_los_handlers_validan_el_token_igual(handler):
+    assert handler(entorno.evento(), None)['statusCode'] == 400
+    assert handler(entorno.evento('no-existe'), None)['statusCode'] == 403
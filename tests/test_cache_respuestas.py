@@ -0,0 +1,64 @@
+import json
+import pytest
+from botocore.exceptions import ClientError
+import aws_clients
+import cache_respuestas
+import create_incident
+import entorno
+import get_incidents_stats
+
+
+def error(codigo):
+    return ClientError({'Error': {'Code': codigo, 'Message': codigo}}, 'UpdateItem')
+
+
+def total(token):
+    respuesta = get_incidents_stats.get_incidents_stats(entorno.evento(token), None)
+    assert respuesta['statusCode'] == 200
+    return respuesta['body']['total'].get('total', 0)
+
+
+def test_una_escritura_invalida_las_estadisticas_cacheadas(staff, crear_incidencia):
+    assert total(staff) == 0
+    assert total(staff) == 0
+    assert cache_respuestas.metricas()['hit_memoria'] == 1
+
+    crear_incidencia()
+    assert total(staff) == 1
+
+
+def test_invalidar_reintenta_los_errores_transitorios(monkeypatch):
+    monkeypatch.setattr(cache_respuestas, 'BACKOFF_INVALIDAR_SEGUNDOS', 0)
+    tabla = aws_clients.tabla('DYNAMODB_TABLE_ESTADISTICAS')
+    update_item = tabla.update_item
+    fallos = [error('ThrottlingException'), error('TransactionConflictException')]
+
+    def con_fallos(**kwargs):
+        if fallos:
+            raise fallos.pop(0)
+        return update_item(**kwargs)
+
+    monkeypatch.setattr(tabla, 'update_item', con_fallos)
+    cache_respuestas.invalidar()
+    assert cache_respuestas.version_actual()[0] == 1
+
+
+def test_invalidar_propaga_los_errores_que_no_son_transitorios(monkeypatch):
+    def sin_permiso(**kwargs):
+        raise error('AccessDeniedException')
+
+    monkeypatch.setattr(aws_clients.tabla('DYNAMODB_TABLE_ESTADISTICAS'), 'update_item', sin_permiso)
+    with pytest.raises(ClientError):
+        cache_respuestas.invalidar()
+
+
+def test_si_no_se_puede_invalidar_la_escritura_no_responde_ok(estudiante, monkeypatch):
+    def falla():
+        raise error('ProvisionedThroughputExceededException')
+
+    monkeypatch.setattr(cache_respuestas, 'invalidar', falla)
+    respuesta = create_incident.create_incident(entorno.evento(estudiante, body={
+        'descripcion': 'Fuga de agua', 'tipo_incidencia': 'infraestructura', 'ubicacion': 'Baño 2', 'urgencia': 'media'
+    }), None)
+    assert respuesta['statusCode'] == 500
+    assert 'ProvisionedThroughputExceeded' in json.loads(respuesta['body'])['error']
@@ -0,0 +1,20 @@
+import carga
+
+
+def test_parsear_mezcla():
+    assert carga.parsear_mezcla('create_incident=50, get_incidents_history=50') == {'create_incident': 50.0, 'get_incidents_history': 50.0}
+
+
+def test_carga_mixta_sin_errores_de_servidor():
+    escenario = carga.Escenario(semilla=1)
+    carga.preparar(escenario, estudiantes=3, staff=2, incidencias=30)
+    mezcla = carga.parsear_mezcla(carga.MEZCLA_POR_DEFECTO)
+    resultados, segundos = carga.ejecutar(escenario, mezcla, peticiones=60, concurrencia=4)
+
+    resumen = carga.resumir(resultados, segundos)
+    assert sum(fila['peticiones'] for fila in resumen['handlers'].values()) == 60
+    for operacion, fila in resumen['handlers'].items():
+        assert '5xx' not in fila['estados'], operacion
+        assert fila['p50'] <= fila['p95'] <= fila['p99']
+    assert resumen['handlers']['create_incident']['llamadas_aws'] > 0
+    assert resumen['aws']['dynamodb.TransactWriteItems']['llamadas'] > 0
@@ -0,0 +1,97 @@
+import json
+import pytest
+import aws_clients
+import create_incident
+import create_incidents_bulk
+import entorno
+import notificaciones
+import update_incident
+
+REPORTE = {'descripcion': 'No hay luz', 'tipo_incidencia': 'Infraestructura', 'ubicacion': 'Baño 3er piso', 'urgencia': 'alta'}
+
+
+def crear(token, **cambios):
+    respuesta = create_incident.create_incident(entorno.evento(token, body=dict(REPORTE, **cambios)), None)
+    return respuesta['statusCode'], json.loads(respuesta['body'])
+
+
+def incidencia(incidente_id):
+    return aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').get_item(Key={'incidente_id': incidente_id})['Item']
+
+
+@pytest.mark.parametrize('cambios', [{'ubicacion': 5}, {'tipo_incidencia': ['equipo']}, {'descripcion': {'texto': 'x'}}, {'gravedad': 3}])
+def test_campos_que_no_son_texto(estudiante, cambios):
+    status, body = crear(estudiante, **cambios)
+    assert status == 400
+    assert 'debe ser texto' in body['error']
+
+
+def test_faltan_datos(estudiante):
+    assert crear(estudiante, urgencia='')[0] == 400
+
+
+def test_reporte_repetido_se_suma_a_la_incidencia_abierta(estudiante, otro_estudiante):
+    status, original = crear(estudiante)
+    assert status == 200
+
+    # Misma ubicación escrita de otra forma (ver texto.normalizar)
+    status, repetido = crear(otro_estudiante, ubicacion='bano 3ER piso', tipo_incidencia='infraestructura')
+    assert status == 200
+    assert repetido['duplicada'] and repetido['incidente_id'] == original['incidente_id']
+
+    item = incidencia(original['incidente_id'])
+    assert item['reportes'] == 2 and len(item['reportantes']) == 2
+    assert len(aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').scan()['Items']) == 1
+
+
+def test_el_mismo_usuario_no_cuenta_dos_veces(estudiante):
+    _, original = crear(estudiante)
+    _, repetido = crear(estudiante)
+    assert repetido['incidente_id'] == original['incidente_id']
+    assert incidencia(original['incidente_id'])['reportes'] == 1
+
+
+def test_otra_ubicacion_es_otra_incidencia(estudiante):
+    _, primera = crear(estudiante)
+    _, segunda = crear(estudiante, ubicacion='Baño 2do piso')
+    assert primera['incidente_id'] != segunda['incidente_id']
+
+
+def test_la_actualizacion_llega_a_todos_los_que_reportaron(estudiante, otro_estudiante, staff):
+    _, original = crear(estudiante)
+    crear(otro_estudiante)
+    cola = notificaciones.ColaEnMemoria()
+    cola.sincronizar()
+    cola.consumir()
+
+    update_incident.update_incident(entorno.evento(staff, body={'incidente_id': original['incidente_id'], 'fase': 'en_progreso'}), None)
+    cola.sincronizar()
+    cola.consumir()
+
+    reportantes = set(incidencia(original['incidente_id'])['reportantes'])
+    actualizaciones = [
+        item for item in aws_clients.tabla('DYNAMODB_TABLE_NOTIFICACIONES').scan()['Items']
+        if item.get('mensaje', '').endswith('en_progreso.')
+    ]
+    assert {item['destinatario'] for item in actualizaciones} == reportantes
+    assert len(actualizaciones) == 2
+
+
+def test_resolver_la_saca_del_indice_de_duplicados(staff, crear_incidencia):
+    incidente_id = crear_incidencia()
+    assert 'clave_dedup' in incidencia(incidente_id)
+
+    update_incident.update_incident(entorno.evento(staff, body={'incidente_id': incidente_id, 'fase': 'resuelta'}), None)
+    assert 'clave_dedup' not in incidencia(incidente_id)
+    # Un reporte igual después de resolverla crea una incidencia nueva
+    assert crear_incidencia() != incidente_id
+
+
+def test_en_el_alta_masiva_un_campo_que_no_es_texto_es_un_error_de_ese_item(estudiante):
+    respuesta = create_incidents_bulk.create_incidents_bulk(entorno.evento(estudiante, body={
+        'incidencias': [REPORTE, dict(REPORTE, ubicacion=5)]
+    }), None)
+    assert respuesta['statusCode'] == 200
+    primero, segundo = respuesta['body']['resultados']
+    assert primero['status'] == 'creada'
+    assert segundo == {'indice': 1, 'status': 'error', 'error': 'El campo ubicacion debe ser texto'}
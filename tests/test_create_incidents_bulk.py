@@ -0,0 +1,90 @@
+import json
+from botocore.exceptions import ClientError
+import aws_clients
+import create_incident
+import create_incidents_bulk
+import entorno
+
+
+def incidencia(i, **cambios):
+    return dict({'descripcion': f'Reporte {i}', 'tipo_incidencia': 'equipo', 'ubicacion': f'Aula {i}', 'urgencia': 'media'}, **cambios)
+
+
+def crear_en_lote(token, incidencias):
+    respuesta = create_incidents_bulk.create_incidents_bulk(entorno.evento(token, body={'incidencias': incidencias}), None)
+    assert respuesta['statusCode'] == 200
+    return respuesta['body']
+
+
+def escaneo(variable):
+    return aws_clients.tabla(variable).scan()['Items']
+
+
+def test_crea_todas_con_su_outbox(estudiante):
+    body = crear_en_lote(estudiante, [incidencia(i) for i in range(60)])
+    assert (body['creadas'], body['fallidas']) == (60, 0)
+    assert [resultado['indice'] for resultado in body['resultados']] == list(range(60))
+
+    ids = {resultado['incidente_id'] for resultado in body['resultados']}
+    assert {item['incidente_id'] for item in escaneo('DYNAMODB_TABLE_INCIDENCIAS')} == ids
+    assert {item['notificacion']['incidente_id'] for item in escaneo('DYNAMODB_TABLE_OUTBOX')} == ids
+
+
+def test_solo_estudiantes_y_con_limite(estudiante, staff):
+    assert create_incidents_bulk.create_incidents_bulk(entorno.evento(staff, body={'incidencias': [incidencia(0)]}), None)['statusCode'] == 403
+    demasiadas = [incidencia(i) for i in range(create_incidents_bulk.MAX_INCIDENCIAS + 1)]
+    assert create_incidents_bulk.create_incidents_bulk(entorno.evento(estudiante, body={'incidencias': demasiadas}), None)['statusCode'] == 400
+
+
+def test_los_datos_se_validan_antes_de_escribir(estudiante):
+    body = crear_en_lote(estudiante, [
+        incidencia(0),
+        incidencia(1, descripcion='x' * (create_incident.MAX_LONGITUD['descripcion'] + 1)),
+        incidencia(2, urgencia=None),
+        'no es un objeto'
+    ])
+    assert [resultado['status'] for resultado in body['resultados']] == ['creada', 'error', 'error', 'error']
+    assert 'como máximo' in body['resultados'][1]['error']
+    assert len(escaneo('DYNAMODB_TABLE_INCIDENCIAS')) == 1
+
+
+def test_un_lote_rechazado_por_dynamodb_no_corta_el_resto(estudiante, monkeypatch):
+    client = aws_clients.dynamodb().meta.client
+    batch_write_item = client.batch_write_item
+
+    def rechaza_el_segundo_lote(RequestItems):
+        # El segundo lote de incidencias (índices 25 a 49) falla como si un item pasara de 400 KB
+        items = RequestItems.get(aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').name, [])
+        if any(pedido['PutRequest']['Item']['descripcion'] == 'Reporte 30' for pedido in items):
+            raise ClientError({'Error': {'Code': 'ValidationException', 'Message': 'Item size has exceeded the maximum allowed size'}}, 'BatchWriteItem')
+        return batch_write_item(RequestItems=RequestItems)
+
+    monkeypatch.setattr(client, 'batch_write_item', rechaza_el_segundo_lote)
+    body = crear_en_lote(estudiante, [incidencia(i) for i in range(60)])
+
+    fallidas = [resultado['indice'] for resultado in body['resultados'] if resultado['status'] == 'error']
+    assert fallidas == list(range(25, 50))
+    assert body['creadas'] == 35
+
+    # Toda incidencia escrita tiene su registro en el outbox, y no hay outbox de las que fallaron
+    creadas = {item['incidente_id'] for item in escaneo('DYNAMODB_TABLE_INCIDENCIAS')}
+    assert len(creadas) == 35
+    assert {item['notificacion']['incidente_id'] for item in escaneo('DYNAMODB_TABLE_OUTBOX')} == creadas
+
+
+def test_reportes_repetidos_dentro_del_lote(estudiante):
+    body = crear_en_lote(estudiante, [incidencia(1), incidencia(2), incidencia(1, descripcion='Otra vez')])
+    primera, _, repetida = body['resultados']
+    assert repetida['status'] == 'duplicada' and repetida['incidente_id'] == primera['incidente_id']
+    assert (body['creadas'], body['duplicadas'], body['fallidas']) == (2, 1, 0)
+    assert len(escaneo('DYNAMODB_TABLE_INCIDENCIAS')) == 2
+
+
+def test_reporte_de_una_incidencia_abierta_se_suma_a_ella(estudiante, otro_estudiante):
+    respuesta = create_incident.create_incident(entorno.evento(estudiante, body=incidencia(7)), None)
+    existente = json.loads(respuesta['body'])['incidente_id']
+
+    body = crear_en_lote(otro_estudiante, [incidencia(7, ubicacion='aula 7'), incidencia(8)])
+    assert body['resultados'][0] == {'indice': 0, 'status': 'duplicada', 'incidente_id': existente}
+    assert aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').get_item(Key={'incidente_id': existente})['Item']['reportes'] == 2
+    assert len(escaneo('DYNAMODB_TABLE_INCIDENCIAS')) == 2
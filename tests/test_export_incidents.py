@@ -0,0 +1,105 @@
+import io
+import sys
+import json
+import gzip
+import runpy
+import pytest
+import archive_incidents
+import aws_clients
+import entorno
+import export_incidents
+
+
+class Contexto:
+    """Contexto de Lambda al que le queda tiempo para `llamadas` consultas."""
+
+    def __init__(self, llamadas):
+        self.llamadas = llamadas
+
+    def get_remaining_time_in_millis(self):
+        self.llamadas -= 1
+        return 60000 if self.llamadas > 0 else 0
+
+
+def exportar(token, body, context=None):
+    return export_incidents.export_incidents(entorno.evento(token, body=body), context)
+
+
+def ids_exportados(prefijo):
+    s3 = aws_clients.s3()
+    bucket = export_incidents._bucket()
+    ids = []
+    for objeto in s3.list_objects_v2(Bucket=bucket, Prefix=prefijo)['Contents']:
+        if objeto['Key'].endswith('.ndjson.gz'):
+            contenido = gzip.decompress(s3.get_object(Bucket=bucket, Key=objeto['Key'])['Body'].read())
+            ids += [json.loads(linea)['incidente_id'] for linea in contenido.splitlines()]
+    return ids
+
+
+def archivar_una(incidente_id):
+    aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').update_item(
+        Key={'incidente_id': incidente_id},
+        UpdateExpression='SET fase = :fase, fecha_creacion = :fecha, fecha_actualizacion = :fecha REMOVE clave_dedup',
+        ExpressionAttributeValues={':fase': 'resuelta', ':fecha': '2025-03-01 09:00:00'}
+    )
+    assert archive_incidents.archivar(dias=90)['archivadas'] == 1
+
+
+@pytest.mark.parametrize('segmentos', ['muchos', None, [4], 0, 65])
+def test_segmentos_no_validos(staff, segmentos):
+    assert exportar(staff, {'segmentos': segmentos})['statusCode'] == 400
+
+
+def test_permisos_y_exportacion_inexistente(staff, estudiante):
+    assert exportar(estudiante, {})['statusCode'] == 403
+    assert exportar(staff, {'export_id': 'no-existe'})['statusCode'] == 404
+
+
+def test_exporta_la_tabla_y_el_archivo(staff, crear_incidencia):
+    creadas = [crear_incidencia(ubicacion=f'Aula {i}') for i in range(12)]
+    archivar_una(creadas[0])
+
+    respuesta = exportar(staff, {'segmentos': 3})
+    assert respuesta['statusCode'] == 200
+    resumen = respuesta['body']
+    assert resumen['completo'] and resumen['registros'] == 12 and resumen['registros_archivo'] == 1
+    assert sorted(ids_exportados(resumen['prefijo'])) == sorted(creadas)
+
+
+def test_reanudar_con_los_checkpoints(staff, crear_incidencia, monkeypatch):
+    monkeypatch.setattr(export_incidents, 'REGISTROS_POR_PARTE', 2)
+    creadas = [crear_incidencia(ubicacion=f'Aula {i}') for i in range(9)]
+    archivar_una(creadas[0])
+
+    primera = exportar(staff, {'segmentos': 2}, Contexto(llamadas=2))['body']
+    assert not primera['completo']
+
+    segunda = exportar(staff, {'export_id': primera['export_id']})['body']
+    assert segunda['completo'] and segunda['segmentos'] == 2
+    ids = ids_exportados(segunda['prefijo'])
+    assert sorted(ids) == sorted(creadas)  # Sin duplicados
+
+
+def script(capsys, monkeypatch, *argumentos):
+    capsys.readouterr()  # Descarta los logs de los handlers anteriores
+    monkeypatch.setattr(sys, 'argv', ['export_incidents.py'] + list(argumentos))
+    runpy.run_path(export_incidents.__file__, run_name='__main__')
+    return json.loads(capsys.readouterr().out)
+
+
+def test_script_reanuda_con_los_segmentos_del_inicio(crear_incidencia, capsys, monkeypatch):
+    crear_incidencia()
+    resumen = script(capsys, monkeypatch, '--s3', '--segmentos', '2')
+    assert export_incidents.segmentos_de(resumen['export_id']) == 2
+
+    reanudada = script(capsys, monkeypatch, '--s3', '--export-id', resumen['export_id'], '--segmentos', '5')
+    assert reanudada['segmentos'] == 2 and reanudada['registros'] == 1
+
+
+def test_script_a_la_salida_estandar_incluye_el_archivo(crear_incidencia):
+    creadas = [crear_incidencia(ubicacion=f'Aula {i}') for i in range(3)]
+    archivar_una(creadas[1])
+
+    salida = io.StringIO()
+    assert export_incidents.exportar_ndjson(salida, 2) == 3
+    assert sorted(json.loads(linea)['incidente_id'] for linea in salida.getvalue().splitlines()) == sorted(creadas)
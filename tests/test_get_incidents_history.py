@@ -0,0 +1,100 @@
+import json
+import base64
+from datetime import date, timedelta
+import pytest
+import aws_clients
+import entorno
+import get_incidents_history
+import get_notifications_inbox
+import search_incidents
+
+
+def historial(token, **query):
+    return get_incidents_history.get_incidents_history(entorno.evento(token, query=query), None)
+
+
+def todas_las_paginas(token, **query):
+    ids, paginas, cursor = [], 0, None
+    while True:
+        parametros = dict(query, cursor=cursor) if cursor else query
+        respuesta = historial(token, **parametros)
+        assert respuesta['statusCode'] == 200
+        ids += [item['incidente_id'] for item in respuesta['body']['items']]
+        paginas += 1
+        cursor = respuesta['body']['cursor']
+        if not cursor:
+            return ids, paginas
+
+
+def cursor(valor):
+    return base64.urlsafe_b64encode(json.dumps(valor).encode()).decode()
+
+
+@pytest.mark.parametrize('filtros', [{'fase': 'pendiente'}, {}])
+def test_paginas_sin_repetidos_ni_faltantes(staff, crear_incidencia, filtros):
+    creadas = {crear_incidencia(ubicacion=f'Aula {i}') for i in range(7)}
+    ids, paginas = todas_las_paginas(staff, limit='3', **filtros)
+    assert sorted(ids) == sorted(creadas)
+    assert paginas >= 3
+
+
+def test_consulta_por_indice_de_la_mas_nueva_a_la_mas_vieja(staff, crear_incidencia):
+    for i in range(4):
+        crear_incidencia(ubicacion=f'Aula {i}')
+    items = historial(staff, fase='pendiente')['body']['items']
+    fechas = [item['fecha_creacion'] for item in items]
+    assert fechas == sorted(fechas, reverse=True)
+
+
+def test_filtros(staff, crear_incidencia):
+    electrico = crear_incidencia(ubicacion='Aula 1', tipo='infraestructura', urgencia='baja')
+    crear_incidencia(ubicacion='Aula 2', tipo='equipo', urgencia='baja')
+    crear_incidencia(ubicacion='Aula 3', tipo='equipo', urgencia='alta')
+    reportado_por = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').get_item(Key={'incidente_id': electrico})['Item']['reportado_por']
+
+    def cuantas(**query):
+        respuesta = historial(staff, **query)
+        assert respuesta['statusCode'] == 200
+        return len(respuesta['body']['items'])
+
+    assert cuantas() == 3
+    assert cuantas(fase='pendiente', tipo_incidencia='equipo') == 2
+    assert cuantas(tipo_incidencia='equipo', urgencia='alta') == 1
+    assert cuantas(reportado_por=reportado_por, urgencia='baja') == 2
+    assert cuantas(fase='resuelta') == 0
+    manana = (date.today() + timedelta(days=1)).isoformat()
+    assert cuantas(desde=manana) == 0
+    assert cuantas(fase='pendiente', hasta=manana) == 3
+
+
+def test_solo_el_staff_ve_el_historial(estudiante):
+    assert historial(estudiante)['statusCode'] == 403
+
+
+@pytest.mark.parametrize('valor', [
+    'InN0ciI=',  # "str": JSON válido pero no un objeto
+    cursor([1, 2]),
+    cursor({'incidente_id': 3}),
+    'no-es-base64!',
+])
+def test_cursor_no_valido(staff, valor):
+    assert historial(staff, cursor=valor)['statusCode'] == 400
+    assert search_incidents.search_incidents(entorno.evento(staff, query={'q': 'proyector', 'cursor': valor}), None)['statusCode'] == 400
+    assert get_notifications_inbox.get_notifications_inbox(entorno.evento(staff, query={'cursor': valor}), None)['statusCode'] == 400
+
+
+@pytest.mark.parametrize('archivo', [{'archivo': 'x'}, {'archivo': {'fecha': 1, 'offset': 0}}, {'archivo': {'fecha': '2026-01-01', 'offset': 'x'}}])
+def test_cursor_de_archivo_no_valido(staff, archivo):
+    assert historial(staff, cursor=cursor(archivo))['statusCode'] == 400
+
+
+@pytest.mark.parametrize('limite', ['0', '-1', 'diez'])
+def test_limite_no_valido(staff, limite):
+    assert historial(staff, limit=limite)['statusCode'] == 400
+
+
+def test_campos_proyectados(staff, crear_incidencia):
+    crear_incidencia()
+    items = historial(staff, fase='pendiente', fields='incidente_id,fase')['body']['items']
+    assert items and all(set(item) == {'incidente_id', 'fase'} for item in items)
+    assert historial(staff, fields='no_existe')['statusCode'] == 400
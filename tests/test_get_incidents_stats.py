@@ -0,0 +1,55 @@
+from datetime import date
+import pytest
+import entorno
+import estadisticas
+import get_incidents_stats
+import rebuild_stats
+import update_incident
+
+
+def stats(token, **query):
+    return get_incidents_stats.get_incidents_stats(entorno.evento(token, query=query), None)
+
+
+def test_contadores_al_crear_y_actualizar(staff, crear_incidencia):
+    primera = crear_incidencia(urgencia='alta')
+    crear_incidencia(ubicacion='Aula 102', tipo='Limpieza', urgencia='baja')
+    crear_incidencia(ubicacion='Aula 103', tipo='ascensor')
+    update_incident.update_incident(entorno.evento(staff, body={'incidente_id': primera, 'fase': 'en_progreso'}), None)
+
+    total = stats(staff)['body']['total']
+    assert total['total'] == 3
+    assert total['fase'] == {'pendiente': 2, 'en_progreso': 1}
+    assert total['urgencia'] == {'alta': 2, 'baja': 1}
+    # Los tipos se cuentan normalizados y los desconocidos van a 'otro'
+    assert total['tipo_incidencia'] == {'equipo': 1, 'limpieza': 1, 'otro': 1}
+
+
+def test_actividad_por_dia(staff, crear_incidencia):
+    crear_incidencia()
+    hoy = date.today().isoformat()
+    body = stats(staff, desde=hoy)['body']
+    assert list(body['por_dia']) == [hoy]
+    assert body['por_dia'][hoy]['total'] == 1
+    assert body['por_dia'][hoy]['fase'] == {'pendiente': 1}
+
+
+def test_rebuild_da_los_mismos_contadores(staff, crear_incidencia):
+    ids = [crear_incidencia(ubicacion=f'Aula {i}', urgencia=urgencia) for i, urgencia in enumerate(('alta', 'media', 'baja'))]
+    update_incident.update_incident(entorno.evento(staff, body={'incidente_id': ids[0], 'fase': 'resuelta'}), None)
+    hoy = [date.today().isoformat()]
+    incrementales = estadisticas.leer(hoy)
+
+    leidas, contadores = rebuild_stats.calcular(2)
+    rebuild_stats.reemplazar(contadores)
+    assert leidas == 3
+    assert estadisticas.leer(hoy) == incrementales
+
+
+def test_solo_el_staff_ve_las_estadisticas(estudiante):
+    assert stats(estudiante)['statusCode'] == 403
+
+
+@pytest.mark.parametrize('query', [{'desde': '2025-13-01'}, {'desde': '2025-01-02', 'hasta': '2025-01-01'}, {'desde': '2025-01-01', 'hasta': '2025-03-01'}])
+def test_rango_no_valido(staff, query):
+    assert stats(staff, **query)['statusCode'] == 400
@@ -0,0 +1,81 @@
+import auth
+import aws_clients
+import entorno
+import get_notifications_inbox
+import mark_notifications_read
+import notificaciones
+
+
+def usuario(token):
+    return auth.autenticar(entorno.evento(token))
+
+
+def notificar(destinatario, *fechas):
+    ids = []
+    with aws_clients.tabla('DYNAMODB_TABLE_NOTIFICACIONES').batch_writer() as batch:
+        for fecha in fechas:
+            notificacion = dict(notificaciones.construir_notificacion('inc-1', f'Aviso del {fecha}', destinatario), fecha=fecha)
+            batch.put_item(Item=notificacion)
+            ids.append(notificacion['notificacion_id'])
+    return ids
+
+
+def bandeja(token, **query):
+    respuesta = get_notifications_inbox.get_notifications_inbox(entorno.evento(token, query=query), None)
+    assert respuesta['statusCode'] == 200
+    return respuesta['body']
+
+
+def marcar(token, ids):
+    return mark_notifications_read.mark_notifications_read(entorno.evento(token, body={'notificacion_ids': ids}), None)
+
+
+def todas(token, **query):
+    items, cursor = [], None
+    while True:
+        body = bandeja(token, **(dict(query, cursor=cursor) if cursor else query))
+        items += body['items']
+        cursor = body['cursor']
+        if not cursor:
+            return items
+
+
+def test_mezcla_el_feed_propio_y_el_del_rol(staff):
+    yo = usuario(staff)
+    notificar(yo['user_id'], '2025-01-01 10:00:00', '2025-01-03 10:00:00')
+    notificar(yo['role'], '2025-01-02 10:00:00', '2025-01-04 10:00:00')
+    notificar('otro-usuario', '2025-01-05 10:00:00')
+
+    fechas = [item['fecha'][:10] for item in todas(staff, limit='1')]
+    assert fechas == ['2025-01-04', '2025-01-03', '2025-01-02', '2025-01-01']
+
+
+def test_marcar_como_leidas(staff):
+    yo = usuario(staff)
+    [propia] = notificar(yo['user_id'], '2025-01-01 10:00:00')
+    vieja, nueva = notificar(yo['role'], '2025-01-02 10:00:00', '2025-01-03 10:00:00')
+
+    respuesta = marcar(staff, [propia, vieja])
+    assert respuesta['statusCode'] == 200
+    assert respuesta['body']['leido_hasta'] == '2025-01-02 10:00:00'
+    leidas = {item['notificacion_id']: item['leida'] for item in todas(staff)}
+    assert leidas == {propia: True, vieja: True, nueva: False}
+    assert [item['notificacion_id'] for item in todas(staff, no_leidas='true')] == [nueva]
+
+    # La marca del rol solo avanza
+    marcar(staff, [nueva])
+    marcar(staff, [vieja])
+    assert notificaciones.leido_hasta(yo['user_id'], yo['role']) == '2025-01-03 10:00:00'
+
+
+def test_no_se_marcan_notificaciones_ajenas(staff, estudiante):
+    [ajena] = notificar(usuario(estudiante)['user_id'], '2025-01-01 10:00:00')
+    respuesta = marcar(staff, [ajena, 'no-existe'])
+    assert respuesta['body']['resultados'] == {ajena: 'no_encontrada', 'no-existe': 'no_encontrada'}
+    assert [item['leida'] for item in todas(estudiante)] == [False]
+
+
+def test_cuerpo_no_valido(staff):
+    assert marcar(staff, [])['statusCode'] == 400
+    assert marcar(staff, [str(i) for i in range(mark_notifications_read.MAX_NOTIFICACIONES + 1)])['statusCode'] == 400
+    assert get_notifications_inbox.get_notifications_inbox(entorno.evento(staff, query={'limit': '0'}), None)['statusCode'] == 400
@@ -0,0 +1,65 @@
+import json
+import instrumentacion
+import entorno
+import login_user
+import router
+
+
+def lineas(capsys):
+    return [json.loads(linea) for linea in capsys.readouterr().out.splitlines() if linea.startswith('{')]
+
+
+def test_linea_emf_con_las_llamadas_a_aws(staff, capsys, monkeypatch):
+    monkeypatch.setattr(instrumentacion, 'MUESTREO_EVENTOS', 0)
+    capsys.readouterr()
+    login_user.login_user(entorno.evento(body={'tenant_id': 'staff@utec.edu.pe', 'password': 'secreto'}), None)
+
+    [linea] = lineas(capsys)
+    assert linea == instrumentacion.ultima()
+    assert linea['handler'] == 'login_user'
+    assert linea['statusCode'] == 200
+    assert linea['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['handler']]
+    assert {m['Name'] for m in linea['_aws']['CloudWatchMetrics'][0]['Metrics']} <= set(linea)
+    assert linea['llamadas']['dynamodb.Query']['n'] == 1
+    assert linea['LlamadasAWS'] == sum(llamada['n'] for llamada in linea['llamadas'].values())
+
+
+def test_el_router_mide_una_sola_vez(staff, capsys, monkeypatch):
+    monkeypatch.setattr(instrumentacion, 'MUESTREO_EVENTOS', 0)
+    capsys.readouterr()
+    evento = dict(entorno.evento(staff), method='GET', requestPath='/users/validate-token')
+    assert router.router(evento, None)['statusCode'] == 200
+    assert [linea['handler'] for linea in lineas(capsys)] == ['validate_token']
+
+
+def test_evento_muestreado_y_redactado(capsys, monkeypatch):
+    monkeypatch.setattr(instrumentacion, 'MUESTREO_EVENTOS', 1)
+    capsys.readouterr()
+    login_user.login_user(entorno.evento('token-secreto', body={'tenant_id': 'x@utec.edu.pe', 'password': 'clave', 'nota': 'n' * 500}), None)
+
+    evento = lineas(capsys)[0]['event']
+    assert evento['headers']['Authorization'] == '***'
+    assert evento['body']['password'] == '***'
+    assert evento['body']['tenant_id'] == 'x@utec.edu.pe'
+    assert len(evento['body']['nota']) == instrumentacion.MAX_LARGO_TEXTO + 3
+
+
+def test_los_errores_siempre_registran_el_evento(capsys, monkeypatch):
+    monkeypatch.setattr(instrumentacion, 'MUESTREO_EVENTOS', 0)
+
+    @instrumentacion.instrumentar(ocultar=('contenido',))
+    def falla(event, context):
+        return {'statusCode': 500, 'body': {'error': 'x'}}
+
+    capsys.readouterr()
+    falla({'body': json.dumps({'contenido': 'datos', 'password': 'clave'})}, None)
+    evento, metricas = lineas(capsys)
+    assert evento['event']['body'] == {'contenido': '***', 'password': '***'}
+    assert metricas['statusCode'] == 500
+
+
+def test_sin_muestreo_no_se_registra_el_evento(staff, capsys, monkeypatch):
+    monkeypatch.setattr(instrumentacion, 'MUESTREO_EVENTOS', 0)
+    capsys.readouterr()
+    login_user.login_user(entorno.evento(body={'tenant_id': 'staff@utec.edu.pe', 'password': 'secreto'}), None)
+    assert all('event' not in linea for linea in lineas(capsys))
@@ -0,0 +1,72 @@
+from boto3.dynamodb.types import TypeSerializer
+import aws_clients
+import entorno
+import notificaciones
+import update_incident
+
+_serializer = TypeSerializer()
+
+
+def notificaciones_guardadas():
+    return aws_clients.tabla('DYNAMODB_TABLE_NOTIFICACIONES').scan()['Items']
+
+
+def outbox():
+    return aws_clients.tabla('DYNAMODB_TABLE_OUTBOX').scan()['Items']
+
+
+def evento_stream(registros, nombre_evento='INSERT'):
+    return {'Records': [
+        {'eventName': nombre_evento, 'dynamodb': {'NewImage': {k: _serializer.serialize(v) for k, v in registro.items()}}}
+        for registro in registros
+    ]}
+
+
+def test_el_request_solo_escribe_el_outbox(crear_incidencia):
+    incidente_id = crear_incidencia()
+    assert notificaciones_guardadas() == []
+    pendientes = outbox()
+    assert len(pendientes) == 1
+    assert pendientes[0]['notificacion']['incidente_id'] == incidente_id
+    assert pendientes[0]['expires_at'] > 0
+
+
+def test_el_consumidor_crea_la_notificacion(crear_incidencia, procesar_outbox):
+    incidente_id = crear_incidencia()
+    assert procesar_outbox() == 1
+    [notificacion] = notificaciones_guardadas()
+    assert notificacion['incidente_id'] == incidente_id
+    assert notificacion['status'] == 'pendiente'
+
+
+def test_handler_del_stream_es_idempotente(crear_incidencia):
+    crear_incidencia()
+    evento = evento_stream(outbox())
+    assert notificaciones.procesar_notificaciones(evento, None) == {'procesados': 1}
+    # El event source mapping reintenta el lote completo si algo falla
+    assert notificaciones.procesar_notificaciones(evento, None) == {'procesados': 1}
+    assert len(notificaciones_guardadas()) == 1
+
+
+def test_el_stream_ignora_lo_que_no_es_insert(crear_incidencia):
+    crear_incidencia()
+    assert notificaciones.procesar_notificaciones(evento_stream(outbox(), 'REMOVE'), None) == {'procesados': 0}
+    assert notificaciones_guardadas() == []
+
+
+def test_la_actualizacion_llega_a_quien_reporto(staff, crear_incidencia, procesar_outbox):
+    incidente_id = crear_incidencia()
+    procesar_outbox()
+    creador = notificaciones_guardadas()[0]['destinatario']
+
+    update_incident.update_incident(entorno.evento(staff, body={'incidente_id': incidente_id, 'fase': 'en_progreso'}), None)
+    assert procesar_outbox() == 1
+    actualizacion = [n for n in notificaciones_guardadas() if 'en_progreso' in n['mensaje']]
+    assert [n['destinatario'] for n in actualizacion] == [creador]
+
+
+def test_notificacion_de_incidencia_inexistente_se_descarta():
+    notificacion = notificaciones.construir_notificacion('no-existe', 'Actualizada', None)
+    registro = notificaciones.put_outbox(notificacion, resolver_destinatario=True)['Put']['Item']
+    assert notificaciones.procesar_lote([registro]) == 0
+    assert notificaciones_guardadas() == []
@@ -0,0 +1,36 @@
+import os
+import pytest
+import yaml
+import aws_clients
+import entorno
+import router
+
+
+def llamar(metodo, ruta, token=None, **kwargs):
+    return router.router(dict(entorno.evento(token, **kwargs), method=metodo, requestPath=ruta), None)
+
+
+def test_enruta_por_metodo_y_ruta(estudiante):
+    assert llamar('get', '/users/validate-token', estudiante)['statusCode'] == 200
+    creada = llamar('POST', '/incidents/create', estudiante, body={
+        'descripcion': 'Sin luz', 'tipo_incidencia': 'infraestructura', 'ubicacion': 'Aula 1', 'urgencia': 'alta'
+    })
+    assert creada['statusCode'] == 200
+
+
+@pytest.mark.parametrize('metodo, ruta', [('GET', '/no/existe'), ('POST', '/users/validate-token'), (None, None)])
+def test_ruta_desconocida(metodo, ruta):
+    assert llamar(metodo, ruta)['statusCode'] == 404
+
+
+def test_las_rutas_coinciden_con_el_despliegue():
+    with open(os.path.join(entorno.RAIZ, 'funciones-router.yml'), encoding='utf-8') as f:
+        funciones = yaml.safe_load(f)
+    rutas = {(e['http']['method'].upper(), e['http']['path']) for e in funciones['api']['events']}
+    assert rutas == set(router.RUTAS)
+
+
+def test_clientes_reutilizados_entre_invocaciones():
+    assert aws_clients.dynamodb() is aws_clients.dynamodb()
+    assert aws_clients.s3() is aws_clients.s3()
+    assert aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS') is aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS')
@@ -0,0 +1,101 @@
+import pytest
+import archive_incidents
+import aws_clients
+import entorno
+import indice
+import notificaciones
+import search_incidents
+
+
+def buscar(token, q, **query):
+    respuesta = search_incidents.search_incidents(entorno.evento(token, query=dict(query, q=q)), None)
+    assert respuesta['statusCode'] == 200
+    return respuesta['body']
+
+
+def ubicaciones(body):
+    return [item['ubicacion'] for item in body['items']]
+
+
+def frecuencia(termino):
+    return indice.frecuencias([termino])[termino]
+
+
+def test_busca_todos_los_terminos_sin_importar_tildes(staff, crear_incidencia, procesar_outbox):
+    crear_incidencia(ubicacion='Baño 3er piso', tipo='limpieza')
+    crear_incidencia(ubicacion='Baño 2do piso', tipo='infraestructura')
+    crear_incidencia(ubicacion='Aula 101', tipo='equipo')
+    procesar_outbox()
+
+    assert sorted(ubicaciones(buscar(staff, 'BANO'))) == ['Baño 2do piso', 'Baño 3er piso']
+    assert ubicaciones(buscar(staff, 'baño limpieza')) == ['Baño 3er piso']
+    assert buscar(staff, 'ascensor')['items'] == []
+
+
+def test_primero_las_mas_urgentes(staff, crear_incidencia, procesar_outbox):
+    for i, urgencia in enumerate(('baja', 'alta', 'media')):
+        crear_incidencia(ubicacion=f'Aula {i}', urgencia=urgencia)
+    procesar_outbox()
+    assert [item['urgencia'] for item in buscar(staff, 'proyector')['items']] == ['alta', 'media', 'baja']
+
+
+def test_paginas(staff, crear_incidencia, procesar_outbox):
+    creadas = {crear_incidencia(ubicacion=f'Aula {i}') for i in range(7)}
+    procesar_outbox()
+
+    vistas, cursor = [], None
+    while True:
+        body = buscar(staff, 'proyector roto', limit='3', **({'cursor': cursor} if cursor else {}))
+        assert len(body['items']) <= 3
+        vistas += [item['incidente_id'] for item in body['items']]
+        cursor = body['cursor']
+        if not cursor:
+            break
+    assert sorted(vistas) == sorted(creadas)
+
+
+def test_sin_texto_o_como_estudiante(staff, estudiante):
+    assert search_incidents.search_incidents(entorno.evento(staff, query={'q': ' de la '}), None)['statusCode'] == 400
+    assert search_incidents.search_incidents(entorno.evento(estudiante, query={'q': 'proyector'}), None)['statusCode'] == 403
+
+
+def test_archivar_borra_los_postings(staff, crear_incidencia, procesar_outbox):
+    vieja = crear_incidencia(ubicacion='Aula vieja', urgencia='alta')
+    crear_incidencia(ubicacion='Aula nueva', urgencia='baja')
+    # Resuelta hace un año: se indexa con esa fecha y el archivado la pasa a S3
+    aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').update_item(
+        Key={'incidente_id': vieja},
+        UpdateExpression='SET fase = :fase, fecha_creacion = :fecha, fecha_actualizacion = :fecha REMOVE clave_dedup',
+        ExpressionAttributeValues={':fase': 'resuelta', ':fecha': '2025-01-10 08:00:00'}
+    )
+    procesar_outbox()
+    assert frecuencia('proyector') == 2
+
+    assert archive_incidents.archivar(dias=90)['archivadas'] == 1
+    assert frecuencia('proyector') == 1
+    assert frecuencia('vieja') == 0
+    postings = aws_clients.tabla('DYNAMODB_TABLE_INDICE').scan()['Items']
+    assert vieja not in {item.get('incidente_id') for item in postings}
+
+    # Su posting iba primero (más urgente): la página ya no queda vacía
+    assert ubicaciones(buscar(staff, 'proyector', limit='1')) == ['Aula nueva']
+
+
+@pytest.mark.parametrize('descripcion', [5, {'texto': 'proyector'}, None])
+def test_el_consumidor_no_falla_con_campos_que_no_son_texto(descripcion):
+    incidencia = {
+        'incidente_id': 'vieja', 'descripcion': descripcion, 'ubicacion': 'Aula 5', 'tipo_incidencia': 'equipo',
+        'urgencia': 'alta', 'fecha_creacion': '2026-01-01 10:00:00', 'fase': 'pendiente', 'reportado_por': 'alguien'
+    }
+    aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').put_item(Item=incidencia)
+    notificacion = notificaciones.construir_notificacion('vieja', 'Nueva incidencia', 'administrativo')
+    registro = notificaciones.put_outbox(notificacion, indexar='creacion')['Put']['Item']
+
+    assert notificaciones.procesar_lote([registro]) == 1
+    assert indice.frecuencias(['aula', 'equipo']) == {'aula': 1, 'equipo': 1}
+
+
+def test_campos_proyectados(staff, crear_incidencia, procesar_outbox):
+    crear_incidencia(ubicacion='Aula 101')
+    procesar_outbox()
+    assert buscar(staff, 'proyector', fields='ubicacion')['items'] == [{'ubicacion': 'Aula 101'}]
@@ -0,0 +1,26 @@
+import json
+from decimal import Decimal
+import pytest
+import serializacion
+
+
+@pytest.fixture(params=['simplejson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'simplejson':
+        pytest.importorskip('simplejson')
+    else:
+        monkeypatch.setattr(serializacion, '_simplejson', None)
+
+
+def test_decimal_compacto_y_sin_escapar(encoder):
+    texto = serializacion.dumps({'reportes': Decimal('3'), 'tiempo': Decimal('1.5'), 'ubicacion': 'Baño'})
+    assert texto == '{"reportes":3,"tiempo":1.5,"ubicacion":"Baño"}'
+
+
+def test_otros_tipos_como_texto(encoder):
+    assert json.loads(serializacion.dumps({'conjunto': {1}})) == {'conjunto': '{1}'}
+
+
+def test_a_json():
+    assert serializacion.a_json(Decimal('2')) == 2 and isinstance(serializacion.a_json(Decimal('2')), int)
+    assert serializacion.a_json(Decimal('0.25')) == 0.25
@@ -0,0 +1,72 @@
+import time
+from datetime import datetime, timedelta
+import auth
+import aws_clients
+import entorno
+import logout_user
+import migrate_tokens
+import validate_token
+
+
+def validar(token):
+    return validate_token.validate_token(entorno.evento(token), None)['statusCode']
+
+
+def fila_legacy(token, horas):
+    # Formato de t_tokens_acceso: clave (tenant_id = token, token_id) y `expires` como texto en UTC
+    return {
+        'tenant_id': token,
+        'token_id': 'id-' + token,
+        'user_id': 'usuario-legacy',
+        'role': 'estudiante',
+        'expires': (datetime.utcnow() + timedelta(hours=horas)).strftime(auth.FORMATO_FECHA)
+    }
+
+
+def test_token_guardado_en_tabla(estudiante):
+    assert not estudiante.startswith(auth.PREFIJO_TOKEN_FIRMADO)
+    assert validar(estudiante) == 200
+    assert validar('no-existe') == 403
+
+
+def test_el_token_se_guarda_con_su_clave_y_expiracion_para_el_ttl(estudiante):
+    item = aws_clients.tabla('DYNAMODB_TABLE_TOKENS').get_item(Key={'token': estudiante})['Item']
+    assert item['role'] == 'estudiante'
+    assert 3500 < int(item['expires_at']) - time.time() <= 3600
+
+
+def test_token_vencido_que_el_ttl_todavia_no_borro(estudiante):
+    aws_clients.tabla('DYNAMODB_TABLE_TOKENS').update_item(
+        Key={'token': estudiante}, UpdateExpression='SET expires_at = :antes', ExpressionAttributeValues={':antes': int(time.time()) - 1}
+    )
+    assert validar(estudiante) == 403
+
+
+def test_logout_de_token_guardado(estudiante):
+    assert validar(estudiante) == 200
+    assert logout_user.logout_user(entorno.evento(estudiante), None)['statusCode'] == 200
+    assert validar(estudiante) == 403
+
+
+def test_token_de_la_tabla_anterior_se_migra_al_usarlo():
+    aws_clients.tabla('DYNAMODB_TABLE_TOKENS_LEGACY').put_item(Item=fila_legacy('token-viejo', 1))
+
+    assert validar('token-viejo') == 200
+    migrado = aws_clients.tabla('DYNAMODB_TABLE_TOKENS').get_item(Key={'token': 'token-viejo'})['Item']
+    assert migrado['user_id'] == 'usuario-legacy'
+
+    assert logout_user.logout_user(entorno.evento('token-viejo'), None)['statusCode'] == 200
+    assert aws_clients.tabla('DYNAMODB_TABLE_TOKENS_LEGACY').scan()['Items'] == []
+    assert validar('token-viejo') == 403
+
+
+def test_migrar_copia_solo_los_tokens_vigentes():
+    legacy = aws_clients.tabla('DYNAMODB_TABLE_TOKENS_LEGACY')
+    legacy.put_item(Item=fila_legacy('vigente', 1))
+    legacy.put_item(Item=fila_legacy('vencido', -1))
+
+    destino = aws_clients.tabla('DYNAMODB_TABLE_TOKENS').name
+    assert migrate_tokens.migrar(legacy.name, destino) == 1
+    # Repetir la migración no duplica nada (clave única por token)
+    assert migrate_tokens.migrar(legacy.name, destino) == 1
+    assert [item['token'] for item in aws_clients.tabla('DYNAMODB_TABLE_TOKENS').scan()['Items']] == ['vigente']
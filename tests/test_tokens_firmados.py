@@ -0,0 +1,78 @@
+import time
+import pytest
+import auth
+import entorno
+import logout_user
+import validate_token
+
+
+def validar(token):
+    return validate_token.validate_token(entorno.evento(token), None)['statusCode']
+
+
+def test_token_firmado_valido(firmados, estudiante):
+    assert estudiante.startswith(auth.PREFIJO_TOKEN_FIRMADO)
+    assert validar(estudiante) == 200
+    assert auth.autenticar(entorno.evento(estudiante))['role'] == 'estudiante'
+
+
+def test_validar_un_token_firmado_no_lee_dynamodb(firmados, estudiante, monkeypatch):
+    auth.autenticar(entorno.evento(estudiante))  # Carga la lista de revocados
+
+    def sin_dynamodb(*args, **kwargs):
+        raise AssertionError('No debería consultar la tabla de tokens')
+
+    monkeypatch.setattr(auth, '_tabla_tokens', sin_dynamodb)
+    assert validar(estudiante) == 200
+
+
+def test_sin_secreto_el_token_firmado_no_vale(firmados, estudiante, monkeypatch):
+    monkeypatch.delenv('TOKEN_SECRET')
+    assert validar(estudiante) == 403
+
+
+@pytest.mark.parametrize('alterar', [
+    lambda token: token[:-2] + ('AA' if not token.endswith('AA') else 'BB'),
+    lambda token: token.rsplit('.', 1)[0] + '.ñ',
+    lambda token: 'v1.abc.ñ',
+    lambda token: 'v1.sin-firma',
+])
+def test_token_firmado_alterado(firmados, estudiante, alterar):
+    assert validar(alterar(estudiante)) == 403
+
+
+def test_token_firmado_con_otro_secreto(firmados, estudiante, monkeypatch):
+    monkeypatch.setenv('TOKEN_SECRET', 'otro-secreto')
+    assert validar(estudiante) == 403
+
+
+def test_token_firmado_expirado(firmados):
+    token, _ = auth.emitir_token('usuario', 'estudiante', duracion=-1)
+    assert validar(token) == 403
+
+
+def test_revocacion_en_el_mismo_contenedor(firmados, estudiante):
+    assert validar(estudiante) == 200
+    assert logout_user.logout_user(entorno.evento(estudiante), None)['statusCode'] == 200
+    assert validar(estudiante) == 403
+
+
+def test_revocacion_vista_desde_otro_contenedor(firmados, estudiante, monkeypatch):
+    assert logout_user.logout_user(entorno.evento(estudiante), None)['statusCode'] == 200
+
+    # Otro contenedor: sin revocaciones en memoria, las carga del índice de revocaciones
+    monkeypatch.setattr(auth, '_revocados', {})
+    monkeypatch.setattr(auth, '_revocados_hasta', None)
+    monkeypatch.setattr(auth, '_revocados_actualizado_en', 0)
+    assert validar(estudiante) == 403
+
+
+def test_revocaciones_incrementales(firmados, estudiante, staff, monkeypatch):
+    # El contenedor ya cargó la lista antes del logout: lo ve al refrescar
+    assert validar(staff) == 200
+    monkeypatch.setattr(auth, '_revocados', {})
+    logout_user.logout_user(entorno.evento(estudiante), None)
+    monkeypatch.setattr(auth, '_revocados', {})
+    assert validar(estudiante) == 200  # Todavía dentro del intervalo de refresco
+    monkeypatch.setattr(auth, '_revocados_actualizado_en', time.time() - auth.REVOCACIONES_REFRESCO_SEGUNDOS - 1)
+    assert validar(estudiante) == 403
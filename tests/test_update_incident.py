@@ -0,0 +1,82 @@
+import aws_clients
+import entorno
+import notificaciones
+import update_incident
+
+
+def actualizar(token, incidente_id, fase):
+    return update_incident.update_incident(entorno.evento(token, body={'incidente_id': incidente_id, 'fase': fase}), None)
+
+
+def test_transiciones_validas(staff, crear_incidencia):
+    incidente_id = crear_incidencia()
+
+    respuesta = actualizar(staff, incidente_id, 'en_progreso')
+    assert respuesta['statusCode'] == 200
+    assert respuesta['body']['fase_anterior'] == 'pendiente'
+
+    respuesta = actualizar(staff, incidente_id, 'resuelta')
+    assert respuesta['statusCode'] == 200
+    assert respuesta['body']['fase_anterior'] == 'en_progreso'
+
+
+def test_de_pendiente_a_resuelta_directo(staff, crear_incidencia):
+    # update_incident prueba las fases anteriores posibles hasta dar con la actual
+    incidente_id = crear_incidencia()
+    respuesta = actualizar(staff, incidente_id, 'resuelta')
+    assert respuesta['statusCode'] == 200
+    assert respuesta['body']['fase_anterior'] == 'pendiente'
+
+
+def test_resuelta_no_vuelve_atras(staff, crear_incidencia):
+    incidente_id = crear_incidencia()
+    assert actualizar(staff, incidente_id, 'resuelta')['statusCode'] == 200
+    assert actualizar(staff, incidente_id, 'en_progreso')['statusCode'] == 409
+    assert actualizar(staff, incidente_id, 'resuelta')['statusCode'] == 409
+
+
+def test_a_pendiente_no_se_puede_pasar(staff, crear_incidencia):
+    assert actualizar(staff, crear_incidencia(), 'pendiente')['statusCode'] == 409
+
+
+def test_fase_desconocida(staff, crear_incidencia):
+    assert actualizar(staff, crear_incidencia(), 'cerrada')['statusCode'] == 400
+
+
+def test_incidencia_inexistente(staff):
+    assert actualizar(staff, 'no-existe', 'en_progreso')['statusCode'] == 404
+
+
+def test_estudiante_no_puede_actualizar(estudiante, crear_incidencia):
+    assert actualizar(estudiante, crear_incidencia(), 'en_progreso')['statusCode'] == 403
+
+
+def outbox_de(incidente_id):
+    return [
+        item for item in aws_clients.tabla('DYNAMODB_TABLE_OUTBOX').scan()['Items']
+        if item['notificacion']['incidente_id'] == incidente_id and item.get('indexar') == 'actualizacion'
+    ]
+
+
+def test_actualizacion_y_notificacion_en_una_transaccion(staff, crear_incidencia, monkeypatch):
+    incidente_id = crear_incidencia()
+    transacciones = []
+    original = notificaciones.transaccion
+    monkeypatch.setattr(notificaciones, 'transaccion', lambda items: transacciones.append(items) or original(items))
+
+    assert actualizar(staff, incidente_id, 'en_progreso')['statusCode'] == 200
+    assert len(transacciones) == 1
+    [registro] = outbox_de(incidente_id)
+    assert registro['resolver_destinatario'] is True
+
+
+def test_transicion_rechazada_no_escribe_nada(staff, crear_incidencia):
+    incidente_id = crear_incidencia()
+    actualizar(staff, incidente_id, 'resuelta')
+    antes = aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').get_item(Key={'incidente_id': incidente_id})['Item']
+
+    assert actualizar(staff, incidente_id, 'en_progreso')['statusCode'] == 409
+    assert actualizar(staff, 'no-existe', 'en_progreso')['statusCode'] == 404
+    assert aws_clients.tabla('DYNAMODB_TABLE_INCIDENCIAS').get_item(Key={'incidente_id': incidente_id})['Item'] == antes
+    assert len(outbox_de(incidente_id)) == 1
+    assert outbox_de('no-existe') == []
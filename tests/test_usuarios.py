@@ -0,0 +1,100 @@
+import threading
+from boto3.dynamodb.conditions import Key
+import aws_clients
+import entorno
+import instrumentacion
+import login_user
+import provision_users
+import register_user
+
+ALUMNO = {'tenant_id': 'ana@utec.edu.pe', 'password': 'secreto', 'role': 'estudiante', 'nombre': 'Ana', 'apellido': 'Pérez'}
+
+
+def registrar(datos):
+    return register_user.register_user(entorno.evento(body=dict(datos)), None)
+
+
+def usuarios(tenant_id):
+    items = aws_clients.tabla('DYNAMODB_TABLE_USUARIOS').query(KeyConditionExpression=Key('tenant_id').eq(tenant_id))['Items']
+    return [item for item in items if item['user_id'] != register_user.MARCA_CORREO]
+
+
+def provisionar(token, body):
+    return provision_users.provision_users(entorno.evento(token, body=body), None)
+
+
+def test_registro_y_login():
+    assert registrar(ALUMNO)['statusCode'] == 200
+    respuesta = login_user.login_user(entorno.evento(body={'tenant_id': ALUMNO['tenant_id'], 'password': 'secreto'}), None)
+    assert respuesta['statusCode'] == 200 and respuesta['body']['role'] == 'estudiante'
+    assert login_user.login_user(entorno.evento(body={'tenant_id': ALUMNO['tenant_id'], 'password': 'otra'}), None)['statusCode'] == 403
+
+
+def test_correo_repetido():
+    assert registrar(ALUMNO)['statusCode'] == 200
+    assert registrar(dict(ALUMNO, nombre='Otra'))['statusCode'] == 409
+    assert len(usuarios(ALUMNO['tenant_id'])) == 1
+
+
+def test_registros_concurrentes_del_mismo_correo(monkeypatch):
+    # Los dos pasan la consulta previa antes de que el otro escriba: decide la transacción
+    monkeypatch.setattr(register_user, 'registrado', lambda tenant_id: False)
+    codigos = []
+    hilos = [threading.Thread(target=lambda: codigos.append(registrar(ALUMNO)['statusCode'])) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(codigos) == [200, 409, 409, 409]
+    assert len(usuarios(ALUMNO['tenant_id'])) == 1
+
+
+def test_usuario_anterior_a_la_marca_de_correo():
+    # Registrado antes de que existiera la marca: la consulta de la partición lo detecta igual
+    aws_clients.tabla('DYNAMODB_TABLE_USUARIOS').put_item(Item=dict(register_user.construir_usuario(ALUMNO)))
+    assert registrar(ALUMNO)['statusCode'] == 409
+
+
+def test_alta_masiva(staff):
+    registrar(dict(ALUMNO, tenant_id='ya@utec.edu.pe'))
+    contenido = '\n'.join([
+        'tenant_id,password,role,nombre,apellido',
+        'a@utec.edu.pe,clave1,estudiante,A,Uno',
+        'b@utec.edu.pe,clave2,estudiante,B,Dos',
+        'a@utec.edu.pe,clave1,estudiante,A,Uno',
+        'ya@utec.edu.pe,clave3,estudiante,Y,Ya',
+        'c@utec.edu.pe,,estudiante,C,Tres',
+    ])
+    respuesta = provisionar(staff, {'formato': 'csv', 'contenido': contenido})
+    assert respuesta['statusCode'] == 200
+    resumen = respuesta['body']
+    assert (resumen['creados'], resumen['existentes'], resumen['repetidos']) == (2, 1, 1)
+    assert resumen['invalidos'] == [{'registro': 5, 'error': 'Faltan datos'}]
+    assert resumen['no_escritos'] == []
+    assert login_user.login_user(entorno.evento(body={'tenant_id': 'b@utec.edu.pe', 'password': 'clave2'}), None)['statusCode'] == 200
+
+
+def test_alta_masiva_no_duplica_un_registro_concurrente(staff, monkeypatch):
+    # El correo se registra entre la consulta de existentes y la escritura
+    monkeypatch.setattr(provision_users, 'existentes', lambda tenant_ids, hilos: set())
+    registrar(ALUMNO)
+    resumen = provisionar(staff, {'usuarios': [ALUMNO, dict(ALUMNO, tenant_id='luis@utec.edu.pe')]})['body']
+    assert (resumen['creados'], resumen['existentes']) == (1, 1)
+    assert len(usuarios(ALUMNO['tenant_id'])) == 1
+
+
+def test_alta_masiva_validaciones(staff, estudiante):
+    assert provisionar(estudiante, {'usuarios': [ALUMNO]})['statusCode'] == 403
+    assert provisionar(staff, {'usuarios': []})['statusCode'] == 400
+    assert provisionar(staff, {'formato': 'xml', 'contenido': '<a/>'})['statusCode'] == 400
+    demasiados = [dict(ALUMNO, tenant_id=f'{i}@utec.edu.pe') for i in range(provision_users.MAX_USUARIOS + 1)]
+    assert provisionar(staff, {'usuarios': demasiados})['statusCode'] == 400
+
+
+def test_las_contrasenas_no_llegan_al_log(staff, monkeypatch, capsys):
+    monkeypatch.setattr(instrumentacion, 'MUESTREO_EVENTOS', 1.0)
+    provisionar(staff, {'formato': 'ndjson', 'contenido': '{"tenant_id": "z@utec.edu.pe", "password": "muy-secreta", "role": "estudiante", "nombre": "Z", "apellido": "Z"}'})
+    provisionar(staff, {'usuarios': [dict(ALUMNO, password='otra-secreta')]})
+    salida = capsys.readouterr().out
+    assert 'muy-secreta' not in salida and 'otra-secreta' not in salida
@@ -0,0 +1,25 @@
+import re
+import unicodedata
+
+# Normalización de texto para el índice de búsqueda (ver indice.py): minúsculas, sin tildes
+# y separado en palabras, así "Baño 3er piso" y "bano 3ER PISO" dan los mismos términos.
+PALABRAS_VACIAS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los', 'para', 'por', 'se',
+    'su', 'un', 'una', 'y', 'o', 'que'
+}
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    sin_tildes = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return _NO_ALFANUMERICO.sub(' ', sin_tildes.lower()).strip()
+
+
+def terminos(*textos):
+    """Términos distintos de los textos, sin palabras vacías, en orden de aparición."""
+    vistos = []
+    for texto in textos:
+        for palabra in normalizar(texto).split():
+            if palabra not in PALABRAS_VACIAS and palabra not in vistos:
+                vistos.append(palabra)
+    return vistos
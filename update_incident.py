@@ -1,39 +1,30 @@
-import boto3
+import auth
+import cache_respuestas
+import estadisticas
+import notificaciones
 import os
-from datetime import datetime
-import json
-import uuid  # Asegúrate de agregar esta línea
+from botocore.exceptions import ClientError
+import instrumentacion
 
-def update_incident(event, context):
-    print("Event recibido en update_incident:", event)  # Log en CloudWatch
+# Transiciones de fase permitidas
+FASES_SIGUIENTES = {
+    'pendiente': ('en_progreso', 'resuelta'),
+    'en_progreso': ('resuelta',),
+    'resuelta': ()
+}
 
+@instrumentacion.instrumentar
+def update_incident(event, context):
     try:
-        # Obtener el token desde el header Authorization (formato Bearer <token>)
-        token = event['headers'].get('Authorization').replace('Bearer ', '')  
-        if not token:
-            return {
-                'statusCode': 400,
-                'body': {'error': 'Faltan datos en los headers'}
-            }
-
-        # Obtener el nombre de la tabla de tokens desde las variables de entorno
-        tokens_table_name = os.environ['DYNAMODB_TABLE_TOKENS']
-
-        dynamodb = boto3.resource('dynamodb')
-        tokens_table = dynamodb.Table(tokens_table_name)
-
-        # Buscar el token en la tabla de tokens
-        response = tokens_table.query(
-            KeyConditionExpression=boto3.dynamodb.conditions.Key('tenant_id').eq(token)
-        )
-
-        if 'Items' not in response or len(response['Items']) == 0:
+        # Validar el token (con cache entre invocaciones, ver auth.py)
+        try:
+            token_item = auth.autenticar(event)
+        except auth.ErrorAutenticacion as e:
             return {
-                'statusCode': 403,
-                'body': 'Token no válido o no encontrado'
+                'statusCode': e.status_code,
+                'body': e.mensaje
             }
 
-        token_item = response['Items'][0]
         user_role = token_item['role']
 
         # Verificar si el usuario tiene el rol adecuado (no estudiante)
@@ -55,72 +46,84 @@ def update_incident(event, context):
                 'body': {'error': 'Faltan datos en el cuerpo de la solicitud'}
             }
 
-        # Actualizar la incidencia
-        incidencias_table = dynamodb.Table(os.environ['DYNAMODB_TABLE_INCIDENCIAS'])
-        update_data = {'fase': nueva_fase}
-
-        if nueva_fase == 'resuelta' and tiempo_resolucion:
-            update_data['tiempo_resolucion'] = tiempo_resolucion  # Actualizar el tiempo de resolución
-
-        incidencias_table.update_item(
-            Key={'incidente_id': incidente_id},
-            UpdateExpression="SET fase = :fase, tiempo_resolucion = :tiempo_resolucion",
-            ExpressionAttributeValues={
-                ':fase': nueva_fase,
-                ':tiempo_resolucion': tiempo_resolucion if nueva_fase == 'resuelta' else None
+        if nueva_fase not in FASES_SIGUIENTES:
+            return {
+                'statusCode': 400,
+                'body': {'error': f'Fase no válida: {nueva_fase}'}
             }
-        )
 
-        # Crear la notificación
-        notificacion_id = str(uuid.uuid4())  # Usar uuid para generar un ID único
-        fecha_actualizacion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Obtener el email del estudiante (quien creó la incidencia) desde la tabla de incidencias
-        incidencia_response = incidencias_table.get_item(Key={'incidente_id': incidente_id})
-        creador_incidente = incidencia_response['Item'].get('reportado_por')
-
-        if not creador_incidente:
+        # Fases desde las que se puede pasar a la nueva (la más habitual primero)
+        anteriores = [fase for fase, siguientes in FASES_SIGUIENTES.items() if nueva_fase in siguientes]
+        if not anteriores:
             return {
-                'statusCode': 404,
-                'body': {'error': 'Incidencia no encontrada o sin creador asociado'}
+                'statusCode': 409,
+                'body': {'error': f'No se puede pasar una incidencia a la fase {nueva_fase}'}
             }
+        anteriores.sort(key=lambda fase: fase != 'en_progreso')
 
-        # Crear mensaje de notificación
+        # El destinatario (quien reportó la incidencia) lo resuelve el consumidor del outbox,
+        # así la actualización no necesita leer la incidencia antes de escribirla
         mensaje = f'La incidencia {incidente_id} ha sido actualizada a la fase {nueva_fase}.'
+        notificacion_data = notificaciones.construir_notificacion(incidente_id, mensaje, None)
 
-        # Si la fase es "resuelta", se notifica al estudiante que la creó
-        notificacion_data = {
-            'notificacion_id': notificacion_id,
-            'incidente_id': incidente_id,
-            'mensaje': mensaje,
-            'fecha': fecha_actualizacion,
-            'status': 'pendiente',
-            'destinatario': creador_incidente  # Notificación específica para el estudiante que reportó
-        }
-
-        # Almacenar la notificación en DynamoDB
-        notificaciones_table = dynamodb.Table(os.environ['DYNAMODB_TABLE_NOTIFICACIONES'])
-        notificaciones_table.put_item(Item=notificacion_data)
-
-        # Guardar la notificación en un archivo S3 (subcarpeta con el email del estudiante)
-        s3 = boto3.client('s3')
-        bucket_name = os.environ['NOTIFICACIONES_BUCKET_NAME']
-        file_name = f"notificaciones/{creador_incidente}/{notificacion_id}.json"
-
-        # Convertir la notificación a JSON
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=file_name,
-            Body=json.dumps(notificacion_data),
-            ContentType='application/json'
-        )
-
-        # Imprimir el JSON de la notificación
-        print(f'Notificación generada: {json.dumps(notificacion_data)}')
+        update_expression = 'SET fase = :fase, fecha_actualizacion = :fecha'
+        valores = {':fase': nueva_fase, ':fecha': notificacion_data['fecha']}
+        if nueva_fase == 'resuelta' and tiempo_resolucion:
+            update_expression += ', tiempo_resolucion = :tiempo_resolucion'
+            valores[':tiempo_resolucion'] = tiempo_resolucion
+        if nueva_fase == 'resuelta':
+            # Una incidencia resuelta sale del índice de duplicados (ver create_incident.py)
+            update_expression += ' REMOVE clave_dedup'
+
+        # Actualización condicional + notificación en una sola transacción (un round trip); los
+        # contadores y la versión del cache se actualizan después (ver estadisticas.py y
+        # cache_respuestas.py).
+        # La condición exige que la incidencia exista y esté en la fase anterior esperada; si no
+        # lo está, DynamoDB devuelve la incidencia actual (ALL_OLD) y se reintenta una sola vez
+        # con su fase real si la transición es válida.
+        fase_anterior = anteriores[0]
+        while True:
+            try:
+                notificaciones.transaccion([
+                    {
+                        'Update': {
+                            'TableName': os.environ['DYNAMODB_TABLE_INCIDENCIAS'],
+                            'Key': {'incidente_id': incidente_id},
+                            'UpdateExpression': update_expression,
+                            'ConditionExpression': 'attribute_exists(incidente_id) AND fase = :fase_anterior',
+                            'ExpressionAttributeValues': dict(valores, **{':fase_anterior': fase_anterior}),
+                            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                        }
+                    },
+                    notificaciones.put_outbox(notificacion_data, resolver_destinatario=True, indexar='actualizacion')
+                ])
+                break
+            except ClientError as e:
+                codigo, actual = notificaciones.motivo_cancelacion(e, 0)
+                if codigo != 'ConditionalCheckFailed':
+                    raise
+                if actual is None:
+                    return {
+                        'statusCode': 404,
+                        'body': {'error': 'Incidencia no encontrada'}
+                    }
+                if actual.get('fase') == fase_anterior or actual.get('fase') not in anteriores:
+                    return {
+                        'statusCode': 409,
+                        'body': {'error': f"No se puede pasar de la fase {actual.get('fase')} a {nueva_fase}"}
+                    }
+                fase_anterior = actual['fase']
+        estadisticas.aplicar(estadisticas.updates_cambio_fase(fase_anterior, nueva_fase, notificacion_data['fecha']))
+        cache_respuestas.invalidar()
 
         return {
             'statusCode': 200,
-            'body': {'message': 'Incidencia actualizada y notificación generada con éxito', 'incidente_id': incidente_id}
+            'body': {
+                'message': 'Incidencia actualizada y notificación generada con éxito',
+                'incidente_id': incidente_id,
+                'fase_anterior': fase_anterior,
+                'fase': nueva_fase
+            }
         }
 
     except Exception as e: